@@ -0,0 +1,98 @@
+"""
+Validate-on-complete.
+
+When a research request opts in (auto_validate) and the server holds a
+judge key (JUDGE_OPENAI_API_KEY, falling back to OPENAI_API_KEY), the
+completed run is validated in a background task as soon as the
+orchestrator finishes; the research stream doesn't wait for it. Clients
+poll the task with validation_status (GET /api/research/{research_id}/validation).
+Verdicts are stored under the run's research_id and linked to the report
+once it is saved, so they also show up in the report's validation history
+and a manual re-validation costs no judge calls.
+"""
+import asyncio
+import os
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from database import SessionLocal
+from validation import ResearchValidator, build_report_data
+from validation_store import ValidationStore
+
+# Finished runs whose result stays available to validation_status
+MAX_FINISHED_RUNS = 200
+
+# Validation task per research_id (also keeps running tasks from being garbage collected)
+_runs: "OrderedDict[str, asyncio.Task]" = OrderedDict()
+
+
+def judge_api_key() -> Optional[str]:
+    return os.getenv("JUDGE_OPENAI_API_KEY") or os.getenv("OPENAI_API_KEY")
+
+
+def auto_validation_enabled() -> bool:
+    return os.getenv("AUTO_VALIDATE", "true").lower() != "false" and bool(judge_api_key())
+
+
+def start_validation(research_id: str, results: Dict[str, Any]) -> asyncio.Task:
+    """
+    Validate completed research in the background. The task outlives the
+    research stream; its result is the validation_complete (or
+    validation_failed) event.
+    """
+    task = asyncio.create_task(_validate(research_id, results))
+    _runs[research_id] = task
+    
+    finished = [key for key, run in _runs.items() if run.done()]
+    for key in finished[:max(0, len(finished) - MAX_FINISHED_RUNS)]:
+        del _runs[key]
+    return task
+
+
+def validation_status(research_id: str) -> Optional[Dict[str, Any]]:
+    """validation_running, or the finished task's event; None if this process has no validation for the run"""
+    task = _runs.get(research_id)
+    if task is None:
+        return None
+    if not task.done():
+        return {"type": "validation_running", "research_id": research_id}
+    return task.result()
+
+
+async def _validate(research_id: str, results: Dict[str, Any]) -> Dict[str, Any]:
+    db = SessionLocal()
+    validator = None
+    try:
+        # One batched judge call per report (per-step if the batch output is unusable)
+        validator = ResearchValidator(
+            judge_api_key=judge_api_key(),
+            store=ValidationStore(db, research_id=uuid.UUID(research_id)),
+            batch=True
+        )
+        report_data = build_report_data(results.get("company_name"), results.get("steps", {}))
+        
+        validation_report = None
+        async for event in validator.validate_research_stream(report_data):
+            if event["type"] == "complete":
+                validation_report = event["validation_report"]
+        
+        return {
+            "type": "validation_complete",
+            "research_id": research_id,
+            "overall_score": validation_report["overall_score"],
+            "overall_status": validation_report["overall_status"],
+            "step_scores": {
+                key: {"score": step["score"], "status": step["status"]}
+                for key, step in validation_report["step_validations"].items()
+            },
+            "judge_calls": validation_report["judge_calls"],
+            "judge_errors": validation_report["judge_errors"]
+        }
+    except Exception as e:
+        print(f"Background validation failed for {research_id}: {e}")
+        return {"type": "validation_failed", "research_id": research_id, "message": str(e)}
+    finally:
+        if validator:
+            await validator.judge.close()
+        db.close()
@@ -0,0 +1,155 @@
+"""
+Content-addressed blob storage for raw LLM responses and citations.
+
+Report steps keep only parsed `data`; the raw LLM text and citation lists are
+compressed into `llm_blobs` and referenced from the step JSON by hash:
+    
+    {"data": {...}, "raw_ref": "<sha256>", "citations_ref": "<sha256>"}
+"""
+import hashlib
+import json
+import zlib
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from database import LLMBlob
+
+# Step keys moved out to blob storage and the reference key that replaces them
+RAW_KEYS = {"raw": "raw_ref", "raw_response": "raw_response_ref"}
+CITATIONS_KEY = "citations"
+CITATIONS_REF_KEY = "citations_ref"
+
+
+def content_hash(content: str) -> str:
+    """sha256 hex digest of the uncompressed content"""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def put_blob(db: Session, content: str, kind: str) -> str:
+    """Store content compressed (deduplicated by hash) and return its hash"""
+    digest = content_hash(content)
+    encoded = content.encode("utf-8")
+    
+    db.execute(
+        insert(LLMBlob).values(
+            content_hash=digest,
+            kind=kind,
+            compression="zlib",
+            data=zlib.compress(encoded, 6),
+            original_size=len(encoded)
+        ).on_conflict_do_nothing(index_elements=["content_hash"])
+    )
+    return digest
+
+
+def get_blobs(db: Session, hashes: Iterable[str]) -> Dict[str, str]:
+    """Fetch and decompress several blobs in one query"""
+    wanted = {h for h in hashes if h}
+    if not wanted:
+        return {}
+    
+    rows = db.query(LLMBlob.content_hash, LLMBlob.compression, LLMBlob.data).filter(
+        LLMBlob.content_hash.in_(wanted)
+    ).all()
+    
+    blobs = {}
+    for digest, compression, data in rows:
+        raw = zlib.decompress(data) if compression == "zlib" else bytes(data)
+        blobs[digest] = raw.decode("utf-8")
+    return blobs
+
+
+def _nested_results(step: Dict) -> List[Dict]:
+    """Return the step dict plus per-item result dicts (step 3 stores one per business unit)"""
+    entries = [step]
+    data = step.get("data")
+    if isinstance(data, dict):
+        entries.extend(
+            value for value in data.values()
+            if isinstance(value, dict) and "data" in value
+            and any(k in value for k in (*RAW_KEYS, *RAW_KEYS.values()))
+        )
+    return entries
+
+
+def externalize_step(db: Session, step: Optional[Dict]) -> Optional[Dict]:
+    """
+    Move raw LLM text and citations of a step into blob storage.
+    
+    Returns a copy of the step with `raw`/`citations` replaced by hash references.
+    """
+    if not isinstance(step, dict):
+        return step
+    
+    step = json.loads(json.dumps(step))  # detach from caller's structure
+    
+    for entry in _nested_results(step):
+        for key, ref_key in RAW_KEYS.items():
+            if isinstance(entry.get(key), str):
+                entry[ref_key] = put_blob(db, entry.pop(key), kind="raw")
+        
+        # Fallback parse results keep the unparsed response inside data
+        data = entry.get("data")
+        if isinstance(data, dict) and data.get("fallback") and isinstance(data.get("raw_response"), str):
+            data["raw_response_ref"] = put_blob(db, data.pop("raw_response"), kind="raw")
+    
+    citations = step.pop(CITATIONS_KEY, None)
+    if citations:
+        step[CITATIONS_REF_KEY] = put_blob(db, json.dumps(citations, ensure_ascii=False), kind="citations")
+    
+    return step
+
+
+def hydrate_steps(
+    db: Session,
+    steps: Dict[str, Optional[Dict]],
+    include_raw: bool = False,
+    include_citations: bool = True
+) -> Dict[str, Optional[Dict]]:
+    """
+    Resolve blob references for several steps with a single blob query.
+    
+    Steps saved before blob storage existed pass through unchanged.
+    """
+    refs = []
+    for step in steps.values():
+        if not isinstance(step, dict):
+            continue
+        if include_citations:
+            refs.append(step.get(CITATIONS_REF_KEY))
+        if include_raw:
+            for entry in _nested_results(step):
+                refs.extend(entry.get(ref_key) for ref_key in RAW_KEYS.values())
+                data = entry.get("data")
+                if isinstance(data, dict):
+                    refs.append(data.get("raw_response_ref"))
+    
+    blobs = get_blobs(db, refs)
+    
+    hydrated = {}
+    for step_key, step in steps.items():
+        if not isinstance(step, dict):
+            hydrated[step_key] = step
+            continue
+        
+        step = dict(step)
+        if include_citations and CITATIONS_REF_KEY in step:
+            step[CITATIONS_KEY] = json.loads(blobs.get(step[CITATIONS_REF_KEY], "[]"))
+        elif CITATIONS_KEY not in step:
+            step[CITATIONS_KEY] = []
+        
+        if include_raw:
+            step = json.loads(json.dumps(step))
+            for entry in _nested_results(step):
+                for key, ref_key in RAW_KEYS.items():
+                    if ref_key in entry:
+                        entry[key] = blobs.get(entry[ref_key])
+                data = entry.get("data")
+                if isinstance(data, dict) and "raw_response_ref" in data:
+                    data["raw_response"] = blobs.get(data["raw_response_ref"])
+        
+        hydrated[step_key] = step
+    
+    return hydrated
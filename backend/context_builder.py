@@ -0,0 +1,230 @@
+"""
+Token-budgeted context assembly for step prompts.
+
+Each step has a context budget in tokens. Sources (earlier step outputs,
+web search results) are added with a priority; the budget is handed out
+in priority order and every source is trimmed to its allotment at
+structural boundaries instead of at a character offset:
+
+- JSON step output: trailing array elements are dropped (largest array
+  first), then the longest strings are shortened, so the result is
+  always valid JSON
+- Search results: whole results are kept in rank order
+- Plain text: cut at a paragraph, line or word boundary
+"""
+import copy
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from json_stream import parse_json_text
+
+# Rough token estimate shared with the rate limiter
+CHARS_PER_TOKEN = 4
+
+# Context budget per prompt, in tokens (the "shared" budget is the step 1 prefix sent with steps 2-7)
+STEP_CONTEXT_BUDGETS = {
+    "shared": 6000,
+    "step1": 3000,
+    "step2": 3000,
+    "step3": 2500,
+    "step4": 5000,
+    "step5": 7000,
+    "step5_repair": 2000,
+    "step6": 5000,
+    "step7": 4000,
+}
+
+# Strings are never shortened below this many characters
+MIN_STRING_CHARS = 40
+
+
+def count_tokens(text: str) -> int:
+    """Approximate token count (~4 characters per token)"""
+    return len(text) // CHARS_PER_TOKEN
+
+
+def format_search_results(results: List[Dict], title: str = "RECENT WEB SEARCH RESULTS") -> str:
+    """Render search results for a prompt, grouped under their role when they come from role searches"""
+    if not results:
+        return ""
+    
+    # Role searches are listed under their role, in order of first appearance
+    groups: Dict[Optional[str], List[Dict]] = {}
+    for result in results:
+        groups.setdefault(result.get("role"), []).append(result)
+    
+    lines = [f"=== {title} ===\n"]
+    for role, group in groups.items():
+        if role:
+            lines.append(f"\n--- Search for {role} ---")
+        for idx, result in enumerate(group, 1):
+            lines.append(f"{idx}. {result.get('title', 'No title')}")
+            lines.append(f"   URL: {result.get('url', 'No URL')}")
+            lines.append(f"   Relevance: {result.get('score', 0):.2f}")
+            lines.append(f"   Content: {result.get('content', 'No content available')}")
+            lines.append("")
+    lines.append(f"=== END OF {title} ===\n")
+    return "\n".join(lines)
+
+
+def _trim_text(text: str, max_tokens: int) -> str:
+    if count_tokens(text) <= max_tokens:
+        return text
+    limit = max_tokens * CHARS_PER_TOKEN
+    cut = text[:limit]
+    for boundary in ("\n\n", "\n", " "):
+        index = cut.rfind(boundary)
+        if index > limit // 2:
+            return cut[:index].rstrip() + " ..."
+    return cut.rstrip() + " ..."
+
+
+def _largest_array(data: Any) -> Tuple[Optional[List], int]:
+    """The array with the largest serialized size that still has more than one element, and that size"""
+    best, best_size = None, 0
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            if len(node) > 1:
+                size = len(json.dumps(node, ensure_ascii=False))
+                if size > best_size:
+                    best, best_size = node, size
+            stack.extend(node)
+    return best, best_size
+
+
+def _longest_string(data: Any) -> Tuple[Optional[Tuple[Any, Any]], int]:
+    """(container, key) of the longest string value that can still be shortened, and its length"""
+    best, best_len = None, MIN_STRING_CHARS
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        items = node.items() if isinstance(node, dict) else enumerate(node) if isinstance(node, list) else ()
+        for key, value in items:
+            if isinstance(value, str) and len(value) > best_len:
+                best, best_len = (node, key), len(value)
+            elif isinstance(value, (dict, list)):
+                stack.append(value)
+    return best, best_len
+
+
+def trim_json(data: Any, max_tokens: int) -> str:
+    """
+    Serialize `data` compactly, trimming whichever is bigger - the largest
+    array (drop its last element) or the longest string (halve it) - until it fits.
+    """
+    data = copy.deepcopy(data)
+    text = json.dumps(data, ensure_ascii=False)
+    while count_tokens(text) > max_tokens:
+        array, array_size = _largest_array(data)
+        target, string_len = _longest_string(data)
+        if array is not None and (target is None or array_size >= string_len):
+            array.pop()
+        elif target is not None:
+            container, key = target
+            container[key] = _trim_text(container[key], len(container[key]) // (2 * CHARS_PER_TOKEN))
+        else:
+            break
+        text = json.dumps(data, ensure_ascii=False)
+    return text
+
+
+class _Source:
+    def __init__(self, name: str, kind: str, content: Any, priority: int, max_share: float):
+        self.name = name
+        self.kind = kind
+        self.content = content
+        self.priority = priority
+        self.max_share = max_share
+        self.needed = count_tokens(self.render(content))
+    
+    def render(self, content: Any) -> str:
+        if self.kind == "json":
+            return json.dumps(content, ensure_ascii=False)
+        if self.kind == "search":
+            return format_search_results(content["results"], content["title"])
+        return content
+    
+    def fit(self, max_tokens: int) -> str:
+        if self.kind == "json":
+            return trim_json(self.content, max_tokens)
+        if self.kind == "text":
+            return _trim_text(self.content, max_tokens)
+        
+        # Search results: keep whole results, best first, while they fit
+        kept = []
+        for result in self.content["results"]:
+            candidate = kept + [result]
+            if count_tokens(format_search_results(candidate, self.content["title"])) <= max_tokens:
+                kept = candidate
+        self.content["kept"] = kept
+        return format_search_results(kept, self.content["title"])
+
+
+class ContextBuilder:
+    """
+    Collects the context sources for one prompt and fits them into a token budget.
+    
+    Priority 1 is the most important. In priority order each source gets up
+    to `max_share` of the budget; whatever is left over then goes to sources
+    that still need more, again in priority order.
+    """
+    
+    def __init__(self, budget_tokens: int):
+        self.budget_tokens = budget_tokens
+        self._sources: List[_Source] = []
+    
+    @classmethod
+    def for_step(cls, step: str) -> "ContextBuilder":
+        return cls(STEP_CONTEXT_BUDGETS[step])
+    
+    def add_json(self, name: str, text: str, priority: int = 1, max_share: float = 1.0) -> "ContextBuilder":
+        """Add a step's raw JSON output (falls back to plain text if it doesn't parse)"""
+        try:
+            data = parse_json_text(text)
+        except ValueError:
+            return self.add_text(name, text, priority, max_share)
+        self._sources.append(_Source(name, "json", data, priority, max_share))
+        return self
+    
+    def add_text(self, name: str, text: str, priority: int = 1, max_share: float = 1.0) -> "ContextBuilder":
+        self._sources.append(_Source(name, "text", text, priority, max_share))
+        return self
+    
+    def add_search_results(
+        self,
+        name: str,
+        results: List[Dict],
+        priority: int = 1,
+        max_share: float = 1.0,
+        title: str = "RECENT WEB SEARCH RESULTS"
+    ) -> "ContextBuilder":
+        """Add search results, already ordered best first"""
+        content = {"results": results, "title": title, "kept": []}
+        self._sources.append(_Source(name, "search", content, priority, max_share))
+        return self
+    
+    def kept_results(self, name: str) -> List[Dict]:
+        """Search results from source `name` that made it into the built context"""
+        for source in self._sources:
+            if source.name == name and source.kind == "search":
+                return source.content["kept"]
+        return []
+    
+    def build(self) -> Dict[str, str]:
+        """Trim every source to its allotment; returns {name: context text}"""
+        ordered = sorted(self._sources, key=lambda source: source.priority)
+        allotted = {}
+        remaining = self.budget_tokens
+        for source in ordered:
+            allotted[source.name] = min(source.needed, int(self.budget_tokens * source.max_share), remaining)
+            remaining -= allotted[source.name]
+        for source in ordered:
+            extra = min(source.needed - allotted[source.name], remaining)
+            allotted[source.name] += extra
+            remaining -= extra
+        
+        return {source.name: source.fit(allotted[source.name]) for source in self._sources}
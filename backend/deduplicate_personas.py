@@ -1,64 +1,335 @@
 #!/usr/bin/env python3
 """
-One-time script to deduplicate existing personas in the database.
-Keeps the most recent persona for each (company_id, name) pair.
+Set-based persona deduplication job.
+
+Runs in two passes:
+1. Exact duplicates - one SQL statement collapses every (company_id, name)
+   group onto its most recent row, back-filling empty fields from the rows
+   being removed and re-pointing research queue items before deleting.
+2. Near duplicates - personas are streamed ordered by company, blocked by
+   company and normalized surname/first initial, and compared on name and
+   title similarity ("Jane Doe" vs "Jane A. Doe, CFO"). Matches are merged
+   field-by-field into the most recent persona.
+
+Usage:
+    python deduplicate_personas.py --dry-run
+    python deduplicate_personas.py --batch-size 500 --threshold 0.85
 """
 
-from database import SessionLocal, Persona
-from sqlalchemy import func
-from datetime import datetime
+import argparse
+import re
+from difflib import SequenceMatcher
+from itertools import groupby
+from typing import Dict, List, Optional, Tuple
 
-def deduplicate_personas():
-    db = SessionLocal()
+from sqlalchemy import text
+
+from database import SessionLocal, engine
+
+# Text fields merged from duplicates into the surviving persona
+MERGE_FIELDS = [
+    "title", "role_in_decision", "pain_point", "ai_use_case",
+    "expected_outcome", "strategic_alignment", "value_hook", "added_by"
+]
+
+# Ordering that decides which persona of a group survives (most recent first)
+KEEP_ORDER = "last_researched_at DESC NULLS LAST, updated_at DESC NULLS LAST, created_at DESC, id DESC"
+
+_MERGE_ASSIGNMENTS = ",\n        ".join(
+    f"{field} = COALESCE(NULLIF(p.{field}, ''), f.{field})" for field in MERGE_FIELDS
+)
+_MERGE_AGGREGATES = ",\n            ".join(
+    f"(ARRAY_AGG(NULLIF(r.{field}, '') ORDER BY r.rn) FILTER (WHERE NULLIF(r.{field}, '') IS NOT NULL))[1] AS {field}"
+    for field in MERGE_FIELDS
+)
+
+EXACT_DEDUP_SQL = f"""
+WITH ranked AS (
+    SELECT id, company_id, name, {", ".join(MERGE_FIELDS)},
+           ROW_NUMBER() OVER (PARTITION BY company_id, name ORDER BY {KEEP_ORDER}) AS rn,
+           FIRST_VALUE(id) OVER (PARTITION BY company_id, name ORDER BY {KEEP_ORDER}) AS keep_id,
+           COUNT(*) OVER (PARTITION BY company_id, name) AS group_size
+    FROM personas
+    WHERE name IS NOT NULL
+),
+dupes AS (
+    SELECT * FROM ranked WHERE group_size > 1
+),
+fill AS (
+    SELECT r.keep_id,
+            {_MERGE_AGGREGATES}
+    FROM dupes r
+    GROUP BY r.keep_id
+),
+merged AS (
+    UPDATE personas p SET
+        {_MERGE_ASSIGNMENTS}
+    FROM fill f
+    WHERE p.id = f.keep_id
+    RETURNING p.id
+),
+requeued AS (
+    UPDATE research_queue q SET persona_id = d.keep_id
+    FROM dupes d
+    WHERE q.persona_id = d.id AND d.rn > 1
+    RETURNING q.id
+),
+deleted AS (
+    DELETE FROM personas p
+    USING dupes d
+    WHERE p.id = d.id AND d.rn > 1
+    RETURNING p.id
+)
+SELECT (SELECT COUNT(*) FROM merged) AS groups,
+       (SELECT COUNT(*) FROM deleted) AS deleted,
+       (SELECT COUNT(*) FROM requeued) AS requeued
+"""
+
+EXACT_DRY_RUN_SQL = """
+SELECT company_id, name, COUNT(*) AS count
+FROM personas
+WHERE name IS NOT NULL
+GROUP BY company_id, name
+HAVING COUNT(*) > 1
+ORDER BY COUNT(*) DESC
+"""
+
+PERSONA_STREAM_SQL = f"""
+SELECT id, company_id, name, {", ".join(MERGE_FIELDS)},
+       last_researched_at, updated_at, created_at
+FROM personas
+WHERE name IS NOT NULL
+ORDER BY company_id, {KEEP_ORDER}
+"""
+
+# Honorifics, suffixes and credentials ignored when comparing names
+NAME_NOISE = {
+    "mr", "mrs", "ms", "dr", "prof", "sir", "jr", "sr", "ii", "iii", "iv",
+    "phd", "mba", "cpa", "cfa", "md", "esq"
+}
+
+
+def normalize_name(name: str) -> Tuple[str, ...]:
+    """
+    Reduce a persona name to comparable tokens.
     
-    try:
-        # Find all duplicate persona groups (same company + same name)
-        duplicates = db.query(
-            Persona.company_id,
-            Persona.name,
-            func.count(Persona.id).label('count')
-        ).group_by(
-            Persona.company_id,
-            Persona.name
-        ).having(
-            func.count(Persona.id) > 1
-        ).all()
+    Drops anything after the first comma (usually a title), parentheticals,
+    honorifics, suffixes and single-letter middle initials:
+    "Jane A. Doe, CFO" -> ("jane", "doe")
+    """
+    if not name:
+        return ()
+    
+    name = re.sub(r'\(.*?\)', ' ', name.split(',')[0])
+    tokens = re.findall(r"[a-z][a-z'\-]*", name.lower())
+    tokens = [t.strip("'-") for t in tokens if t.strip("'-") not in NAME_NOISE]
+    
+    if len(tokens) > 2:
+        # Keep first and last, drop middle initials
+        tokens = [tokens[0]] + [t for t in tokens[1:-1] if len(t) > 1] + [tokens[-1]]
+    
+    return tuple(t for t in tokens if t)
+
+
+def blocking_key(tokens: Tuple[str, ...]) -> Optional[str]:
+    """Block on surname + first initial so only plausible pairs are compared"""
+    if not tokens:
+        return None
+    if len(tokens) == 1:
+        return tokens[0]
+    return f"{tokens[-1]}:{tokens[0][0]}"
+
+
+def first_names_match(a: Tuple[str, ...], b: Tuple[str, ...]) -> bool:
+    """Same first name, or an initial against a full one ("j" vs "jane")"""
+    if len(a) < 2 or len(b) < 2:
+        return False
+    first_a, first_b = a[0], b[0]
+    if first_a == first_b:
+        return True
+    return (len(first_a) == 1 and first_b.startswith(first_a)) or \
+        (len(first_b) == 1 and first_a.startswith(first_b))
+
+
+def persona_similarity(a: Dict, b: Dict) -> float:
+    """Combined name/title similarity between two personas (0.0 to 1.0)"""
+    if a["tokens"] == b["tokens"]:
+        # Same normalized name within one company is the same person
+        return 1.0
+    
+    name_ratio = SequenceMatcher(None, " ".join(a["tokens"]), " ".join(b["tokens"])).ratio()
+    if not first_names_match(a["tokens"], b["tokens"]):
+        # A shared title must not pull two different people over the threshold
+        return name_ratio
+    
+    title_a = (a.get("title") or "").lower().strip()
+    title_b = (b.get("title") or "").lower().strip()
+    if not title_a or not title_b:
+        return name_ratio
+    
+    title_ratio = SequenceMatcher(None, title_a, title_b).ratio()
+    return 0.8 * name_ratio + 0.2 * title_ratio
+
+
+def cluster_company(personas: List[Dict], threshold: float) -> List[List[Dict]]:
+    """
+    Group one company's personas into near-duplicate clusters.
+    
+    Input must already be ordered most-recent-first, so the first persona of
+    every returned cluster is the one to keep.
+    """
+    blocks: Dict[str, List[Dict]] = {}
+    for persona in personas:
+        persona["tokens"] = normalize_name(persona["name"])
+        key = blocking_key(persona["tokens"])
+        if key:
+            blocks.setdefault(key, []).append(persona)
+    
+    clusters = []
+    for members in blocks.values():
+        if len(members) < 2:
+            continue
         
-        total_deleted = 0
+        # Greedy clustering against each cluster's keeper (members are recency-ordered)
+        block_clusters: List[List[Dict]] = []
+        for persona in members:
+            for cluster in block_clusters:
+                if persona_similarity(cluster[0], persona) >= threshold:
+                    cluster.append(persona)
+                    break
+            else:
+                block_clusters.append([persona])
         
-        for company_id, name, count in duplicates:
-            print(f"\nFound {count} duplicates for '{name}' at company_id={company_id}")
-            
-            # Get all personas with this company_id and name
-            personas = db.query(Persona).filter(
-                Persona.company_id == company_id,
-                Persona.name == name
-            ).order_by(
-                Persona.last_researched_at.desc().nullslast(),
-                Persona.updated_at.desc().nullslast(),
-                Persona.created_at.desc()
-            ).all()
+        clusters.extend(c for c in block_clusters if len(c) > 1)
+    
+    return clusters
+
+
+def merge_cluster(cluster: List[Dict]) -> Dict:
+    """Fill empty fields of the keeper from its duplicates, most recent first"""
+    keeper = cluster[0]
+    merged = {}
+    for field in MERGE_FIELDS:
+        if keeper.get(field):
+            continue
+        for duplicate in cluster[1:]:
+            if duplicate.get(field):
+                merged[field] = duplicate[field]
+                break
+    return merged
+
+
+def apply_clusters(db, clusters: List[List[Dict]]) -> int:
+    """Write merged fields, re-point queue items and delete merged duplicates"""
+    deleted = 0
+    for cluster in clusters:
+        keeper_id = cluster[0]["id"]
+        duplicate_ids = [p["id"] for p in cluster[1:]]
+        
+        merged = merge_cluster(cluster)
+        if merged:
+            assignments = ", ".join(f"{field} = :{field}" for field in merged)
+            db.execute(
+                text(f"UPDATE personas SET {assignments} WHERE id = :keep_id"),
+                {**merged, "keep_id": keeper_id}
+            )
+        
+        db.execute(
+            text("UPDATE research_queue SET persona_id = :keep_id WHERE persona_id = ANY(:ids)"),
+            {"keep_id": keeper_id, "ids": duplicate_ids}
+        )
+        db.execute(text("DELETE FROM personas WHERE id = ANY(:ids)"), {"ids": duplicate_ids})
+        deleted += len(duplicate_ids)
+    
+    return deleted
+
+
+def dedupe_exact(db, dry_run: bool) -> int:
+    """Collapse exact (company_id, name) duplicates in a single statement"""
+    if dry_run:
+        groups = db.execute(text(EXACT_DRY_RUN_SQL)).all()
+        removable = sum(row.count - 1 for row in groups)
+        for row in groups[:20]:
+            print(f"  '{row.name}' at company_id={row.company_id}: {row.count} rows")
+        if len(groups) > 20:
+            print(f"  ... and {len(groups) - 20} more groups")
+        print(f"  Exact pass would remove {removable} personas in {len(groups)} groups")
+        return removable
+    
+    row = db.execute(text(EXACT_DEDUP_SQL)).one()
+    db.commit()
+    print(f"  Merged {row.groups} groups, removed {row.deleted} personas, re-pointed {row.requeued} queue items")
+    return row.deleted
+
+
+def dedupe_fuzzy(db, threshold: float, batch_size: int, dry_run: bool) -> int:
+    """Stream personas by company and merge near-duplicate clusters in batches"""
+    total_deleted = 0
+    pending: List[List[Dict]] = []
+    pending_rows = 0
+    
+    # Read on a dedicated streaming connection so writes can commit independently
+    with engine.connect() as reader:
+        rows = reader.execution_options(stream_results=True, yield_per=batch_size).execute(
+            text(PERSONA_STREAM_SQL)
+        )
+        
+        for company_id, company_rows in groupby(rows.mappings(), key=lambda r: r["company_id"]):
+            personas = [dict(r) for r in company_rows]
+            clusters = cluster_company(personas, threshold)
             
-            # Keep the first one (most recent), delete the rest
-            keep = personas[0]
-            to_delete = personas[1:]
+            for cluster in clusters:
+                keeper = cluster[0]
+                print(f"  company_id={company_id}: keep {keeper['id']} '{keeper['name']}' <- "
+                      + ", ".join(f"{p['id']} '{p['name']}'" for p in cluster[1:]))
             
-            print(f"  Keeping persona ID {keep.id} (last_researched: {keep.last_researched_at})")
+            pending.extend(clusters)
+            pending_rows += len(personas)
             
-            for persona in to_delete:
-                print(f"  Deleting persona ID {persona.id} (last_researched: {persona.last_researched_at})")
-                db.delete(persona)
-                total_deleted += 1
+            if pending_rows >= batch_size:
+                total_deleted += _flush(db, pending, dry_run)
+                pending, pending_rows = [], 0
         
-        db.commit()
+        total_deleted += _flush(db, pending, dry_run)
+    
+    return total_deleted
+
+
+def _flush(db, clusters: List[List[Dict]], dry_run: bool) -> int:
+    if not clusters:
+        return 0
+    if dry_run:
+        # Exact-name members were already counted by the exact pass
+        return sum(len({p["name"] for p in c}) - 1 for c in clusters)
+    deleted = apply_clusters(db, clusters)
+    db.commit()
+    return deleted
+
+
+def deduplicate_personas(dry_run: bool = False, threshold: float = 0.85,
+                         batch_size: int = 1000, fuzzy: bool = True):
+    db = SessionLocal()
+    
+    try:
+        print("\nPass 1: exact (company_id, name) duplicates")
+        exact_removed = dedupe_exact(db, dry_run)
+        
+        fuzzy_removed = 0
+        if fuzzy:
+            print(f"\nPass 2: near duplicates (threshold={threshold})")
+            fuzzy_removed = dedupe_fuzzy(db, threshold, batch_size, dry_run)
         
-        print(f"\n✅ Deduplication complete!")
-        print(f"   Total duplicates removed: {total_deleted}")
+        label = "would be removed" if dry_run else "removed"
+        print(f"\n✅ Deduplication {'dry run ' if dry_run else ''}complete!")
+        print(f"   Exact duplicates {label}: {exact_removed}")
+        print(f"   Near duplicates {label}: {fuzzy_removed}")
         
-        # Show final persona count
-        total_personas = db.query(Persona).count()
-        print(f"   Total personas remaining: {total_personas}")
+        total_personas = db.execute(text("SELECT COUNT(*) FROM personas")).scalar()
+        print(f"   Total personas {'currently' if dry_run else 'remaining'}: {total_personas}")
         
+        if dry_run:
+            db.rollback()
+    
     except Exception as e:
         db.rollback()
         print(f"\n❌ Error during deduplication: {str(e)}")
@@ -66,6 +337,19 @@ def deduplicate_personas():
     finally:
         db.close()
 
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deduplicate personas")
+    parser.add_argument("--dry-run", action="store_true", help="Report duplicates without changing anything")
+    parser.add_argument("--threshold", type=float, default=0.85, help="Near-duplicate similarity threshold (0-1)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Persona rows per commit in the near-duplicate pass")
+    parser.add_argument("--exact-only", action="store_true", help="Skip the near-duplicate pass")
+    args = parser.parse_args()
+    
     print("Starting persona deduplication...")
-    deduplicate_personas()
+    deduplicate_personas(
+        dry_run=args.dry_run,
+        threshold=args.threshold,
+        batch_size=args.batch_size,
+        fuzzy=not args.exact_only
+    )
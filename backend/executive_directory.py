@@ -0,0 +1,160 @@
+"""
+Cross-report executive directory.
+
+Executives named in step 5 are recorded per company and search role
+(search_client.EXECUTIVE_ROLES) when a report is saved. The next run for
+the same company looks the directory up first: roles with an entry verified
+within EXECUTIVE_MAX_AGE_DAYS (default 90) go into the step 5 prompt as
+known executives and are not searched again. An entry's last_verified_at
+only moves when a run actually searched its role, so reused names still
+expire and get re-checked.
+
+Each lookup / record opens and closes its own short-lived session; the
+methods block, so async callers run them in a worker thread.
+"""
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from database import Company, Executive, SessionLocal
+from search_client import EXECUTIVE_ROLES
+from validation_rules import is_placeholder_name
+
+# Title patterns (on the lowercased, punctuation-free title) per search role, checked in order
+ROLE_PATTERNS = [
+    ("CFO Chief Financial Officer", r"\bcfo\b|chief financial officer"),
+    ("CTO Chief Technology Officer", r"\bcto\b|chief technology officer"),
+    ("COO Chief Operating Officer", r"\bcoo\b|chief operating officer"),
+    ("CRO Chief Risk Officer", r"\bcro\b|chief risk officer"),
+    ("CDO Chief Data Officer", r"\bcdo\b|chief data"),
+    ("CISO Chief Information Security Officer", r"\bciso\b|chief information security officer"),
+    ("VP Vice President Operations", r"\b(vp|vice president)( \w+)? operations\b"),
+    ("VP Technology Innovation", r"\b(vp|vice president)( \w+)? (technology|innovation)\b"),
+    ("Business Unit Head EVP SVP", r"\b(evp|svp|executive vice president|senior vice president|head)\b"),
+    ("Division President", r"(?<!vice )\bpresident\b"),
+]
+
+# Titles that contain a pattern above but aren't one of the searched roles
+_UNSEARCHED_TITLES = re.compile(r"\bceo\b|chief executive")
+
+MAX_FIELD_LENGTH = 255  # String(255) columns
+
+
+def role_for_title(title: Optional[str]) -> Optional[str]:
+    """The search role a job title fills, or None"""
+    normalized = " ".join(re.sub(r"[^a-z0-9]+", " ", (title or "").lower()).split())
+    if not normalized or _UNSEARCHED_TITLES.search(normalized):
+        return None
+    for role, pattern in ROLE_PATTERNS:
+        if re.search(pattern, normalized):
+            return role
+    return None
+
+
+def _source_url(persona: Dict, citations: List[Dict]) -> Optional[str]:
+    """The persona's data_source if it is a URL, else a step citation whose title names them"""
+    source = (persona.get("data_source") or "").strip()
+    if source.startswith("http"):
+        return source
+    surname = persona["name"].split()[-1].lower()
+    for citation in citations:
+        if surname in citation.get("title", "").lower():
+            return citation.get("url")
+    return None
+
+
+def known_executives_context(known: Dict[str, List[Dict]]) -> str:
+    """Render directory entries for the step 5 prompt"""
+    if not known:
+        return ""
+    lines = ["=== KNOWN EXECUTIVES (FROM EARLIER RESEARCH) ===\n"]
+    for role, entries in known.items():
+        for entry in entries:
+            source = f", source: {entry['source_url']}" if entry["source_url"] else ""
+            lines.append(f"- {entry['name']} - {entry['title'] or role} (verified {entry['last_verified_at'][:10]}{source})")
+    lines.append("\nUse these names for their roles unless the search results show someone else now holds the role.")
+    lines.append("=== END OF KNOWN EXECUTIVES ===\n")
+    return "\n".join(lines)
+
+
+class ExecutiveDirectory:
+    """Lookup and recording of a company's executives"""
+    
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal, max_age_days: Optional[int] = None):
+        self.session_factory = session_factory
+        self.max_age_days = max_age_days or int(os.getenv("EXECUTIVE_MAX_AGE_DAYS", "90"))
+    
+    def lookup(self, company_name: str) -> Dict[str, List[Dict]]:
+        """Entries verified within the freshness window, by search role (most recent first)"""
+        cutoff = datetime.now() - timedelta(days=self.max_age_days)
+        db = self.session_factory()
+        try:
+            rows = (
+                db.query(Executive)
+                .join(Company, Company.id == Executive.company_id)
+                .filter(Company.name == company_name, Executive.last_verified_at >= cutoff)
+                .order_by(Executive.role, Executive.last_verified_at.desc())
+                .all()
+            )
+        finally:
+            db.close()
+        
+        known: Dict[str, List[Dict]] = {}
+        for row in rows:
+            known.setdefault(row.role, []).append({
+                "name": row.name,
+                "title": row.title,
+                "source_url": row.source_url,
+                "last_verified_at": row.last_verified_at.isoformat()
+            })
+        return known
+    
+    def record(
+        self,
+        company_id: int,
+        personas: List[Dict],
+        searched_roles: Optional[Iterable[str]] = None,
+        citations: Optional[List[Dict]] = None
+    ) -> int:
+        """
+        Upsert named personas whose title fills a search role and commit. Only
+        roles the run searched (every role when unknown, e.g. older clients)
+        are recorded: a name repeated from the directory context isn't a new
+        verification. The company must already be committed. Returns the
+        number of entries written.
+        """
+        searched = set(EXECUTIVE_ROLES if searched_roles is None else searched_roles)
+        now = datetime.now()
+        db = self.session_factory()
+        try:
+            entries: Dict[tuple, Executive] = {}  # the session doesn't autoflush, so track this batch's rows
+            for persona in personas:
+                if not isinstance(persona, dict) or is_placeholder_name(persona.get("name")):
+                    continue
+                role = role_for_title(persona.get("title"))
+                if role not in searched:
+                    continue
+                
+                name = persona["name"].strip()[:MAX_FIELD_LENGTH]
+                entry = entries.get((role, name)) or db.query(Executive).filter(
+                    Executive.company_id == company_id,
+                    Executive.role == role,
+                    Executive.name == name
+                ).first()
+                if entry is None:
+                    entry = Executive(company_id=company_id, role=role, name=name, first_seen_at=now)
+                    db.add(entry)
+                entries[(role, name)] = entry
+                entry.title = (persona.get("title") or "")[:MAX_FIELD_LENGTH]
+                entry.source_url = _source_url(persona, citations or []) or entry.source_url
+                entry.last_verified_at = now
+            db.commit()
+            return len(entries)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
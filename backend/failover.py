@@ -0,0 +1,304 @@
+"""
+Provider failover and hedged requests on top of LLMClient.
+
+FailoverLLMClient has the same call_llm / stream_llm interface as
+LLMClient and wraps a primary client plus an optional secondary provider:
+
+- Failover: when the primary errors, times out or has an open circuit,
+  the call is sent to the secondary instead. Streams only fail over before
+  their first delta, since the caller has already consumed partial output;
+  the failover timeout is on that first delta, so a long generation that
+  has started is never cut off. Non-streamed calls time out at a multiple
+  of the primary's observed p95 latency.
+- Hedging: if the primary hasn't answered (or, for streams, produced a
+  first token) within the hedge delay, a backup request is fired at the
+  secondary provider (or the primary again) and whichever answers first
+  wins. The delay is configured or taken from the observed p95 latency.
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from typing import AsyncGenerator, Deque, Dict, List, Optional
+
+from llm_client import LLMClient
+from model_routing import ModelRouter
+from resilience import RetryPolicy
+
+# Samples needed before the observed p95 replaces the default hedge delay
+MIN_LATENCY_SAMPLES = 10
+
+# Non-streamed primary calls fail over after this multiple of the observed p95
+FAILOVER_P95_FACTOR = 3
+
+
+class LatencyTracker:
+    """Recent latencies per provider and call kind ("call" = full response, "stream" = first token)"""
+    
+    def __init__(self, window: int = 100):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+    
+    def record(self, provider: str, kind: str, seconds: float):
+        self._samples.setdefault(f"{provider}:{kind}", deque(maxlen=self.window)).append(seconds)
+    
+    def p95(self, provider: str, kind: str) -> Optional[float]:
+        samples = sorted(self._samples.get(f"{provider}:{kind}", ()))
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return None
+        return samples[int(0.95 * (len(samples) - 1))]
+
+
+latency_tracker = LatencyTracker()
+
+
+class FailoverLLMClient:
+    """LLMClient-compatible client with optional provider failover and hedged requests"""
+    
+    def __init__(
+        self,
+        provider: str,
+        api_key: str,
+        fallback_provider: Optional[str] = None,
+        fallback_api_key: Optional[str] = None,
+        hedge_delay_seconds: Optional[float] = None,
+        router: Optional[ModelRouter] = None,
+        tool_schemas: Optional[List[dict]] = None
+    ):
+        self.fallback = None
+        primary_policy = None
+        if fallback_provider:
+            self.fallback = LLMClient(provider=fallback_provider, api_key=fallback_api_key, tool_schemas=tool_schemas)
+            # Give up on the primary sooner when there is somewhere else to go: streams
+            # with no first token within LLM_FAILOVER_TIMEOUT_SECONDS move to the fallback
+            primary_policy = RetryPolicy(
+                max_attempts=2,
+                deadline=float(os.getenv("LLM_CALL_DEADLINE_SECONDS", "600")),
+                first_item_timeout=float(os.getenv("LLM_FAILOVER_TIMEOUT_SECONDS", "30"))
+            )
+        self.primary = LLMClient(
+            provider=provider, api_key=api_key, retry_policy=primary_policy, tool_schemas=tool_schemas
+        )
+        
+        self.provider = self.primary.provider
+        self.model = self.primary.model
+        self.hedge_delay_seconds = hedge_delay_seconds
+        self.router = router or ModelRouter()
+        
+        self.stats = {"failovers": 0, "hedged_requests": 0, "hedge_wins": 0}
+    
+    @property
+    def clients(self) -> List[LLMClient]:
+        return [self.primary] + ([self.fallback] if self.fallback else [])
+    
+    @property
+    def total_tokens(self) -> int:
+        return sum(client.total_tokens for client in self.clients)
+    
+    @property
+    def usage(self) -> Dict[str, int]:
+        usage = {}
+        for client in self.clients:
+            for key, value in client.usage.items():
+                usage[key] = usage.get(key, 0) + value
+        return usage
+    
+    @property
+    def rate_limit_wait_seconds(self) -> float:
+        return sum(client.rate_limit_wait_seconds for client in self.clients)
+    
+    @property
+    def model_usage(self) -> Dict[str, Dict]:
+        usage = {}
+        for client in self.clients:
+            usage.update(client.model_usage)
+        return usage
+    
+    def hedge_delay(self, kind: str) -> float:
+        """Configured delay, else the primary's observed p95, else HEDGE_DELAY_SECONDS"""
+        if self.hedge_delay_seconds is not None:
+            return self.hedge_delay_seconds
+        p95 = latency_tracker.p95(self.primary.provider, kind)
+        return p95 if p95 is not None else float(os.getenv("HEDGE_DELAY_SECONDS", "30"))
+    
+    def failover_deadline(self) -> Optional[float]:
+        """Deadline for a non-streamed primary call: a multiple of its observed p95, once known"""
+        if not self.fallback:
+            return None
+        p95 = latency_tracker.p95(self.primary.provider, "call")
+        return p95 * FAILOVER_P95_FACTOR if p95 is not None else None
+    
+    async def call_llm(
+        self,
+        prompt: str,
+        max_tokens: int = 4000,
+        json_schema: dict = None,
+        hedge: bool = False,
+        route: str = None,
+        prefix: str = None
+    ) -> str:
+        """
+        Call the primary, failing over to the secondary on error; optionally hedged.
+        `route` picks the model for each provider (see model_routing.py).
+        """
+        if hedge:
+            return await self._hedged_call(prompt, max_tokens, json_schema, route, prefix)
+        
+        try:
+            return await self._timed_call(self.primary, prompt, max_tokens, json_schema, route, prefix)
+        except Exception:
+            if not self.fallback:
+                raise
+            self.stats["failovers"] += 1
+            return await self._timed_call(self.fallback, prompt, max_tokens, json_schema, route, prefix)
+    
+    async def stream_llm(
+        self,
+        prompt: str,
+        max_tokens: int = 4000,
+        json_schema: dict = None,
+        hedge: bool = False,
+        route: str = None,
+        prefix: str = None
+    ) -> AsyncGenerator[str, None]:
+        """Stream from the primary, failing over before the first delta; optionally hedged"""
+        if hedge:
+            stream = self._hedged_stream(prompt, max_tokens, json_schema, route, prefix)
+        else:
+            stream = self._failover_stream(prompt, max_tokens, json_schema, route, prefix)
+        
+        async for delta in stream:
+            yield delta
+    
+    async def _timed_call(
+        self,
+        client: LLMClient,
+        prompt: str,
+        max_tokens: int,
+        json_schema: dict,
+        route: Optional[str],
+        prefix: Optional[str]
+    ) -> str:
+        model = self.router.model_for(client.provider, route)
+        deadline = self.failover_deadline() if client is self.primary else None
+        started = time.monotonic()
+        text = await client.call_llm(prompt, max_tokens, json_schema, model, prefix, deadline=deadline)
+        latency_tracker.record(client.provider, "call", time.monotonic() - started)
+        return text
+    
+    async def _timed_stream(
+        self,
+        client: LLMClient,
+        prompt: str,
+        max_tokens: int,
+        json_schema: dict,
+        route: Optional[str],
+        prefix: Optional[str]
+    ) -> AsyncGenerator[str, None]:
+        model = self.router.model_for(client.provider, route)
+        started = time.monotonic()
+        first = True
+        async for delta in client.stream_llm(prompt, max_tokens, json_schema, model, prefix):
+            if first:
+                latency_tracker.record(client.provider, "stream", time.monotonic() - started)
+                first = False
+            yield delta
+    
+    async def _failover_stream(
+        self, prompt: str, max_tokens: int, json_schema: dict, route: Optional[str], prefix: Optional[str]
+    ) -> AsyncGenerator[str, None]:
+        started = False
+        try:
+            async for delta in self._timed_stream(self.primary, prompt, max_tokens, json_schema, route, prefix):
+                started = True
+                yield delta
+            return
+        except Exception:
+            if started or not self.fallback:
+                raise
+            self.stats["failovers"] += 1
+        
+        async for delta in self._timed_stream(self.fallback, prompt, max_tokens, json_schema, route, prefix):
+            yield delta
+    
+    async def _hedged_call(
+        self, prompt: str, max_tokens: int, json_schema: dict, route: Optional[str], prefix: Optional[str]
+    ) -> str:
+        backup_client = self.fallback or self.primary
+        primary = asyncio.ensure_future(
+            self._timed_call(self.primary, prompt, max_tokens, json_schema, route, prefix)
+        )
+        
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay("call"))
+        if done and not primary.exception():
+            return primary.result()
+        
+        # Primary is slow (or already failed): race a backup request against it
+        self.stats["hedged_requests"] += 1
+        backup = asyncio.ensure_future(
+            self._timed_call(backup_client, prompt, max_tokens, json_schema, route, prefix)
+        )
+        pending = {backup} if done else {primary, backup}
+        error = primary.exception() if done else None
+        
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception():
+                        error = task.exception()
+                        continue
+                    if task is backup:
+                        self.stats["hedge_wins"] += 1
+                    return task.result()
+            raise error
+        finally:
+            for task in (primary, backup):
+                task.cancel()
+    
+    async def _hedged_stream(
+        self, prompt: str, max_tokens: int, json_schema: dict, route: Optional[str], prefix: Optional[str]
+    ) -> AsyncGenerator[str, None]:
+        backup_client = self.fallback or self.primary
+        streams = {"primary": self._timed_stream(self.primary, prompt, max_tokens, json_schema, route, prefix)}
+        firsts = {"primary": asyncio.ensure_future(streams["primary"].__anext__())}
+        
+        done, _ = await asyncio.wait(set(firsts.values()), timeout=self.hedge_delay("stream"))
+        if not done or firsts["primary"].exception():
+            # No first token yet (or the primary failed): race a backup stream for the first token
+            self.stats["hedged_requests"] += 1
+            streams["backup"] = self._timed_stream(backup_client, prompt, max_tokens, json_schema, route, prefix)
+            firsts["backup"] = asyncio.ensure_future(streams["backup"].__anext__())
+        
+        winner = None
+        error = None
+        pending = set(firsts.values())
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for name, task in firsts.items():
+                if task in done and winner is None:
+                    if task.exception():
+                        error = task.exception()
+                    else:
+                        winner = name
+        
+        # Stop the losing stream before continuing with the winner
+        for name, task in firsts.items():
+            if name != winner:
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+                await streams[name].aclose()
+        
+        if winner is None:
+            if isinstance(error, StopAsyncIteration):
+                return
+            raise error
+        if winner == "backup":
+            self.stats["hedge_wins"] += 1
+        
+        yield firsts[winner].result()
+        async for delta in streams[winner]:
+            yield delta
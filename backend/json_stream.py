@@ -0,0 +1,171 @@
+"""
+Incremental, tolerant JSON parser for streamed LLM output.
+
+Feed text chunks as they arrive; every element of an array directly under
+the root object (e.g. each entry of "personas" or "business_units") is
+emitted as soon as it closes. Leading prose and ```json fences are skipped, and anything
+after the root object closes (trailing fences, commentary) is ignored.
+Each character is scanned once.
+"""
+import json
+from typing import Any, Dict, List, Optional
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class IncrementalJSONParser:
+    """Streaming scanner that tracks JSON nesting and emits completed array items"""
+    
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0  # next character to scan
+        self.root_start: Optional[int] = None
+        self.root_end: Optional[int] = None
+        self.stack: List[str] = []
+        self.in_string = False
+        self.escape = False
+        
+        # Key tracking inside the root object
+        self.string_start: Optional[int] = None
+        self.last_string: Optional[str] = None
+        self.current_key: Optional[str] = None
+        
+        # Top-level array element tracking
+        self.array_key: Optional[str] = None
+        self.element_start: Optional[int] = None
+        self.element_counts: Dict[str, int] = {}
+        
+        # Last point where every open value was complete, for truncated output
+        self.safe_end: Optional[int] = None
+        self.safe_stack: List[str] = []
+        self.truncated = False
+    
+    @property
+    def complete(self) -> bool:
+        return self.root_end is not None
+    
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """
+        Consume a chunk and return newly completed top-level array elements.
+        
+        Each event is {"key": <array key>, "index": n, "item": value}.
+        """
+        self.buffer += chunk
+        events = []
+        
+        while self.pos < len(self.buffer) and self.root_end is None:
+            i = self.pos
+            char = self.buffer[i]
+            self.pos += 1
+            
+            if self.root_start is None:
+                # Skip prose and code fences until the root object opens
+                if char == "{":
+                    self.root_start = i
+                    self.stack.append(char)
+                continue
+            
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+                    if len(self.stack) == 1:
+                        self.last_string = self.buffer[self.string_start + 1:i]
+                continue
+            
+            if char.isspace():
+                continue
+            
+            if self._in_top_level_array() and self.element_start is None and char not in ",]":
+                self.element_start = i
+            
+            if char == '"':
+                self.in_string = True
+                self.string_start = i
+            elif char == ":" and len(self.stack) == 1:
+                self.current_key = self.last_string
+            elif char in _CLOSERS:
+                if char == "[" and len(self.stack) == 1:
+                    self.array_key = self.current_key
+                    self.element_start = None
+                self.stack.append(char)
+            elif char in "}]":
+                if not self.stack or _CLOSERS[self.stack[-1]] != char:
+                    # Mismatched close - give up on this root and look for the next one
+                    self._restart(self.root_start + 1)
+                    continue
+                
+                if char == "]" and self._in_top_level_array():
+                    events.extend(self._finish_element(i))
+                
+                self.stack.pop()
+                self.safe_end, self.safe_stack = i + 1, list(self.stack)
+                
+                if not self.stack:
+                    self.root_end = i
+                elif self._in_top_level_array() and self.element_start is not None:
+                    # An object/array element just closed
+                    events.extend(self._finish_element(i + 1))
+            elif char == "," and self._in_top_level_array():
+                events.extend(self._finish_element(i))
+        
+        return events
+    
+    def result(self) -> Any:
+        """
+        Parse the root value.
+        
+        Raises ValueError if no JSON value was found. Output cut off mid-value is
+        closed at the last complete element and `truncated` is set.
+        """
+        if self.root_start is None:
+            raise ValueError("No JSON value found")
+        
+        if self.root_end is not None:
+            return json.loads(self.buffer[self.root_start:self.root_end + 1])
+        
+        if self.safe_end is None:
+            raise ValueError("JSON value is incomplete")
+        
+        self.truncated = True
+        text = self.buffer[self.root_start:self.safe_end].rstrip().rstrip(",")
+        closers = "".join(_CLOSERS[opener] for opener in reversed(self.safe_stack))
+        return json.loads(text + closers)
+    
+    def _in_top_level_array(self) -> bool:
+        return len(self.stack) == 2 and self.stack[1] == "["
+    
+    def _finish_element(self, end: int) -> List[Dict[str, Any]]:
+        if self.element_start is None:
+            return []
+        
+        text = self.buffer[self.element_start:end].strip()
+        self.element_start = None
+        if not text:
+            return []
+        
+        try:
+            item = json.loads(text)
+        except json.JSONDecodeError:
+            return []
+        
+        index = self.element_counts.get(self.array_key, 0)
+        self.element_counts[self.array_key] = index + 1
+        return [{"key": self.array_key, "index": index, "item": item}]
+    
+    def _restart(self, pos: int):
+        """Discard the current root and resume scanning at pos"""
+        buffer = self.buffer
+        self.__init__()
+        self.buffer = buffer
+        self.pos = pos
+
+
+def parse_json_text(text: str) -> Any:
+    """Parse JSON embedded in LLM text (code fences, leading/trailing prose)"""
+    parser = IncrementalJSONParser()
+    parser.feed(text)
+    return parser.result()
@@ -2,8 +2,10 @@
 Judge LLM Client - Uses OpenAI GPT-4o for independent validation
 """
 import os
-from openai import OpenAI
-from typing import Dict, Any
+from openai import AsyncOpenAI
+from typing import Dict, Any, Tuple
+
+SYSTEM_PROMPT = "You are a research quality validator. Analyze research outputs for accuracy, citation quality, consistency, and adherence to specifications. Provide objective, detailed assessments."
 
 class JudgeLLMClient:
     """Separate LLM client for validating research quality"""
@@ -13,39 +15,38 @@ class JudgeLLMClient:
         if not self.api_key:
             raise ValueError("OpenAI API key required for judge LLM")
         
-        self.client = OpenAI(api_key=self.api_key)
+        self.client = AsyncOpenAI(api_key=self.api_key)
         self.model = "gpt-4o"
     
-    def validate(self, prompt: str, temperature: float = 0.1) -> str:
+    async def validate_json(
+        self, prompt: str, json_schema: Dict[str, Any], max_tokens: int = 2000, temperature: float = 0.1
+    ) -> Tuple[str, str]:
         """
-        Call judge LLM with low temperature for consistent validation
+        Call judge LLM with a strict JSON schema as the response format
         
-        Args:
-            prompt: Validation prompt with context and instructions
-            temperature: Low temperature for deterministic results
-            
         Returns:
-            Validation response as string
+            (content, finish_reason) - finish_reason "length" means the
+            output hit max_tokens and is incomplete
         """
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a research quality validator. Analyze research outputs for accuracy, citation quality, consistency, and adherence to specifications. Provide objective, detailed assessments."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
                 ],
                 temperature=temperature,
-                max_tokens=2000
+                max_tokens=max_tokens,
+                response_format={"type": "json_schema", "json_schema": json_schema}
             )
             
-            return response.choices[0].message.content.strip()
+            choice = response.choices[0]
+            return choice.message.content or "", choice.finish_reason
         
         except Exception as e:
             print(f"Judge LLM error: {e}")
             raise
+    
+    async def close(self):
+        """Close the underlying HTTP connection pool"""
+        await self.client.close()
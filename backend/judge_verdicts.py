@@ -0,0 +1,59 @@
+"""
+Typed judge verdicts.
+
+Judge calls request strict JSON-schema output (the verdict schemas in
+schemas.py); these models parse it. Output that was cut off, isn't JSON or
+doesn't match the model raises JudgeOutputError with the reason - a verdict
+is never filled in with a guessed score.
+"""
+from typing import Dict, List, Literal, Type, TypeVar
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+
+Status = Literal["RED", "YELLOW", "GREEN"]
+
+
+class JudgeOutputError(ValueError):
+    """Judge output that can't be used as a verdict"""
+
+
+class _Verdict(BaseModel):
+    model_config = ConfigDict(extra="forbid", strict=True)
+
+
+class StepVerdict(_Verdict):
+    score: int = Field(ge=0, le=100)
+    status: Status
+    issues: List[str]
+    strengths: List[str]
+    recommendations: List[str]
+
+
+class OverallVerdict(_Verdict):
+    score: int = Field(ge=0, le=100)
+    status: Status
+    critical_issues: List[str]
+    warnings: List[str]
+    assessment: str
+    recommendations: List[str]
+
+
+class ReportVerdict(_Verdict):
+    """Batch mode: every step's verdict plus the overall one"""
+    steps: Dict[str, StepVerdict]
+    overall: OverallVerdict
+
+
+V = TypeVar("V", bound=_Verdict)
+
+
+def parse_verdict(model: Type[V], content: str, finish_reason: str) -> V:
+    """Parse judge output as `model`, raising JudgeOutputError if it's truncated or doesn't conform"""
+    if finish_reason == "length":
+        raise JudgeOutputError("output was truncated at the token limit")
+    try:
+        return model.model_validate_json(content)
+    except ValidationError as e:
+        error = e.errors()[0]
+        location = ".".join(str(part) for part in error["loc"]) or "output"
+        raise JudgeOutputError(f"{e.error_count()} problem(s) in judge output, e.g. {location}: {error['msg']}")
@@ -1,12 +1,25 @@
 # -*- coding: utf-8 -*-
 import os
+import json
+import time
 import httpx
-from typing import Optional
+from typing import AsyncGenerator, List, Optional
+from rate_limiter import estimate_tokens, get_rate_limiter
+from resilience import RetryPolicy, TransientProviderError, call_with_retry, get_breaker, stream_with_retry
+
+# Error event types Anthropic can send mid-stream that are worth retrying
+ANTHROPIC_TRANSIENT_ERRORS = {"overloaded_error", "rate_limit_error", "api_error"}
 
 class LLMClient:
     """Simple LLM client supporting Anthropic Claude and OpenAI"""
     
-    def __init__(self, provider: str = "anthropic", api_key: Optional[str] = None):
+    def __init__(
+        self,
+        provider: str = "anthropic",
+        api_key: Optional[str] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        tool_schemas: Optional[List[dict]] = None
+    ):
         self.provider = provider.lower()
         self.api_key = api_key or os.getenv(f"{provider.upper()}_API_KEY")
         
@@ -21,23 +34,112 @@ class LLMClient:
             self.model = "gpt-4o-2024-11-20"
         else:
             raise ValueError(f"Unsupported provider: {provider}")
+        
+        # Retries with backoff on 429/529/5xx/timeouts; one circuit breaker per provider and key
+        self.retry_policy = retry_policy or RetryPolicy(
+            max_attempts=int(os.getenv("LLM_MAX_ATTEMPTS", "4")),
+            deadline=float(os.getenv("LLM_CALL_DEADLINE_SECONDS", "600"))
+        )
+        self.breaker = get_breaker(self.provider, self.api_key)
+        
+        # Every schema the caller will use; sent together as Anthropic tools so the
+        # tools block (first in the prompt cache prefix) is identical across steps
+        self.tool_schemas = tool_schemas or []
+        
+        # Calls queue on per-key RPM/TPM buckets shared with other runs using the same key
+        self.rate_limiter = get_rate_limiter(self.provider, self.api_key)
+        self.rate_limit_wait_seconds = 0.0
+        
+        # Token usage reported by the provider, summed over all calls made with this client
+        self.usage = {"input_tokens": 0, "output_tokens": 0, "cache_read_tokens": 0, "cache_creation_tokens": 0}
+        # Per model: {"calls", "input_tokens", "output_tokens", "cache_read_tokens", "latency_seconds"}
+        self.model_usage = {}
+    
+    @property
+    def total_tokens(self) -> int:
+        return self.usage["input_tokens"] + self.usage["output_tokens"]
     
-    async def call_llm(self, prompt: str, max_tokens: int = 4000, json_schema: dict = None) -> str:
+    async def call_llm(
+        self,
+        prompt: str,
+        max_tokens: int = 4000,
+        json_schema: dict = None,
+        model: str = None,
+        prefix: str = None,
+        deadline: Optional[float] = None
+    ) -> str:
         """Call LLM API and return response text
         
         Args:
             prompt: The prompt text
             max_tokens: Maximum tokens in response
-            json_schema: Optional JSON schema for structured output
+            json_schema: Optional {"name", "strict", "schema"} definition (see schemas.py)
+                for structured output
+            model: Model to use instead of the client default (see model_routing.py)
+            prefix: Optional context shared across calls, sent ahead of the prompt and
+                marked for provider prompt caching
+            deadline: Seconds for this call including retries, instead of the policy's deadline
         """
         
-        if self.provider == "anthropic":
-            return await self._call_anthropic(prompt, max_tokens, json_schema)
-        elif self.provider == "openai":
-            return await self._call_openai(prompt, max_tokens, json_schema)
+        call = self._call_anthropic if self.provider == "anthropic" else self._call_openai
+        model = model or self.model
+        
+        async def attempt():
+            usage = {}
+            reserved = estimate_tokens((prefix or "") + prompt, max_tokens)
+            self.rate_limit_wait_seconds += await self.rate_limiter.acquire(reserved)
+            started = time.monotonic()
+            try:
+                return await call(prompt, max_tokens, json_schema, usage, model, prefix)
+            finally:
+                await self._settle_usage(reserved, usage, model, time.monotonic() - started)
+        
+        policy = self.retry_policy if deadline is None else self.retry_policy.with_deadline(deadline)
+        return await call_with_retry(attempt, self.breaker, policy)
     
-    async def _call_anthropic(self, prompt: str, max_tokens: int, json_schema: dict = None) -> str:
-        """Call Anthropic Claude API"""
+    async def stream_llm(
+        self, prompt: str, max_tokens: int = 4000, json_schema: dict = None, model: str = None, prefix: str = None
+    ) -> AsyncGenerator[str, None]:
+        """Call LLM API in streaming mode, yielding text deltas as they arrive
+        
+        Joining all yielded deltas gives the same text call_llm would return.
+        Failures are only retried before the first delta has been yielded.
+        """
+        stream = self._stream_anthropic if self.provider == "anthropic" else self._stream_openai
+        model = model or self.model
+        
+        async def open_stream():
+            usage = {}
+            reserved = estimate_tokens((prefix or "") + prompt, max_tokens)
+            self.rate_limit_wait_seconds += await self.rate_limiter.acquire(reserved)
+            started = time.monotonic()
+            try:
+                async for delta in stream(prompt, max_tokens, json_schema, usage, model, prefix):
+                    yield delta
+            finally:
+                await self._settle_usage(reserved, usage, model, time.monotonic() - started)
+        
+        async for delta in stream_with_retry(open_stream, self.breaker, self.retry_policy):
+            yield delta
+    
+    async def _settle_usage(self, reserved: int, usage: dict, model: str, latency: float):
+        """Add a call's reported usage to the totals and true up its rate limit reservation"""
+        used = usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+        for key in self.usage:
+            self.usage[key] += usage.get(key, 0)
+        
+        stats = self.model_usage.setdefault(
+            model, {"calls": 0, "input_tokens": 0, "output_tokens": 0, "cache_read_tokens": 0, "latency_seconds": 0.0}
+        )
+        stats["calls"] += 1
+        for key in ("input_tokens", "output_tokens", "cache_read_tokens"):
+            stats[key] += usage.get(key, 0)
+        stats["latency_seconds"] = round(stats["latency_seconds"] + latency, 2)
+        
+        await self.rate_limiter.settle(reserved, used)
+    
+    def _anthropic_request(self, prompt: str, max_tokens: int, json_schema: dict = None, model: str = None, prefix: str = None):
+        """Build Anthropic headers and payload"""
         headers = {
             "x-api-key": self.api_key,
             "anthropic-version": "2023-06-01",
@@ -45,7 +147,7 @@ class LLMClient:
         }
         
         payload = {
-            "model": self.model,
+            "model": model or self.model,
             "max_tokens": max_tokens,
             "messages": [
                 {
@@ -55,31 +157,35 @@ class LLMClient:
             ]
         }
         
-        # Add structured output if schema provided (Claude doesn't natively support, but we can add to prompt)
+        # Shared context goes in the system prompt with a cache breakpoint, so later
+        # calls with the same tools and prefix read it from the prompt cache
+        if prefix:
+            payload["system"] = [{"type": "text", "text": prefix, "cache_control": {"type": "ephemeral"}}]
+        
+        # Add structured output if schema provided: force a single tool call whose input is the schema
         if json_schema:
-            payload["messages"][0]["content"] += f"\n\nIMPORTANT: Return ONLY valid JSON matching this exact schema:\n{json_schema}"
+            schemas = self.tool_schemas if json_schema in self.tool_schemas else [json_schema]
+            payload["tools"] = [
+                {
+                    "name": schema["name"],
+                    "description": "Return the result as structured data matching the input schema",
+                    "input_schema": schema["schema"]
+                }
+                for schema in schemas
+            ]
+            payload["tool_choice"] = {"type": "tool", "name": json_schema["name"]}
         
-        async with httpx.AsyncClient(timeout=300.0) as client:
-            response = await client.post(
-                self.api_url,
-                headers=headers,
-                json=payload
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            # Extract text from Claude response
-            return data["content"][0]["text"]
+        return headers, payload
     
-    async def _call_openai(self, prompt: str, max_tokens: int, json_schema: dict = None) -> str:
-        """Call OpenAI GPT API"""
+    def _openai_request(self, prompt: str, max_tokens: int, json_schema: dict = None, model: str = None, prefix: str = None):
+        """Build OpenAI headers and payload"""
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
         
         payload = {
-            "model": self.model,
+            "model": model or self.model,
             "messages": [
                 {
                     "role": "user",
@@ -89,6 +195,10 @@ class LLMClient:
             "max_tokens": max_tokens
         }
         
+        # OpenAI caches repeated prompt prefixes automatically; keep the shared context first
+        if prefix:
+            payload["messages"].insert(0, {"role": "system", "content": prefix})
+        
         # Add structured output if schema provided (OpenAI supports response_format)
         if json_schema:
             payload["response_format"] = {
@@ -96,6 +206,40 @@ class LLMClient:
                 "json_schema": json_schema
             }
         
+        return headers, payload
+    
+    async def _call_anthropic(
+        self, prompt: str, max_tokens: int, json_schema: dict = None, usage: dict = None, model: str = None,
+        prefix: str = None
+    ) -> str:
+        """Call Anthropic Claude API"""
+        headers, payload = self._anthropic_request(prompt, max_tokens, json_schema, model, prefix)
+        
+        async with httpx.AsyncClient(timeout=300.0) as client:
+            response = await client.post(
+                self.api_url,
+                headers=headers,
+                json=payload
+            )
+            response.raise_for_status()
+            data = response.json()
+            
+            if usage is not None:
+                self._anthropic_usage(usage, data.get("usage", {}))
+            
+            # Extract text from Claude response (tool input when structured output was forced)
+            for block in data["content"]:
+                if block["type"] == "tool_use":
+                    return json.dumps(block["input"])
+            return data["content"][0]["text"]
+    
+    async def _call_openai(
+        self, prompt: str, max_tokens: int, json_schema: dict = None, usage: dict = None, model: str = None,
+        prefix: str = None
+    ) -> str:
+        """Call OpenAI GPT API"""
+        headers, payload = self._openai_request(prompt, max_tokens, json_schema, model, prefix)
+        
         async with httpx.AsyncClient(timeout=300.0) as client:
             response = await client.post(
                 self.api_url,
@@ -105,5 +249,88 @@ class LLMClient:
             response.raise_for_status()
             data = response.json()
             
+            if usage is not None:
+                self._openai_usage(usage, data.get("usage", {}))
+            
             # Extract text from OpenAI response
             return data["choices"][0]["message"]["content"]
+    
+    @staticmethod
+    def _anthropic_usage(usage: dict, reported: dict):
+        """Normalize Anthropic usage; input_tokens counts cached prompt tokens too, as OpenAI's does"""
+        cache_read = reported.get("cache_read_input_tokens") or 0
+        cache_creation = reported.get("cache_creation_input_tokens") or 0
+        usage["input_tokens"] = reported.get("input_tokens", 0) + cache_read + cache_creation
+        usage["output_tokens"] = reported.get("output_tokens", 0)
+        usage["cache_read_tokens"] = cache_read
+        usage["cache_creation_tokens"] = cache_creation
+    
+    @staticmethod
+    def _openai_usage(usage: dict, reported: dict):
+        """Normalize OpenAI usage (prompt caching is automatic; cached tokens are reported as a detail)"""
+        usage["input_tokens"] = reported.get("prompt_tokens", 0)
+        usage["output_tokens"] = reported.get("completion_tokens", 0)
+        usage["cache_read_tokens"] = (reported.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+        usage["cache_creation_tokens"] = 0
+    
+    async def _stream_events(self, headers: dict, payload: dict) -> AsyncGenerator[dict, None]:
+        """POST a streaming request and yield each server-sent event's JSON payload"""
+        async with httpx.AsyncClient(timeout=300.0) as client:
+            async with client.stream("POST", self.api_url, headers=headers, json=payload) as response:
+                if response.status_code >= 400:
+                    await response.aread()
+                    response.raise_for_status()
+                
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if not data or data == "[DONE]":
+                        continue
+                    yield json.loads(data)
+    
+    async def _stream_anthropic(
+        self, prompt: str, max_tokens: int, json_schema: dict = None, usage: dict = None, model: str = None,
+        prefix: str = None
+    ) -> AsyncGenerator[str, None]:
+        """Stream Anthropic Claude API text deltas"""
+        headers, payload = self._anthropic_request(prompt, max_tokens, json_schema, model, prefix)
+        payload["stream"] = True
+        usage = usage if usage is not None else {}
+        
+        async for event in self._stream_events(headers, payload):
+            if event.get("type") == "message_start":
+                self._anthropic_usage(usage, event.get("message", {}).get("usage", {}))
+            elif event.get("type") == "message_delta":
+                usage["output_tokens"] = event.get("usage", {}).get("output_tokens", usage.get("output_tokens", 0))
+            elif event.get("type") == "content_block_delta":
+                delta = event.get("delta", {})
+                if delta.get("type") == "text_delta":
+                    yield delta.get("text", "")
+                elif delta.get("type") == "input_json_delta":
+                    yield delta.get("partial_json", "")
+            elif event.get("type") == "error":
+                error = event.get("error", {})
+                message = f"Anthropic stream error: {error.get('message', event)}"
+                if error.get("type") in ANTHROPIC_TRANSIENT_ERRORS:
+                    raise TransientProviderError(message)
+                raise RuntimeError(message)
+    
+    async def _stream_openai(
+        self, prompt: str, max_tokens: int, json_schema: dict = None, usage: dict = None, model: str = None,
+        prefix: str = None
+    ) -> AsyncGenerator[str, None]:
+        """Stream OpenAI GPT API text deltas"""
+        headers, payload = self._openai_request(prompt, max_tokens, json_schema, model, prefix)
+        payload["stream"] = True
+        payload["stream_options"] = {"include_usage": True}
+        usage = usage if usage is not None else {}
+        
+        async for event in self._stream_events(headers, payload):
+            # The final chunk (with no choices) carries usage for the whole response
+            if event.get("usage"):
+                self._openai_usage(usage, event["usage"])
+            for choice in event.get("choices", []):
+                content = choice.get("delta", {}).get("content")
+                if content:
+                    yield content
@@ -1,19 +1,25 @@
 # -*- coding: utf-8 -*-
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from datetime import datetime
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import func
+from sqlalchemy.orm import Session, load_only, undefer, undefer_group
+from datetime import datetime, date
 import asyncio
 import json
 import uuid
 from typing import AsyncGenerator, Optional, List
 from difflib import SequenceMatcher
 from research import ResearchOrchestrator
-from validation import ResearchValidator
-from database import get_db, init_db, Company, Report, Persona, ResearchQueue
+from validation import ResearchValidator, build_report_data
+from validation_store import ValidationStore, link_research_validations, validation_history
+from auto_validation import auto_validation_enabled, start_validation, validation_status
+from executive_directory import ExecutiveDirectory
+from database import get_db, init_db, SessionLocal, Company, Report, Persona, ResearchQueue, REPORT_STEP_COLUMNS
 from parsers import parse_persona_table
+from blob_store import externalize_step, hydrate_steps
+from report_search import index_report_steps, search_reports, search_personas
 
 app = FastAPI(title="Account Research API")
 
@@ -32,10 +38,22 @@ app.add_middleware(
 )
 
 class ResearchRequest(BaseModel):
+    # model_routing is a request field, not pydantic's model_ namespace
+    model_config = ConfigDict(protected_namespaces=())
+    
     company_name: str
     llm_provider: str = "anthropic"  # or "openai"
     api_key: str  # User provides their own API key
     tavily_api_key: Optional[str] = None  # Optional Tavily API key for web search
+    stream_tokens: bool = True  # Forward LLM token deltas as step_delta events
+    fallback_provider: Optional[str] = None  # Secondary provider used when the primary errors or times out
+    fallback_api_key: Optional[str] = None
+    hedge_requests: bool = False  # Fire a backup request for slow steps 5-7, first answer wins
+    hedge_delay_seconds: Optional[float] = None  # Defaults to the primary's observed p95 latency
+    model_routing: Optional[dict] = None  # Step -> model tier overrides, see model_routing.py
+    # Opt in: validate in the background on completion with the server's judge key (the server pays
+    # for the judge calls); poll GET /api/research/{research_id}/validation for the result
+    auto_validate: bool = False
 
 class SaveResearchRequest(BaseModel):
     research_id: str
@@ -54,6 +72,8 @@ class PersonaRequest(BaseModel):
 
 class ValidationRequest(BaseModel):
     judge_api_key: str  # OpenAI API key for judge LLM
+    force: bool = False  # Re-judge every step even if a stored verdict matches its content
+    batch: bool = False  # Judge the whole report in one call (falls back to per-step if truncated)
 
 @app.get("/")
 async def root():
@@ -66,18 +86,33 @@ async def start_research(request: ResearchRequest):
     Returns streaming response with progress updates.
     """
     # Create orchestrator with optional Tavily API key
-    orchestrator = ResearchOrchestrator(tavily_api_key=request.tavily_api_key)
+    orchestrator = ResearchOrchestrator(
+        tavily_api_key=request.tavily_api_key,
+        stream_tokens=request.stream_tokens,
+        hedge_requests=request.hedge_requests,
+        hedge_delay_seconds=request.hedge_delay_seconds,
+        model_routing=request.model_routing,
+        executive_directory=ExecutiveDirectory()
+    )
     
     async def generate_updates() -> AsyncGenerator[str, None]:
         try:
             async for update in orchestrator.run_full_research(
                 company_name=request.company_name,
                 llm_provider=request.llm_provider,
-                api_key=request.api_key
+                api_key=request.api_key,
+                fallback_provider=request.fallback_provider,
+                fallback_api_key=request.fallback_api_key
             ):
                 # Send server-sent event format
                 yield f"data: {json.dumps(update, ensure_ascii=False)}\n\n"
                 
+                if update["type"] == "complete" and request.auto_validate and auto_validation_enabled():
+                    # Runs in the background; the client polls for the result
+                    research_id = update["results"]["research_id"]
+                    start_validation(research_id, update["results"])
+                    yield f"data: {json.dumps({'type': 'validation_queued', 'research_id': research_id})}\n\n"
+                
         except Exception as e:
             error_update = {
                 "type": "error",
@@ -90,6 +125,18 @@ async def start_research(request: ResearchRequest):
         media_type="text/event-stream"
     )
 
+@app.get("/api/research/{research_id}/validation")
+async def get_research_validation(research_id: str):
+    """
+    Result of a run's background validation: validation_running, validation_complete
+    or validation_failed. Only the worker that ran the research knows the run; once the
+    report is saved its verdicts are also in GET /api/reports/{id}/validations.
+    """
+    status = validation_status(research_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="No background validation for this research run")
+    return status
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
@@ -120,18 +167,14 @@ async def save_research(request: SaveResearchRequest, db: Session = Depends(get_
             total_tokens=request.metadata.get("total_tokens"),
             tavily_searches=request.metadata.get("tavily_searches"),
             research_duration_seconds=request.metadata.get("research_duration_seconds"),
+            prompt_versions=request.metadata.get("prompt_versions"),
             status="complete" if request.results.get("status") == "complete" else "failed"
         )
         
-        # Save each step as JSONB
+        # Save each step as JSONB, with raw LLM text and citations moved to blob storage
         steps = request.results.get("steps", {})
-        report.step1_strategic_objectives = steps.get("step1_strategic_objectives")
-        report.step2_bu_alignment = steps.get("step2_bu_alignment")
-        report.step3_bu_deepdive = steps.get("step3_bu_deepdive")
-        report.step4_ai_alignment = steps.get("step4_ai_alignment")
-        report.step5_persona_mapping = steps.get("step5_persona_mapping")
-        report.step6_value_realization = steps.get("step6_value_realization")
-        report.step7_outreach_email = steps.get("step7_outreach_email")
+        for column in REPORT_STEP_COLUMNS:
+            setattr(report, column, externalize_step(db, steps.get(column)))
         
         if request.results.get("status") == "complete":
             report.completed_at = datetime.now()
@@ -139,7 +182,14 @@ async def save_research(request: SaveResearchRequest, db: Session = Depends(get_
         db.add(report)
         db.flush()
         
+        # Full-text index of the parsed step content
+        index_report_steps(db, report.id, steps)
+        
+        # Verdicts from background validation that finished before the save
+        link_research_validations(db, report.research_id, report.id)
+        
         # Parse and save personas from Step 5
+        directory_personas = None
         if steps.get("step5_persona_mapping"):
             step5_data = steps["step5_persona_mapping"]
             
@@ -183,6 +233,8 @@ async def save_research(request: SaveResearchRequest, db: Session = Depends(get_
                                 last_researched_at=datetime.now()
                             )
                             db.add(persona)
+                    
+                    directory_personas = json_data["personas"]
             # Handle markdown format (legacy)
             elif isinstance(step5_data.get("data"), str) or step5_data.get("markdown"):
                 persona_markdown = step5_data.get("markdown") or step5_data.get("data", "")
@@ -227,6 +279,19 @@ async def save_research(request: SaveResearchRequest, db: Session = Depends(get_
         
         db.commit()
         
+        # Names found by this run's searches go into the cross-report directory
+        if directory_personas:
+            try:
+                await asyncio.to_thread(
+                    ExecutiveDirectory().record,
+                    company.id,
+                    directory_personas,
+                    searched_roles=request.metadata.get("executive_roles_searched"),
+                    citations=steps["step5_persona_mapping"].get("citations") or []
+                )
+            except Exception as e:
+                print(f"Executive directory update failed: {e}")
+        
         return {
             "success": True,
             "company_id": company.id,
@@ -244,7 +309,20 @@ async def fuzzy_match_company(name: str, threshold: float = 0.6, db: Session = D
     if not name or not name.strip():
         return {"matches": []}
     
-    companies = db.query(Company).all()
+    # One aggregate over reports instead of two queries per company
+    report_stats = db.query(
+        Report.company_id,
+        func.max(Report.created_at).label("latest_research"),
+        func.count(Report.id).label("report_count")
+    ).group_by(Report.company_id).subquery()
+    
+    companies = db.query(
+        Company.id,
+        Company.name,
+        report_stats.c.latest_research,
+        report_stats.c.report_count
+    ).join(report_stats, report_stats.c.company_id == Company.id).all()
+    
     matches = []
     
     for company in companies:
@@ -252,26 +330,19 @@ async def fuzzy_match_company(name: str, threshold: float = 0.6, db: Session = D
         ratio = SequenceMatcher(None, name.lower().strip(), company.name.lower().strip()).ratio()
         
         if ratio >= threshold:
-            # Get latest report for this company
-            latest_report = db.query(Report).filter(Report.company_id == company.id).order_by(Report.created_at.desc()).first()
-            
-            # Check if report is fresh (within 30 days)
-            is_fresh = False
-            if latest_report:
-                days_old = (datetime.now() - latest_report.created_at).days
-                is_fresh = days_old <= 30
-            
-            report_count = db.query(Report).filter(Report.company_id == company.id).count()
+            # Check if latest report is fresh (within 30 days)
+            days_old = (datetime.now() - company.latest_research).days
+            is_fresh = days_old <= 30
             
             # Only include if there are reports AND at least one is fresh
-            if report_count > 0 and is_fresh:
+            if is_fresh:
                 matches.append({
                     "id": company.id,
                     "name": company.name,
                     "similarity": round(ratio * 100, 1),  # Convert to percentage
                     "has_reports": True,
-                    "latest_research": latest_report.created_at.isoformat(),
-                    "report_count": report_count,
+                    "latest_research": company.latest_research.isoformat(),
+                    "report_count": company.report_count,
                     "days_old": days_old
                 })
     
@@ -283,34 +354,91 @@ async def fuzzy_match_company(name: str, threshold: float = 0.6, db: Session = D
 @app.get("/api/companies")
 async def get_companies(db: Session = Depends(get_db)):
     """Get all companies with their latest research date and persona count"""
-    companies = db.query(Company).all()
+    latest_reports = db.query(
+        Report.company_id,
+        func.max(Report.created_at).label("last_researched")
+    ).filter(Report.status == "complete").group_by(Report.company_id).subquery()
+    
+    persona_counts = db.query(
+        Persona.company_id,
+        func.count(Persona.id).label("persona_count")
+    ).group_by(Persona.company_id).subquery()
+    
+    rows = db.query(
+        Company,
+        latest_reports.c.last_researched,
+        persona_counts.c.persona_count
+    ).outerjoin(
+        latest_reports, latest_reports.c.company_id == Company.id
+    ).outerjoin(
+        persona_counts, persona_counts.c.company_id == Company.id
+    ).all()
+    
     result = []
     
-    for company in companies:
-        latest_report = db.query(Report).filter(
-            Report.company_id == company.id,
-            Report.status == "complete"
-        ).order_by(Report.created_at.desc()).first()
-        
-        persona_count = db.query(Persona).filter(Persona.company_id == company.id).count()
-        
+    for company, last_researched, persona_count in rows:
         result.append({
             "id": company.id,
             "name": company.name,
             "domain": company.domain,
             "industry": company.industry,
-            "last_researched": latest_report.created_at.isoformat() if latest_report else None,
-            "persona_count": persona_count,
+            "last_researched": last_researched.isoformat() if last_researched else None,
+            "persona_count": persona_count or 0,
             "created_at": company.created_at.isoformat(),
             "updated_at": company.updated_at.isoformat()
         })
     
     return result
 
+@app.get("/api/search")
+async def search(
+    q: str,
+    scope: str = "reports",
+    step: Optional[int] = Query(None, ge=1, le=len(REPORT_STEP_COLUMNS)),
+    title: Optional[str] = None,
+    industry: Optional[str] = None,
+    provider: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """
+    Ranked, paginated full-text search with industry/provider/month facets.
+    
+    scope=reports searches step content (optionally one step, e.g. q=SAP&step=3);
+    scope=personas searches persona fields (e.g. q=reconciliation&title=CFO).
+    """
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Search query is required")
+    
+    filters = {
+        "industry": industry,
+        "provider": provider,
+        "date_from": date_from,
+        "date_to": date_to,
+        "page": page,
+        "page_size": page_size
+    }
+    
+    if scope == "reports":
+        return search_reports(db, q, step=step, **filters)
+    elif scope == "personas":
+        return search_personas(db, q, title=title, **filters)
+    
+    raise HTTPException(status_code=400, detail=f"Unsupported search scope: {scope}")
+
 @app.get("/api/companies/{company_id}/reports")
 async def get_company_reports(company_id: int, db: Session = Depends(get_db)):
     """Get all reports for a specific company"""
-    reports = db.query(Report).filter(Report.company_id == company_id).order_by(Report.created_at.desc()).all()
+    reports = db.query(Report).options(
+        load_only(
+            Report.id, Report.research_id, Report.status, Report.llm_provider, Report.llm_model,
+            Report.created_at, Report.completed_at, Report.research_duration_seconds,
+            Report.tavily_searches, Report.total_tokens
+        )
+    ).filter(Report.company_id == company_id).order_by(Report.created_at.desc()).all()
     
     return [{
         "id": report.id,
@@ -325,10 +453,47 @@ async def get_company_reports(company_id: int, db: Session = Depends(get_db)):
         "total_tokens": report.total_tokens
     } for report in reports]
 
+def _parse_step_selector(steps: Optional[str]) -> List[str]:
+    """
+    Resolve a ?steps= selector into step column names.
+    
+    Accepts step numbers or column names, comma separated (e.g. "1,5" or
+    "step5_persona_mapping"). No selector means all steps.
+    """
+    if not steps:
+        return list(REPORT_STEP_COLUMNS)
+    
+    selected = []
+    for token in steps.split(","):
+        token = token.strip()
+        if not token:
+            continue
+        if token.isdigit() and 1 <= int(token) <= len(REPORT_STEP_COLUMNS):
+            column = REPORT_STEP_COLUMNS[int(token) - 1]
+        elif token in REPORT_STEP_COLUMNS:
+            column = token
+        else:
+            raise HTTPException(status_code=400, detail=f"Unknown step: {token}")
+        if column not in selected:
+            selected.append(column)
+    return selected
+
 @app.get("/api/reports/{report_id}")
-async def get_report(report_id: int, db: Session = Depends(get_db)):
-    """Get full report details including all steps and personas"""
-    report = db.query(Report).filter(Report.id == report_id).first()
+async def get_report(
+    report_id: int,
+    steps: Optional[str] = None,
+    include_raw: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Get report details including personas and the selected steps (all by default).
+    Raw LLM responses are only loaded from blob storage when include_raw is set.
+    """
+    step_columns = _parse_step_selector(steps)
+    
+    report = db.query(Report).options(
+        *[undefer(getattr(Report, column)) for column in step_columns]
+    ).filter(Report.id == report_id).first()
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
     
@@ -343,15 +508,11 @@ async def get_report(report_id: int, db: Session = Depends(get_db)):
             "industry": report.company.industry
         },
         "status": report.status,
-        "steps": {
-            "step1_strategic_objectives": report.step1_strategic_objectives,
-            "step2_bu_alignment": report.step2_bu_alignment,
-            "step3_bu_deepdive": report.step3_bu_deepdive,
-            "step4_ai_alignment": report.step4_ai_alignment,
-            "step5_persona_mapping": report.step5_persona_mapping,
-            "step6_value_realization": report.step6_value_realization,
-            "step7_outreach_email": report.step7_outreach_email
-        },
+        "steps": hydrate_steps(
+            db,
+            {column: getattr(report, column) for column in step_columns},
+            include_raw=include_raw
+        ),
         "personas": [{
             "id": p.id,
             "name": p.name,
@@ -372,6 +533,7 @@ async def get_report(report_id: int, db: Session = Depends(get_db)):
             "total_tokens": report.total_tokens,
             "tavily_searches": report.tavily_searches,
             "research_duration_seconds": report.research_duration_seconds,
+            "prompt_versions": report.prompt_versions,
             "created_at": report.created_at.isoformat(),
             "completed_at": report.completed_at.isoformat() if report.completed_at else None
         }
@@ -400,91 +562,48 @@ async def add_manual_persona(request: PersonaRequest, db: Session = Depends(get_
 @app.post("/api/reports/{report_id}/validate")
 async def validate_report(report_id: int, request: ValidationRequest, db: Session = Depends(get_db)):
     """Validate a research report using judge LLM (OpenAI GPT-4o) with streaming progress"""
-    report = db.query(Report).filter(Report.id == report_id).first()
+    report = db.query(Report).options(undefer_group("steps")).filter(Report.id == report_id).first()
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
     
-    # Reconstruct report data structure
-    report_data = {
-        "id": report.id,
-        "results": {
-            "company_name": report.company.name,
-            "steps": {
-                "step1_overview": report.step1_strategic_objectives,
-                "step2_business_priorities": report.step2_bu_alignment,
-                "step3_tech_stack": report.step3_bu_deepdive,
-                "step4_ai_alignment": report.step4_ai_alignment,
-                "step5_persona_mapping": report.step5_persona_mapping,
-                "step6_value_realization": report.step6_value_realization,
-                "step7_outreach": report.step7_outreach_email
-            }
-        }
-    }
+    # Citations live in blob storage; the judge needs them alongside the step data
+    stored_steps = hydrate_steps(db, {column: getattr(report, column) for column in REPORT_STEP_COLUMNS})
+    
+    report_data = build_report_data(report.company.name, stored_steps, report_id=report.id)
+    research_id = report.research_id
     
     async def generate_validation():
+        validator = None
+        # The request's session is closed once streaming starts; use our own
+        validation_db = SessionLocal()
         try:
-            validator = ResearchValidator(judge_api_key=request.judge_api_key)
-            
-            results = report_data.get("results", {})
-            steps = results.get("steps", {})
-            
-            validation_report = {
-                "validation_timestamp": datetime.now().isoformat(),
-                "judge_model": "gpt-4o",
-                "company_name": results.get("company_name", "Unknown"),
-                "report_id": report_data.get("id"),
-                "step_validations": {},
-                "overall_score": 0,
-                "overall_status": "YELLOW",
-                "critical_issues": [],
-                "warnings": [],
-                "recommendations": []
-            }
-            
-            # Validate each step with progress updates
-            step_scores = {}
-            for step_key, step_data in steps.items():
-                if step_key not in validator.step_config:
-                    continue
-                
-                # Send step start event
-                yield f"data: {json.dumps({'type': 'step_start', 'step_key': step_key})}\n\n"
-                
-                validation = validator._validate_step(
-                    step_key=step_key,
-                    step_data=step_data,
-                    company_name=results.get("company_name")
-                )
-                
-                validation_report["step_validations"][step_key] = validation
-                step_scores[validator.step_config[step_key]["name"]] = {
-                    "score": validation["score"],
-                    "status": validation["status"]
-                }
-                
-                # Send step complete event
-                yield f"data: {json.dumps({'type': 'step_complete', 'step_key': step_key, 'score': validation['score'], 'status': validation['status']})}\n\n"
-            
-            # Overall validation
-            yield f"data: {json.dumps({'type': 'overall_start'})}\n\n"
-            overall = validator._validate_overall(step_scores, results)
-            validation_report.update({
-                "overall_score": overall["score"],
-                "overall_status": overall["status"],
-                "critical_issues": overall.get("critical_issues", []),
-                "warnings": overall.get("warnings", []),
-                "overall_assessment": overall.get("assessment", ""),
-                "recommendations": overall.get("recommendations", [])
-            })
+            validator = ResearchValidator(
+                judge_api_key=request.judge_api_key,
+                store=ValidationStore(validation_db, report_id, research_id=research_id),
+                force=request.force,
+                batch=request.batch
+            )
             
-            # Send complete event
-            yield f"data: {json.dumps({'type': 'complete', 'validation_report': validation_report})}\n\n"
+            # Steps are judged concurrently; events arrive as each step starts and finishes
+            async for event in validator.validate_research_stream(report_data):
+                yield f"data: {json.dumps(event)}\n\n"
             
         except Exception as e:
             yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+        finally:
+            if validator:
+                await validator.judge.close()
+            validation_db.close()
     
     return StreamingResponse(generate_validation(), media_type="text/event-stream")
 
+@app.get("/api/reports/{report_id}/validations")
+async def get_validation_history(report_id: int, db: Session = Depends(get_db)):
+    """Judge score history per step for a report, oldest first"""
+    if not db.query(Report.id).filter(Report.id == report_id).first():
+        raise HTTPException(status_code=404, detail="Report not found")
+    return validation_history(db, report_id)
+
 @app.delete("/api/reports/{report_id}")
 async def delete_report(report_id: int, db: Session = Depends(get_db)):
     """Delete a report and its associated personas"""
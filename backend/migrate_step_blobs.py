@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+One-time script to move raw LLM text and citations of existing reports
+into the compressed llm_blobs table. Safe to re-run: already converted
+steps have no `raw`/`citations` keys left and are skipped.
+"""
+
+import argparse
+
+from sqlalchemy.orm import undefer_group
+
+from blob_store import externalize_step
+from database import SessionLocal, Report, REPORT_STEP_COLUMNS
+
+
+def migrate_step_blobs(batch_size: int = 100):
+    db = SessionLocal()
+    
+    try:
+        last_id = 0
+        converted = 0
+        
+        while True:
+            reports = db.query(Report).options(undefer_group("steps")).filter(
+                Report.id > last_id
+            ).order_by(Report.id).limit(batch_size).all()
+            
+            if not reports:
+                break
+            
+            for report in reports:
+                for column in REPORT_STEP_COLUMNS:
+                    step = getattr(report, column)
+                    externalized = externalize_step(db, step)
+                    if externalized != step:
+                        setattr(report, column, externalized)
+                converted += 1
+            
+            last_id = reports[-1].id
+            db.commit()
+            db.expunge_all()
+            print(f"  Processed {converted} reports (last id {last_id})")
+        
+        print(f"\n✅ Blob migration complete! Reports processed: {converted}")
+        print("   Run VACUUM FULL reports (or pg_repack) to reclaim TOAST space.")
+    
+    except Exception as e:
+        db.rollback()
+        print(f"\n❌ Error during blob migration: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move raw step text and citations to blob storage")
+    parser.add_argument("--batch-size", type=int, default=100, help="Reports per commit")
+    args = parser.parse_args()
+    
+    print("Starting step blob migration...")
+    migrate_step_blobs(batch_size=args.batch_size)
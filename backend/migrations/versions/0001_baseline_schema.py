@@ -0,0 +1,181 @@
+"""Baseline schema
+
+Creates the schema defined in database.py. Databases created earlier by
+init.sql or create_all are adopted in place: missing tables are created,
+the drifted step4_transformation_roadmap column is renamed to
+step4_ai_alignment and init.sql's idx_* indexes are replaced by the
+model's ix_* indexes.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# Index names created by the old init.sql
+LEGACY_INDEXES = [
+    "idx_companies_industry", "idx_companies_name",
+    "idx_reports_company_id", "idx_reports_research_id", "idx_reports_created_at", "idx_reports_status",
+    "idx_personas_company_id", "idx_personas_report_id", "idx_personas_title",
+    "idx_personas_source", "idx_personas_name",
+    "idx_research_queue_status", "idx_research_queue_persona_id",
+]
+
+STEP_COLUMNS = [
+    "step1_strategic_objectives", "step2_bu_alignment", "step3_bu_deepdive", "step4_ai_alignment",
+    "step5_persona_mapping", "step6_value_realization", "step7_outreach_email",
+]
+
+INDEXES = [
+    ("ix_companies_id", "companies", ["id"], False),
+    ("ix_companies_name", "companies", ["name"], True),
+    ("ix_companies_industry", "companies", ["industry"], False),
+    ("ix_reports_id", "reports", ["id"], False),
+    ("ix_reports_company_id", "reports", ["company_id"], False),
+    ("ix_reports_research_id", "reports", ["research_id"], True),
+    ("ix_reports_status", "reports", ["status"], False),
+    ("ix_reports_created_at", "reports", ["created_at"], False),
+    ("ix_personas_id", "personas", ["id"], False),
+    ("ix_personas_company_id", "personas", ["company_id"], False),
+    ("ix_personas_report_id", "personas", ["report_id"], False),
+    ("ix_personas_name", "personas", ["name"], False),
+    ("ix_personas_title", "personas", ["title"], False),
+    ("ix_personas_source", "personas", ["source"], False),
+    ("ix_research_queue_id", "research_queue", ["id"], False),
+    ("ix_research_queue_persona_id", "research_queue", ["persona_id"], False),
+    ("ix_research_queue_status", "research_queue", ["status"], False),
+]
+
+
+def upgrade():
+    # Offline (--sql) mode emits the fresh-install schema
+    if context.is_offline_mode():
+        inspector, tables = None, set()
+    else:
+        inspector = sa.inspect(op.get_bind())
+        tables = set(inspector.get_table_names())
+    
+    if "companies" not in tables:
+        op.create_table(
+            "companies",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("name", sa.String(255), nullable=False),
+            sa.Column("domain", sa.String(255)),
+            sa.Column("industry", sa.String(100)),
+            sa.Column("created_at", sa.TIMESTAMP, server_default=sa.text("NOW()")),
+            sa.Column("updated_at", sa.TIMESTAMP, server_default=sa.text("NOW()")),
+        )
+    
+    if "reports" not in tables:
+        op.create_table(
+            "reports",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("company_id", sa.Integer, sa.ForeignKey("companies.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("research_id", postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column("user_email", sa.String(255)),
+            *[sa.Column(column, postgresql.JSONB) for column in STEP_COLUMNS],
+            sa.Column("status", sa.String(50), server_default="in_progress"),
+            sa.Column("llm_provider", sa.String(50)),
+            sa.Column("llm_model", sa.String(100)),
+            sa.Column("total_tokens", sa.Integer),
+            sa.Column("tavily_searches", sa.Integer),
+            sa.Column("research_duration_seconds", sa.Integer),
+            sa.Column("cost_estimate_usd", sa.DECIMAL(10, 4)),
+            sa.Column("failed_steps", postgresql.ARRAY(sa.Integer)),
+            sa.Column("errors", postgresql.JSONB),
+            sa.Column("created_at", sa.TIMESTAMP, server_default=sa.text("NOW()")),
+            sa.Column("completed_at", sa.TIMESTAMP),
+        )
+    else:
+        # init.sql shipped a different name for the step-4 column
+        columns = {c["name"] for c in inspector.get_columns("reports")}
+        if "step4_transformation_roadmap" in columns and "step4_ai_alignment" not in columns:
+            op.alter_column("reports", "step4_transformation_roadmap", new_column_name="step4_ai_alignment")
+        elif "step4_ai_alignment" not in columns:
+            op.add_column("reports", sa.Column("step4_ai_alignment", postgresql.JSONB))
+    
+    if "personas" not in tables:
+        op.create_table(
+            "personas",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("company_id", sa.Integer, sa.ForeignKey("companies.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("report_id", sa.Integer, sa.ForeignKey("reports.id", ondelete="CASCADE")),
+            sa.Column("name", sa.String(255)),
+            sa.Column("title", sa.String(255)),
+            sa.Column("role_in_decision", sa.Text),
+            sa.Column("pain_point", sa.Text),
+            sa.Column("ai_use_case", sa.Text),
+            sa.Column("expected_outcome", sa.Text),
+            sa.Column("strategic_alignment", sa.Text),
+            sa.Column("value_hook", sa.Text),
+            sa.Column("source", sa.String(50), server_default="auto"),
+            sa.Column("added_by", sa.String(255)),
+            sa.Column("created_at", sa.TIMESTAMP, server_default=sa.text("NOW()")),
+            sa.Column("updated_at", sa.TIMESTAMP, server_default=sa.text("NOW()")),
+            sa.Column("last_researched_at", sa.TIMESTAMP),
+        )
+    
+    if "research_queue" not in tables:
+        op.create_table(
+            "research_queue",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("persona_id", sa.Integer, sa.ForeignKey("personas.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("company_id", sa.Integer, sa.ForeignKey("companies.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("status", sa.String(50), server_default="pending"),
+            sa.Column("requested_by", sa.String(255)),
+            sa.Column("requested_at", sa.TIMESTAMP, server_default=sa.text("NOW()")),
+            sa.Column("started_at", sa.TIMESTAMP),
+            sa.Column("completed_at", sa.TIMESTAMP),
+            sa.Column("error_message", sa.Text),
+        )
+    
+    if "llm_blobs" not in tables:
+        op.create_table(
+            "llm_blobs",
+            sa.Column("content_hash", sa.String(64), primary_key=True),
+            sa.Column("kind", sa.String(50)),
+            sa.Column("compression", sa.String(20), server_default="zlib"),
+            sa.Column("data", sa.LargeBinary, nullable=False),
+            sa.Column("original_size", sa.Integer),
+            sa.Column("created_at", sa.TIMESTAMP, server_default=sa.text("NOW()")),
+        )
+    
+    for name in LEGACY_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+    
+    for name, table, columns, unique in INDEXES:
+        op.create_index(name, table, columns, unique=unique, if_not_exists=True)
+    
+    # Keep updated_at current on row updates
+    op.execute("""
+        CREATE OR REPLACE FUNCTION update_updated_at_column()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            NEW.updated_at = NOW();
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for table in ("companies", "personas"):
+        op.execute(f"DROP TRIGGER IF EXISTS update_{table}_updated_at ON {table}")
+        op.execute(f"""
+            CREATE TRIGGER update_{table}_updated_at
+                BEFORE UPDATE ON {table}
+                FOR EACH ROW
+                EXECUTE FUNCTION update_updated_at_column()
+        """)
+
+
+def downgrade():
+    for table in ("companies", "personas"):
+        op.execute(f"DROP TRIGGER IF EXISTS update_{table}_updated_at ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS update_updated_at_column()")
+    for table in ("llm_blobs", "research_queue", "personas", "reports", "companies"):
+        op.drop_table(table)
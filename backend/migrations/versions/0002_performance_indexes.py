@@ -0,0 +1,54 @@
+"""Trigram and partial indexes for hot queries
+
+- pg_trgm GIN indexes on company and persona names (fuzzy matching, dedupe)
+- partial index on completed reports for "latest complete report" lookups
+- (company_id, created_at DESC) for per-company report history
+
+Indexes are built CONCURRENTLY outside the migration transaction so they
+can be deployed without locking writes.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_companies_name_trgm", "companies", ["name"],
+            postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"},
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            "ix_personas_name_trgm", "personas", ["name"],
+            postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"},
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            "ix_reports_company_complete", "reports", ["company_id", sa.text("created_at DESC")],
+            postgresql_where=sa.text("status = 'complete'"),
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            "ix_reports_company_created", "reports", ["company_id", sa.text("created_at DESC")],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name in (
+            "ix_reports_company_created", "ix_reports_company_complete",
+            "ix_personas_name_trgm", "ix_companies_name_trgm",
+        ):
+            op.drop_index(name, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,139 @@
+"""Full-text search for personas and report steps
+
+- personas.search_vector: weighted tsvector generated column
+- report_step_search: one tsvector per report step, written on save and
+  backfilled here from existing step data
+
+The search expression, step columns and step text extraction are copies of
+database.py / report_search.py as of this revision, so the migration keeps
+its meaning when those change.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+from typing import Any, List
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+STEP_COLUMNS = [
+    "step1_strategic_objectives",
+    "step2_bu_alignment",
+    "step3_bu_deepdive",
+    "step4_ai_alignment",
+    "step5_persona_mapping",
+    "step6_value_realization",
+    "step7_outreach_email",
+]
+
+PERSONA_SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce(name, '') || ' ' || coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(pain_point, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(ai_use_case, '') || ' ' || coalesce(expected_outcome, '')), 'C') || "
+    "setweight(to_tsvector('english', coalesce(role_in_decision, '') || ' ' || "
+    "coalesce(strategic_alignment, '') || ' ' || coalesce(value_hook, '')), 'D')"
+)
+
+NON_CONTENT_KEYS = {
+    "raw", "raw_ref", "raw_response", "raw_response_ref", "citations", "citations_ref", "status", "schema_errors"
+}
+
+BACKFILL_BATCH_SIZE = 200
+
+
+def _step_text(step: Any) -> str:
+    """Searchable text of a step, as report_search.extract_step_text builds it for new reports"""
+    parts: List[str] = []
+    
+    def walk(value: Any):
+        if isinstance(value, str):
+            parts.append(value)
+        elif isinstance(value, dict):
+            for key, item in value.items():
+                if key not in NON_CONTENT_KEYS:
+                    walk(item)
+        elif isinstance(value, list):
+            for item in value:
+                walk(item)
+    
+    if isinstance(step, dict):
+        data = step.get("data")
+        if isinstance(data, dict) and all(isinstance(v, dict) and "data" in v for v in data.values()):
+            parts.extend(data.keys())
+        walk(data)
+    else:
+        walk(step)
+    
+    return "\n".join(parts)
+
+
+def _backfill_step_search():
+    """Index the parsed step data of existing reports, a batch of reports at a time"""
+    conn = op.get_bind()
+    select = sa.text(
+        f"SELECT id, {', '.join(STEP_COLUMNS)} FROM reports WHERE id > :after ORDER BY id LIMIT :limit"
+    )
+    insert = sa.text(
+        "INSERT INTO report_step_search (report_id, step_number, step_key, content) "
+        "VALUES (:report_id, :step_number, :step_key, to_tsvector('english', CAST(:content AS text))) "
+        "ON CONFLICT DO NOTHING"
+    )
+    
+    after = 0
+    while True:
+        rows = conn.execute(select, {"after": after, "limit": BACKFILL_BATCH_SIZE}).fetchall()
+        if not rows:
+            break
+        documents = [
+            {"report_id": row[0], "step_number": number, "step_key": column, "content": _step_text(step)}
+            for row in rows
+            for number, (column, step) in enumerate(zip(STEP_COLUMNS, row[1:]), 1)
+            if step
+        ]
+        if documents:
+            conn.execute(insert, documents)
+        after = rows[-1][0]
+
+
+def upgrade():
+    op.add_column(
+        "personas",
+        sa.Column("search_vector", postgresql.TSVECTOR, sa.Computed(PERSONA_SEARCH_VECTOR_SQL, persisted=True))
+    )
+    
+    op.create_table(
+        "report_step_search",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("report_id", sa.Integer, sa.ForeignKey("reports.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("step_number", sa.Integer, nullable=False),
+        sa.Column("step_key", sa.String(50), nullable=False),
+        sa.Column("content", postgresql.TSVECTOR, nullable=False),
+        sa.UniqueConstraint("report_id", "step_number", name="uq_report_step_search_step"),
+    )
+    op.create_index("ix_report_step_search_report_id", "report_step_search", ["report_id"])
+    
+    # Backfill from the parsed step data of existing reports
+    _backfill_step_search()
+    
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_personas_search_vector", "personas", ["search_vector"],
+            postgresql_using="gin", postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            "ix_report_step_search_content", "report_step_search", ["content"],
+            postgresql_using="gin", postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade():
+    op.drop_table("report_step_search")
+    op.drop_index("ix_personas_search_vector", table_name="personas", if_exists=True)
+    op.drop_column("personas", "search_vector")
@@ -0,0 +1,30 @@
+"""Shared rate limit state
+
+- rate_limit_buckets: requests/tokens per minute bucket levels per
+  provider API key (hashed), shared by all backend workers
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "rate_limit_buckets",
+        sa.Column("bucket_key", sa.String(64), primary_key=True),
+        sa.Column("requests", sa.Float, nullable=False),
+        sa.Column("tokens", sa.Float, nullable=False),
+        sa.Column("updated_at", sa.TIMESTAMP, nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("rate_limit_buckets")
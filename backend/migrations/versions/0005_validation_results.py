@@ -0,0 +1,44 @@
+"""Stored judge validations
+
+- validation_results: judge verdict per report step, keyed by a hash of
+  the step content, judge model and judge prompt version so unchanged
+  steps are not re-judged
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "validation_results",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("report_id", sa.Integer, sa.ForeignKey("reports.id", ondelete="CASCADE")),
+        sa.Column("step_key", sa.String(50), nullable=False),
+        sa.Column("content_hash", sa.String(64), nullable=False),
+        sa.Column("judge_model", sa.String(100), nullable=False),
+        sa.Column("prompt_version", sa.String(50), nullable=False),
+        sa.Column("score", sa.Integer),
+        sa.Column("status", sa.String(10)),
+        sa.Column("result", postgresql.JSONB, nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP, server_default=sa.text("NOW()")),
+    )
+    op.create_index("ix_validation_results_report_id", "validation_results", ["report_id"])
+    op.create_index("ix_validation_results_created_at", "validation_results", ["created_at"])
+    op.create_index(
+        "ix_validation_results_lookup", "validation_results",
+        ["content_hash", "judge_model", "prompt_version", "step_key"]
+    )
+
+
+def downgrade():
+    op.drop_table("validation_results")
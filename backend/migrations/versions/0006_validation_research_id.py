@@ -0,0 +1,28 @@
+"""Validation results recorded before their report is saved
+
+- validation_results.research_id: the research run a verdict was recorded
+  for; background validation runs before the report row exists, and its
+  verdicts are linked to the report when it is saved
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("validation_results", sa.Column("research_id", postgresql.UUID(as_uuid=True)))
+    op.create_index("ix_validation_results_research_id", "validation_results", ["research_id"])
+
+
+def downgrade():
+    op.drop_index("ix_validation_results_research_id", table_name="validation_results")
+    op.drop_column("validation_results", "research_id")
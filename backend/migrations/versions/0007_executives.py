@@ -0,0 +1,37 @@
+"""Cross-report executive directory
+
+- executives: named executive per company and search role, with the
+  source URL and first-seen / last-verified timestamps, so step 5 only
+  searches for roles that are missing or stale
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "executives",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("company_id", sa.Integer, sa.ForeignKey("companies.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("role", sa.String(100), nullable=False),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("title", sa.String(255)),
+        sa.Column("source_url", sa.Text),
+        sa.Column("first_seen_at", sa.TIMESTAMP, server_default=sa.text("NOW()"), nullable=False),
+        sa.Column("last_verified_at", sa.TIMESTAMP, server_default=sa.text("NOW()"), nullable=False),
+        sa.UniqueConstraint("company_id", "role", "name", name="uq_executives_company_role_name"),
+    )
+    op.create_index("ix_executives_company_role", "executives", ["company_id", "role"])
+
+
+def downgrade():
+    op.drop_table("executives")
@@ -0,0 +1,26 @@
+"""Prompt versions per report
+
+- reports.prompt_versions: version and hash of every prompt template the
+  research run used (see prompt_registry.py), so reports can be compared
+  and cached outputs keyed by prompt identity
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("reports", sa.Column("prompt_versions", postgresql.JSONB))
+
+
+def downgrade():
+    op.drop_column("reports", "prompt_versions")
@@ -0,0 +1,71 @@
+"""
+Per-step model routing.
+
+Each research step (plus the step-5 persona repair and retry) is routed to
+a model tier, and each tier maps to a concrete model per provider.
+Mechanical steps (step 2 business-unit extraction, step 3 per-BU
+deep-dives, the step 5 persona name fill-in) default to the fast tier;
+everything else uses the standard model.
+
+Deployment-wide overrides come from PROSPECTOR_MODEL_ROUTING (JSON), and a
+research request can override again on top:
+    
+    {"steps": {"step3": "standard", "step7": "fast"},
+     "tiers": {"anthropic": {"fast": "claude-3-5-haiku-20241022"}}}
+"""
+import copy
+import json
+import os
+from typing import Dict, Optional
+
+MODEL_TIERS = {
+    "anthropic": {
+        "fast": "claude-3-5-haiku-20241022",
+        "standard": "claude-sonnet-4-20250514",
+    },
+    "openai": {
+        "fast": "gpt-4o-mini",
+        "standard": "gpt-4o-2024-11-20",
+    },
+}
+
+DEFAULT_STEP_TIERS = {
+    "step1": "standard",
+    "step2": "fast",
+    "step3": "fast",
+    "step4": "standard",
+    "step5": "standard",
+    "step5_repair": "fast",
+    "step5_retry": "standard",
+    "step6": "standard",
+    "step7": "standard",
+}
+
+
+def _merge(routing: Dict, overrides: Optional[Dict]) -> Dict:
+    if not overrides:
+        return routing
+    routing["steps"].update(overrides.get("steps", {}))
+    for provider, tiers in overrides.get("tiers", {}).items():
+        routing["tiers"].setdefault(provider, {}).update(tiers)
+    return routing
+
+
+class ModelRouter:
+    """Resolves a route key ("step1" ... "step7", "step5_repair", "step5_retry") to a model for a provider"""
+    
+    def __init__(self, overrides: Optional[Dict] = None):
+        routing = {"steps": dict(DEFAULT_STEP_TIERS), "tiers": copy.deepcopy(MODEL_TIERS)}
+        deployment = os.getenv("PROSPECTOR_MODEL_ROUTING")
+        if deployment:
+            routing = _merge(routing, json.loads(deployment))
+        self.routing = _merge(routing, overrides)
+    
+    def tier_for(self, route: str) -> str:
+        return self.routing["steps"].get(route, "standard")
+    
+    def model_for(self, provider: str, route: Optional[str]) -> Optional[str]:
+        """Model for the route, or None to use the client's default model"""
+        if route is None:
+            return None
+        return self.routing["tiers"].get(provider, {}).get(self.tier_for(route))
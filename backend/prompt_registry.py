@@ -0,0 +1,80 @@
+"""
+Versioned, precompiled prompt templates.
+
+Every prompt is registered once, at import, under a name and a version.
+Registering compiles the template into its static text segments and the
+named fields filled in per call, so rendering is a join instead of
+rebuilding the whole prompt string. A template's identity - name, version
+and a hash of its text - is stable across runs and changes whenever the
+wording does, even if nobody bumps the version: report metadata records
+the identities a run used ("prompt_versions") and the validation cache is
+keyed on the judge templates' identity.
+
+Templates use str.format syntax with named fields only ({company_name});
+literal braces are doubled ({{ }}).
+"""
+import hashlib
+from string import Formatter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class PromptTemplate:
+    """One compiled prompt template"""
+    
+    def __init__(self, name: str, version: str, text: str):
+        self.name = name
+        self.version = version
+        self.hash = hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+        
+        # (static text, field that follows it or None), in order
+        self.segments: List[Tuple[str, Optional[str]]] = []
+        for literal, field, spec, conversion in Formatter().parse(text):
+            if field is not None and (not field.isidentifier() or spec or conversion):
+                raise ValueError(f"Prompt '{name}': only plain named fields are supported, got {{{field}}}")
+            self.segments.append((literal, field))
+        self.fields = frozenset(field for _, field in self.segments if field is not None)
+    
+    @property
+    def identity(self) -> Dict[str, str]:
+        return {"version": self.version, "hash": self.hash}
+    
+    def render(self, **values) -> str:
+        missing = self.fields - values.keys()
+        if missing:
+            raise KeyError(f"Prompt '{self.name}' is missing {', '.join(sorted(missing))}")
+        
+        parts = []
+        for literal, field in self.segments:
+            parts.append(literal)
+            if field is not None:
+                parts.append(str(values[field]))
+        return "".join(parts)
+
+
+class PromptRegistry:
+    """All prompt templates by name"""
+    
+    def __init__(self):
+        self._templates: Dict[str, PromptTemplate] = {}
+    
+    def register(self, name: str, version: str, text: str) -> PromptTemplate:
+        if name in self._templates:
+            raise ValueError(f"Prompt '{name}' is already registered")
+        template = PromptTemplate(name, version, text)
+        self._templates[name] = template
+        return template
+    
+    def get(self, name: str) -> PromptTemplate:
+        return self._templates[name]
+    
+    def identities(self) -> Dict[str, Dict[str, str]]:
+        return {name: template.identity for name, template in self._templates.items()}
+
+
+def prompt_key(templates: Iterable[PromptTemplate]) -> str:
+    """Short key for a set of templates (order-independent), for cache keys"""
+    parts = sorted(f"{template.name}:{template.version}:{template.hash}" for template in templates)
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:12]
+
+
+REGISTRY = PromptRegistry()
@@ -1,8 +1,12 @@
-class PromptTemplates:
-    """All 7 step prompts with JSON output format"""
-    
-    def step1_master_research(self, company_name: str) -> str:
-        return f"""**Master Research: Strategic Objectives & Initiatives (Customer-Level)**
+"""
+Research step prompts, registered as versioned templates (see prompt_registry.py).
+Bump a template's version whenever its wording changes.
+"""
+from typing import Dict
+
+from prompt_registry import REGISTRY, PromptTemplate
+
+STEP1_MASTER_RESEARCH = REGISTRY.register("step1_master_research", "1", """**Master Research: Strategic Objectives & Initiatives (Customer-Level)**
 
 **Role**: You are a strategic research analyst tasked with compiling a fact-based view of {company_name}'s current strategic objectives, initiatives, and success metrics.
 
@@ -69,19 +73,22 @@ Return your response as a valid JSON object with this exact structure:
   "data_quality_note": "All data from 2024-2026 sources"
 }}
 
-CRITICAL: Your entire response must be valid JSON. Do not include any markdown, explanatory text, or formatting outside the JSON object."""
+CRITICAL: Your entire response must be valid JSON. Do not include any markdown, explanatory text, or formatting outside the JSON object.""")
 
-    def step2_bu_alignment(self, company_name: str, step1_context: str) -> str:
-        context_snippet = step1_context[:2000] if len(step1_context) > 2000 else step1_context
-        
-        return f"""**Business-Unit Strategic Alignment & Metrics**
+SHARED_CONTEXT = REGISTRY.register("shared_context", "1", """**Shared Research Context: {company_name}**
+
+The material below is shared by every step of this account research. Each step's task follows it.
+
+{web_section}**Step 1 Output (Strategic Objectives & Initiatives):**
+{step1_context}""")
+
+STEP2_BU_ALIGNMENT = REGISTRY.register("step2_bu_alignment", "1", """**Business-Unit Strategic Alignment & Metrics**
 
 **Role**: Strategic research analyst specializing in corporate financial disclosures. Map the specific business segments of {company_name} to their overarching strategic objectives and measurable KPIs.
 
 ⚠️ **DATA RECENCY REQUIREMENT**: Use only 2024-2026 data. Cite the year explicitly.
 
-**Context from Step 1 (Strategic Objectives):**
-{context_snippet}
+**Context from Step 1 (Strategic Objectives):** See the shared research context above.
 
 **Objective**: Synthesize data from the company's most recent 10-K, Investor Day presentations, and Annual Reports to create a Business-Unit Alignment structure. Be factual and grounded in public disclosures.
 
@@ -117,19 +124,15 @@ Return your response as a valid JSON object:
   "data_timestamp": "2024-2026"
 }}
 
-CRITICAL: Return only valid JSON. No markdown, no additional text."""
+CRITICAL: Return only valid JSON. No markdown, no additional text.""")
 
-    def step3_bu_deepdive(self, company_name: str, business_unit: str, step1_context: str) -> str:
-        context_snippet = step1_context[:1500] if len(step1_context) > 1500 else step1_context
-        
-        return f"""**Business Unit Deep-Dive (Operational Level)**
+STEP3_BU_DEEPDIVE = REGISTRY.register("step3_bu_deepdive", "1", """**Business Unit Deep-Dive (Operational Level)**
 
 **Role**: Strategic research analyst specializing in divisional operations. Provide a granular profile of: **{business_unit}** within {company_name}.
 
 ⚠️ **DATA RECENCY**: Focus on 2024-2026 operational data and near-term roadmap.
 
-**Context from Step 1:**
-{context_snippet}
+**Context from Step 1:** See the shared research context above.
 
 **Objective**: Research and synthesize the specific operational roadmap and performance indicators for this business unit for the next 24 months.
 
@@ -167,22 +170,13 @@ CRITICAL: Return only valid JSON. No markdown, no additional text."""
   "data_timestamp": "2024-2026"
 }}
 
-CRITICAL: Return only valid JSON. No markdown."""
+CRITICAL: Return only valid JSON. No markdown.""")
 
-    def step4_ai_alignment(self, company_name: str, step1_context: str, step3_contexts: dict) -> str:
-        bu_summary = "\n\n".join([
-            f"**{bu}:**\n{context[:800]}" 
-            for bu, context in list(step3_contexts.items())[:3]
-        ])
-        
-        context_snippet = step1_context[:1500] if len(step1_context) > 1500 else step1_context
-        
-        return f"""**AI Alignment & Agentic Use Case Mapping**
+STEP4_AI_ALIGNMENT = REGISTRY.register("step4_ai_alignment", "1", """**AI Alignment & Agentic Use Case Mapping**
 
 **Role**: AI Strategy & Solutions Architect specializing in digital transformation. Map {company_name}'s business unit objectives to specific, high-impact Agentic AI use cases.
 
-**Context from Step 1 (Strategic Pillars):**
-{context_snippet}
+**Context from Step 1 (Strategic Pillars):** See the shared research context above.
 
 **Context from Step 3 (Business Unit Objectives):**
 {bu_summary}
@@ -212,29 +206,19 @@ CRITICAL: Return only valid JSON. No markdown."""
   "focus_period": "2025-2026"
 }}
 
-CRITICAL: Return only valid JSON. No markdown."""
+CRITICAL: Return only valid JSON. No markdown.""")
 
-    def step5_persona_mapping(self, company_name: str, step1_context: str, step3_contexts: dict, step4_context: str) -> str:
-        bu_summary = "\n\n".join([
-            f"**{bu}:**\n{context[:500]}" 
-            for bu, context in list(step3_contexts.items())[:2]
-        ])
-        
-        context1 = step1_context[:1000] if len(step1_context) > 1000 else step1_context
-        context4 = step4_context[:1500] if len(step4_context) > 1500 else step4_context
-        
-        return f"""**Persona Mapping: Buying Committee & Stakeholder Intelligence**
+STEP5_PERSONA_MAPPING = REGISTRY.register("step5_persona_mapping", "1", """**Persona Mapping: Buying Committee & Stakeholder Intelligence**
 
 **Role**: Strategic Account Intelligence Analyst. Build comprehensive stakeholder map identifying decision-makers, influencers, and engagement strategy.
 
-**Context from Step 1:**
-{context1}
+**Context from Step 1:** See the shared research context above.
 
 **Context from Step 3:**
 {bu_summary}
 
 **Context from Step 4:**
-{context4}
+{step4_context}
 
 **CRITICAL**: You MUST research and find actual executive names at BOTH levels:
 1. **C-Suite Executives** (CFO, CTO, COO, CIO, CDO, CISO, CRO)
@@ -291,25 +275,46 @@ Do NOT use "TBD" unless you have exhausted all public sources.
   "research_note": "Explain research methodology if names were difficult to find"
 }}
 
-CRITICAL: Name field MUST contain actual executive names from public sources. Include both C-suite AND BU leaders. Return only valid JSON."""
+CRITICAL: Name field MUST contain actual executive names from public sources. Include both C-suite AND BU leaders. Return only valid JSON.""")
 
-    def step6_value_realization(self, company_name: str, step1_context: str, step3_contexts: dict, step4_context: str, step5_context: str) -> str:
-        context1 = step1_context[:1000] if len(step1_context) > 1000 else step1_context
-        context4 = step4_context[:1500] if len(step4_context) > 1500 else step4_context
-        context5 = step5_context[:1500] if len(step5_context) > 1500 else step5_context
-        
-        return f"""**Value Realization: Business Case & ROI Analysis**
+STEP5_PERSONA_REPAIR = REGISTRY.register("step5_persona_repair", "1", """**Persona Repair: Find Missing Executive Names**
+
+A stakeholder map for {company_name} has these roles without a named person:
+{slot_lines}
+
+{web_context}
+
+**Task**: For each slot, find the person who currently holds that role at {company_name}.
+- Use names that appear in the search results above; prefer the most recent source
+- Correct the title if the sources give the exact current title
+- If no source names the person, return "TBD" as the name - do not guess
+
+**OUTPUT FORMAT - RETURN VALID JSON ONLY**
+
+{{
+  "personas": [
+    {{
+      "slot": 0,
+      "name": "Actual Executive Name or TBD",
+      "title": "Exact job title",
+      "data_source": "Where you found this person's name/role"
+    }}
+  ]
+}}
+
+Return one entry per slot listed above. Return only valid JSON.""")
+
+STEP6_VALUE_REALIZATION = REGISTRY.register("step6_value_realization", "1", """**Value Realization: Business Case & ROI Analysis**
 
 **Role**: Strategic Business Value Consultant. Build quantified business case showing financial impact, implementation roadmap, and success metrics.
 
-**Context from Step 1:**
-{context1}
+**Context from Step 1:** See the shared research context above.
 
 **Context from Step 4:**
-{context4}
+{step4_context}
 
 **Context from Step 5:**
-{context5}
+{step5_context}
 
 **Objective**: Transform AI use cases into quantified business value with financial modeling, implementation timeline, resource requirements, and risk mitigation.
 
@@ -369,29 +374,22 @@ CRITICAL: Name field MUST contain actual executive names from public sources. In
   "executive_summary": "2-3 sentence overview of total value opportunity"
 }}
 
-CRITICAL: Focus on QUANTIFIED business value with specific dollar amounts and percentages. Return only valid JSON."""
+CRITICAL: Focus on QUANTIFIED business value with specific dollar amounts and percentages. Return only valid JSON.""")
 
-    def step7_outreach_email(self, company_name: str, step1_context: str, step4_context: str, step5_context: str, step6_context: str) -> str:
-        context1 = step1_context[:800] if len(step1_context) > 800 else step1_context
-        context4 = step4_context[:1000] if len(step4_context) > 1000 else step4_context
-        context5 = step5_context[:1000] if len(step5_context) > 1000 else step5_context
-        context6 = step6_context[:1000] if len(step6_context) > 1000 else step6_context
-        
-        return f"""**Personalized Outreach Generation**
+STEP7_OUTREACH_EMAIL = REGISTRY.register("step7_outreach_email", "1", """**Personalized Outreach Generation**
 
 **Role**: Strategic Sales Specialist. Draft highly personalized outreach email to decision-maker within {company_name}.
 
-**Context from Step 1:**
-{context1}
+**Context from Step 1:** See the shared research context above.
 
 **Context from Step 4:**
-{context4}
+{step4_context}
 
 **Context from Step 5:**
-{context5}
+{step5_context}
 
 **Context from Step 6:**
-{context6}
+{step6_context}
 
 **Objective**: Write professional email connecting AI infrastructure capabilities to {company_name}'s stated business goals.
 
@@ -421,4 +419,88 @@ CRITICAL: Focus on QUANTIFIED business value with specific dollar amounts and pe
   "key_talking_points": ["Point 1", "Point 2", "Point 3"]
 }}
 
-CRITICAL: Return only valid JSON. No markdown."""
+CRITICAL: Return only valid JSON. No markdown.""")
+
+
+class PromptTemplates:
+    """All 7 step prompts with JSON output format"""
+    
+    def __init__(self):
+        # Identity of every template this instance rendered, for report metadata
+        self.used: Dict[str, Dict[str, str]] = {}
+    
+    def _render(self, template: PromptTemplate, **values) -> str:
+        self.used[template.name] = template.identity
+        return template.render(**values)
+    
+    def step1_master_research(self, company_name: str) -> str:
+        return self._render(STEP1_MASTER_RESEARCH, company_name=company_name)
+    
+    def shared_context(self, company_name: str, step1_context: str, step1_web_context: str = "") -> str:
+        """
+        Context shared verbatim by steps 2-7 and sent as a cacheable prompt prefix.
+        Keep it free of anything step-specific so providers can reuse the cached prefix.
+        """
+        web_section = f"""**Web Research Used for Step 1:**
+{step1_web_context}
+
+""" if step1_web_context else ""
+        
+        return self._render(
+            SHARED_CONTEXT, company_name=company_name, step1_context=step1_context, web_section=web_section
+        )
+    
+    def step2_bu_alignment(self, company_name: str) -> str:
+        return self._render(STEP2_BU_ALIGNMENT, company_name=company_name)
+    
+    def step3_bu_deepdive(self, company_name: str, business_unit: str) -> str:
+        return self._render(STEP3_BU_DEEPDIVE, company_name=company_name, business_unit=business_unit)
+    
+    def _bu_summary(self, step3_contexts: dict) -> str:
+        # Contexts arrive already fitted to the step's budget (see context_builder.py)
+        return "\n\n".join([
+            f"**{bu}:**\n{context}"
+            for bu, context in step3_contexts.items()
+            if context
+        ])
+    
+    def step4_ai_alignment(self, company_name: str, step3_contexts: dict) -> str:
+        return self._render(
+            STEP4_AI_ALIGNMENT, company_name=company_name, bu_summary=self._bu_summary(step3_contexts)
+        )
+    
+    def step5_persona_mapping(self, company_name: str, step3_contexts: dict, step4_context: str) -> str:
+        return self._render(
+            STEP5_PERSONA_MAPPING,
+            company_name=company_name,
+            bu_summary=self._bu_summary(step3_contexts),
+            step4_context=step4_context
+        )
+    
+    def step5_persona_repair(self, company_name: str, slots: list, web_context: str) -> str:
+        slot_lines = "\n".join([
+            f"- Slot {slot['slot']}: {slot['title'] or 'Unknown title'}"
+            + (f" ({slot['business_unit']})" if slot.get("business_unit") else "")
+            for slot in slots
+        ])
+        
+        return self._render(
+            STEP5_PERSONA_REPAIR,
+            company_name=company_name,
+            slot_lines=slot_lines,
+            web_context=web_context or "No web search results are available; use your own knowledge of the company's current leadership."
+        )
+    
+    def step6_value_realization(self, company_name: str, step4_context: str, step5_context: str) -> str:
+        return self._render(
+            STEP6_VALUE_REALIZATION, company_name=company_name, step4_context=step4_context, step5_context=step5_context
+        )
+    
+    def step7_outreach_email(self, company_name: str, step4_context: str, step5_context: str, step6_context: str) -> str:
+        return self._render(
+            STEP7_OUTREACH_EMAIL,
+            company_name=company_name,
+            step4_context=step4_context,
+            step5_context=step5_context,
+            step6_context=step6_context
+        )
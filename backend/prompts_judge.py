@@ -1,25 +1,18 @@
 """
-Prompts for Judge LLM validation system
+Prompts for Judge LLM validation system, registered as versioned templates
+(see prompt_registry.py)
 """
+from typing import Iterable
 
-def validation_prompt_step(step_name: str, original_prompt: str, output_data: str, citations: list, step_context: str = "") -> str:
-    """
-    Generate validation prompt for a specific research step
-    
-    Args:
-        step_name: Name of the step (e.g., "Step 1: Company Overview")
-        original_prompt: The original prompt used to generate this step
-        output_data: The actual output produced
-        citations: List of citation objects with title, url, relevance_score
-        step_context: Additional context from other steps if needed
-    """
-    
-    citations_text = "\n".join([
-        f"- [{i+1}] {c.get('title', 'No title')} ({c.get('url', 'No URL')}) - Relevance: {c.get('relevance_score', 0):.0%}"
-        for i, c in enumerate(citations)
-    ]) if citations else "No citations provided"
-    
-    return f"""You are validating the quality of AI-generated research. Analyze this research step and provide a quality score.
+from prompt_registry import REGISTRY, PromptTemplate, prompt_key
+
+# Bump whenever the judge changes outside these templates (system prompt,
+# verdict schemas). Stored validations are only reused for the same
+# judge_prompt_version, which also covers the templates' own hashes (see
+# validation_store.py)
+JUDGE_PROMPT_VERSION = "3"
+
+JUDGE_STEP = REGISTRY.register("judge_step", "1", """You are validating the quality of AI-generated research. Analyze this research step and provide a quality score.
 
 **STEP BEING VALIDATED:** {step_name}
 
@@ -55,43 +48,21 @@ def validation_prompt_step(step_name: str, original_prompt: str, output_data: st
    - Sufficient detail and depth?
    - Actionable and useful information?
 
-**REQUIRED OUTPUT FORMAT:**
-
-Score: [0-100]
-Status: [RED/YELLOW/GREEN]
-
-Issues:
-- [List specific issues found, or "None" if none]
-
-Strengths:
-- [List 2-3 strengths]
-
-Recommendations:
-- [Specific improvements needed, or "None" if score is GREEN]
+**REQUIRED OUTPUT (JSON object):**
+- score: integer 0-100
+- status: "RED", "YELLOW" or "GREEN"
+- issues: specific issues found (empty list if none)
+- strengths: 2-3 strengths
+- recommendations: specific improvements needed (empty list if GREEN)
 
 **SCORING GUIDELINES:**
 - GREEN (85-100): High quality, well-cited, accurate, complete
 - YELLOW (70-84): Good but has minor gaps, weak citations, or unclear areas
 - RED (<70): Significant issues - missing citations, inaccuracies, incomplete, or poor adherence
 
-Provide your validation now:"""
-
+Respond with the JSON object only.""")
 
-def overall_validation_prompt(step_scores: dict, full_research: dict) -> str:
-    """
-    Generate prompt for overall research validation across all steps
-    
-    Args:
-        step_scores: Dictionary of individual step scores and findings
-        full_research: Complete research data structure
-    """
-    
-    step_summary = "\n".join([
-        f"- {step}: Score {data['score']}/100 ({data['status']})"
-        for step, data in step_scores.items()
-    ])
-    
-    return f"""You are performing a final holistic validation of a complete research report.
+JUDGE_OVERALL = REGISTRY.register("judge_overall", "1", """You are performing a final holistic validation of a complete research report.
 
 **INDIVIDUAL STEP SCORES:**
 {step_summary}
@@ -115,21 +86,128 @@ Review the consistency and quality across ALL steps of the research.
    - Specific enough for sales/outreach?
    - Clear value propositions?
 
-**REQUIRED OUTPUT FORMAT:**
+**REQUIRED OUTPUT (JSON object):**
+- score: integer 0-100
+- status: "RED", "YELLOW" or "GREEN"
+- critical_issues: cross-step issues or systemic problems (empty list if none)
+- warnings: minor concerns across multiple steps (empty list if none)
+- assessment: 2-3 sentences on overall quality
+- recommendations: top 3 recommendations for improvement (empty list if GREEN)
+
+Respond with the JSON object only.""")
+
+JUDGE_BATCH_SECTION = REGISTRY.register("judge_batch_section", "1", """### {step_name} (key: {step_key})
+
+**OUTPUT PRODUCED:**
+{output_data}
+
+**SOURCE CITATIONS USED:**
+{citations_text}
+
+**AUTOMATED STRUCTURAL FINDINGS:**
+{findings_text}""")
+
+JUDGE_BATCH = REGISTRY.register("judge_batch", "1", """You are validating the quality of an AI-generated research report on {company_name}. Score every step below, then the report as a whole.
+
+Schema conformance, empty sections, placeholder names and presence of citations were already checked automatically (see each step's structural findings) - do not re-check them. Focus on semantic quality: whether claims are accurate and supported, specific rather than generic, and consistent.
+
+{steps_text}
 
-Overall Score: [0-100]
-Overall Status: [RED/YELLOW/GREEN]
+**PER-STEP CRITERIA (score each step 0-100):**
 
-Critical Issues:
-- [Cross-step issues or systemic problems, or "None"]
+1. **Citation Quality (0-30 points)** - Are key claims supported by relevant, authoritative citations? Any potential hallucinations?
+2. **Prompt Adherence (0-30 points)** - Are all required elements present with the right structure?
+3. **Accuracy & Consistency (0-30 points)** - Are facts accurate based on citations? Any contradictions within the step?
+4. **Completeness & Depth (0-10 points)** - Sufficient, actionable detail?
 
-Warnings:
-- [Minor concerns across multiple steps, or "None"]
+**OVERALL CRITERIA (score the report 0-100):**
 
-Overall Assessment:
-[2-3 sentences on overall quality]
+1. **Cross-Step Consistency (0-40 points)** - Do personas in Step 5 align with use cases in Step 4? Does the business case in Step 6 reference earlier findings? Any contradictions between steps?
+2. **Overall Coherence (0-30 points)** - Logical flow from overview to business case? Professional quality throughout?
+3. **Actionability (0-30 points)** - Specific enough for sales/outreach, with clear value propositions?
+
+**SCORING GUIDELINES:**
+- GREEN (85-100): High quality, well-cited, accurate, complete
+- YELLOW (70-84): Good but has minor gaps, weak citations, or unclear areas
+- RED (<70): Significant issues - missing citations, inaccuracies, incomplete, or poor adherence
+
+Keep every list item to one sentence: at most 3 issues, 2 strengths and 3 recommendations per step (empty lists when there are none). Respond with the JSON object only, with a verdict for every step key listed above.""")
+
+
+def judge_prompt_version(templates: Iterable[PromptTemplate]) -> str:
+    """Validation cache key part for verdicts produced with `templates`"""
+    return f"{JUDGE_PROMPT_VERSION}-{prompt_key(templates)}"
+
+
+def validation_prompt_step(step_name: str, original_prompt: str, output_data: str, citations: list, step_context: str = "") -> str:
+    """
+    Generate validation prompt for a specific research step
+    
+    Args:
+        step_name: Name of the step (e.g., "Step 1: Company Overview")
+        original_prompt: The original prompt used to generate this step
+        output_data: The actual output produced
+        citations: List of citation objects with title, url, relevance_score
+        step_context: Additional context from other steps if needed
+    """
+    
+    citations_text = "\n".join([
+        f"- [{i+1}] {c.get('title', 'No title')} ({c.get('url', 'No URL')}) - Relevance: {c.get('relevance_score', 0):.0%}"
+        for i, c in enumerate(citations)
+    ]) if citations else "No citations provided"
+    
+    return JUDGE_STEP.render(
+        step_name=step_name,
+        original_prompt=original_prompt,
+        output_data=output_data,
+        citations_text=citations_text,
+        step_context=step_context
+    )
 
-Recommendations:
-- [Top 3 recommendations for improvement, or "Research meets quality standards" if GREEN]
 
-Provide your overall validation now:"""
+def overall_validation_prompt(step_scores: dict, full_research: dict) -> str:
+    """
+    Generate prompt for overall research validation across all steps
+    
+    Args:
+        step_scores: Dictionary of individual step scores and findings
+        full_research: Complete research data structure
+    """
+    
+    step_summary = "\n".join([
+        f"- {step}: Score {data['score']}/100 ({data['status']})"
+        for step, data in step_scores.items()
+    ])
+    
+    return JUDGE_OVERALL.render(step_summary=step_summary)
+
+
+def batch_validation_prompt(company_name: str, steps: list) -> str:
+    """
+    Generate prompt for validating every step and the report as a whole in one call
+    
+    Args:
+        company_name: Company the research is about
+        steps: One dict per step with step_key, step_name, output_data,
+            citations and findings (structural check results)
+    """
+    
+    sections = []
+    for step in steps:
+        citations = step["citations"]
+        citations_text = "\n".join([
+            f"- [{i+1}] {c.get('title', 'No title')} ({c.get('url', 'No URL')})"
+            for i, c in enumerate(citations)
+        ]) if citations else "No citations provided"
+        findings_text = "\n".join(f"- {finding}" for finding in step["findings"]) or "- None"
+        sections.append(JUDGE_BATCH_SECTION.render(
+            step_name=step["step_name"],
+            step_key=step["step_key"],
+            output_data=step["output_data"],
+            citations_text=citations_text,
+            findings_text=findings_text
+        ))
+    
+    steps_text = "\n\n".join(sections)
+    
+    return JUDGE_BATCH.render(company_name=company_name, steps_text=steps_text)
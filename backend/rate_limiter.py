@@ -0,0 +1,189 @@
+"""
+Token-bucket rate limiting per provider API key.
+
+Each (provider, API key) pair gets two buckets: requests per minute and
+tokens per minute. Calls wait for capacity instead of being sent and
+failing with 429. Token cost is reserved from an estimate before the call
+and settled against the usage the provider reports afterwards.
+
+Bucket state lives in memory (one process) or in the rate_limit_buckets
+table (shared by every worker), selected with RATE_LIMIT_BACKEND. Keys are
+stored as a hash so API keys never reach the database.
+"""
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+
+from context_builder import count_tokens
+from database import SessionLocal, RateLimitBucket
+
+# Defaults per provider, overridable with <PROVIDER>_RPM / <PROVIDER>_TPM
+DEFAULT_LIMITS = {
+    "anthropic": (50, 80000),
+    "openai": (500, 300000),
+}
+
+# Longest single sleep while queued, so freed capacity is noticed promptly
+MAX_POLL_SECONDS = 5.0
+
+
+class RateLimits:
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+    
+    @classmethod
+    def for_provider(cls, provider: str) -> "RateLimits":
+        rpm, tpm = DEFAULT_LIMITS.get(provider, (60, 100000))
+        return cls(
+            rpm=int(os.getenv(f"{provider.upper()}_RPM", rpm)),
+            tpm=int(os.getenv(f"{provider.upper()}_TPM", tpm))
+        )
+
+
+def bucket_key(provider: str, api_key: str) -> str:
+    """Bucket id: provider plus the first 16 hex chars of sha256(api_key)"""
+    return f"{provider}:{hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]}"
+
+
+def estimate_tokens(prompt: str, max_tokens: int) -> int:
+    """Rough pre-call token cost: ~4 characters per prompt token plus the output budget"""
+    return count_tokens(prompt) + max_tokens
+
+
+def take(
+    requests: float,
+    tokens: float,
+    elapsed: float,
+    limits: RateLimits,
+    cost: int
+) -> Tuple[float, float, float]:
+    """
+    Refill both buckets for `elapsed` seconds and try to take one request and `cost` tokens.
+    
+    Returns (requests, tokens, wait_seconds). When wait_seconds is 0 the cost
+    has been deducted; otherwise the levels are only refilled.
+    """
+    requests = min(limits.rpm, requests + elapsed * limits.rpm / 60)
+    tokens = min(limits.tpm, tokens + elapsed * limits.tpm / 60)
+    
+    # A single call larger than the whole bucket only waits for a full bucket
+    cost = min(cost, limits.tpm)
+    wait = max(
+        (1 - requests) * 60 / limits.rpm,
+        (cost - tokens) * 60 / limits.tpm,
+        0.0
+    )
+    if wait == 0:
+        requests -= 1
+        tokens -= cost
+    return requests, tokens, wait
+
+
+class MemoryBucketStore:
+    """Bucket state for a single process"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}
+    
+    def try_acquire(self, key: str, limits: RateLimits, cost: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            requests, tokens, updated = self._buckets.get(key, (limits.rpm, limits.tpm, now))
+            requests, tokens, wait = take(requests, tokens, now - updated, limits, cost)
+            self._buckets[key] = (requests, tokens, now)
+            return wait
+    
+    def adjust_tokens(self, key: str, limits: RateLimits, delta: int):
+        with self._lock:
+            if key in self._buckets:
+                requests, tokens, updated = self._buckets[key]
+                self._buckets[key] = (requests, min(limits.tpm, tokens + delta), updated)
+
+
+class PostgresBucketStore:
+    """Bucket state shared by all workers, one row per key, updated under a row lock"""
+    
+    def try_acquire(self, key: str, limits: RateLimits, cost: int) -> float:
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            db.execute(insert(RateLimitBucket).values(
+                bucket_key=key, requests=limits.rpm, tokens=limits.tpm, updated_at=now
+            ).on_conflict_do_nothing(index_elements=["bucket_key"]))
+            
+            bucket = db.query(RateLimitBucket).filter(RateLimitBucket.bucket_key == key).with_for_update().one()
+            elapsed = max((now - bucket.updated_at).total_seconds(), 0.0)
+            bucket.requests, bucket.tokens, wait = take(bucket.requests, bucket.tokens, elapsed, limits, cost)
+            bucket.updated_at = now
+            db.commit()
+            return wait
+        finally:
+            db.close()
+    
+    def adjust_tokens(self, key: str, limits: RateLimits, delta: int):
+        db = SessionLocal()
+        try:
+            db.query(RateLimitBucket).filter(RateLimitBucket.bucket_key == key).update(
+                {RateLimitBucket.tokens: func.least(limits.tpm, RateLimitBucket.tokens + delta)},
+                synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+
+class RateLimiter:
+    """Queues calls for one provider API key until both buckets have capacity"""
+    
+    def __init__(self, key: str, limits: RateLimits, store):
+        self.key = key
+        self.limits = limits
+        self.store = store
+    
+    async def acquire(self, cost: int) -> float:
+        """Wait until one request and `cost` tokens are available; returns seconds spent waiting"""
+        waited = 0.0
+        while True:
+            wait = await asyncio.to_thread(self._try_acquire, cost)
+            if wait <= 0:
+                return waited
+            wait = min(wait, MAX_POLL_SECONDS)
+            await asyncio.sleep(wait)
+            waited += wait
+    
+    async def settle(self, reserved: int, used: int):
+        """Return (or charge) the difference between the reserved estimate and reported usage"""
+        if reserved != used:
+            await asyncio.to_thread(self._adjust_tokens, reserved - used)
+    
+    def _try_acquire(self, cost: int) -> float:
+        try:
+            return self.store.try_acquire(self.key, self.limits, cost)
+        except Exception as e:
+            # Shared state unavailable - keep limiting within this process
+            print(f"Rate limit store error, using in-process buckets: {e}")
+            return _memory_store.try_acquire(self.key, self.limits, cost)
+    
+    def _adjust_tokens(self, delta: int):
+        try:
+            self.store.adjust_tokens(self.key, self.limits, delta)
+        except Exception as e:
+            print(f"Rate limit store error: {e}")
+
+
+_memory_store = MemoryBucketStore()
+
+
+def get_rate_limiter(provider: str, api_key: str) -> RateLimiter:
+    """Rate limiter for a provider API key, backed by RATE_LIMIT_BACKEND ("memory" or "postgres")"""
+    store = PostgresBucketStore() if os.getenv("RATE_LIMIT_BACKEND", "memory") == "postgres" else _memory_store
+    return RateLimiter(bucket_key(provider, api_key), RateLimits.for_provider(provider), store)
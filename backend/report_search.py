@@ -0,0 +1,211 @@
+"""
+Full-text and faceted search across saved reports and personas.
+
+Report steps are indexed into `report_step_search` when a report is saved;
+personas carry a generated `search_vector` column maintained by Postgres.
+Queries use websearch syntax ("reconciliation -manual", "\"general ledger\"").
+"""
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database import Company, Report, Persona, ReportStepSearch, REPORT_STEP_COLUMNS
+
+SEARCH_CONFIG = "english"
+
+# Step keys that hold references or bookkeeping rather than searchable content
+NON_CONTENT_KEYS = {
+    "raw", "raw_ref", "raw_response", "raw_response_ref", "citations", "citations_ref", "status", "schema_errors"
+}
+
+
+def extract_step_text(step: Any) -> str:
+    """
+    Collect the searchable text of a step (parsed data only, no raw LLM text).
+    Migration 0003 backfilled older reports with a copy of this function.
+    """
+    parts: List[str] = []
+    
+    def walk(value: Any):
+        if isinstance(value, str):
+            parts.append(value)
+        elif isinstance(value, dict):
+            for key, item in value.items():
+                if key not in NON_CONTENT_KEYS:
+                    walk(item)
+        elif isinstance(value, list):
+            for item in value:
+                walk(item)
+    
+    if isinstance(step, dict):
+        data = step.get("data")
+        # Step 3 is keyed by business unit name, which is itself worth matching
+        if isinstance(data, dict) and all(isinstance(v, dict) and "data" in v for v in data.values()):
+            parts.extend(data.keys())
+        walk(data)
+    else:
+        walk(step)
+    
+    return "\n".join(parts)
+
+
+def index_report_steps(db: Session, report_id: int, steps: Dict[str, Any]):
+    """Write (or replace) the search documents for a report's steps"""
+    db.query(ReportStepSearch).filter(ReportStepSearch.report_id == report_id).delete(synchronize_session=False)
+    
+    for number, column in enumerate(REPORT_STEP_COLUMNS, 1):
+        step = steps.get(column)
+        if not step:
+            continue
+        db.add(ReportStepSearch(
+            report_id=report_id,
+            step_number=number,
+            step_key=column,
+            content=func.to_tsvector(SEARCH_CONFIG, extract_step_text(step))
+        ))
+
+
+def _facet(query, column, label: str) -> List[Dict]:
+    rows = query.with_entities(column.label(label), func.count().label("count")).group_by(column).order_by(
+        func.count().desc()
+    ).all()
+    return [{"value": value, "count": count} for value, count in rows]
+
+
+def _apply_filters(query, industry: Optional[str], provider: Optional[str],
+                   date_column, date_from: Optional[date], date_to: Optional[date]):
+    if industry:
+        query = query.filter(Company.industry == industry)
+    if provider:
+        query = query.filter(Report.llm_provider == provider)
+    if date_from:
+        query = query.filter(date_column >= date_from)
+    if date_to:
+        query = query.filter(func.date(date_column) <= date_to)
+    return query
+
+
+def search_reports(
+    db: Session,
+    q: str,
+    step: Optional[int] = None,
+    industry: Optional[str] = None,
+    provider: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    page: int = 1,
+    page_size: int = 20
+) -> Dict[str, Any]:
+    """Rank reports by their best-matching step, with industry/provider/month facets"""
+    tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+    
+    matches = db.query(
+        ReportStepSearch.report_id.label("report_id"),
+        func.max(func.ts_rank_cd(ReportStepSearch.content, tsquery)).label("rank"),
+        func.array_agg(ReportStepSearch.step_number).label("matched_steps")
+    ).filter(ReportStepSearch.content.op("@@")(tsquery))
+    if step:
+        matches = matches.filter(ReportStepSearch.step_number == step)
+    matches = matches.group_by(ReportStepSearch.report_id).subquery()
+    
+    base = db.query(Report.id).select_from(matches).join(
+        Report, Report.id == matches.c.report_id
+    ).join(Company, Company.id == Report.company_id)
+    base = _apply_filters(base, industry, provider, Report.created_at, date_from, date_to)
+    
+    total = base.count()
+    rows = base.with_entities(
+        Report.id, Report.research_id, Report.llm_provider, Report.created_at,
+        Company.id.label("company_id"), Company.name.label("company_name"), Company.industry,
+        matches.c.rank, matches.c.matched_steps
+    ).order_by(matches.c.rank.desc(), Report.created_at.desc()).offset((page - 1) * page_size).limit(page_size).all()
+    
+    return {
+        "scope": "reports",
+        "query": q,
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "results": [{
+            "report_id": row.id,
+            "research_id": str(row.research_id),
+            "company_id": row.company_id,
+            "company_name": row.company_name,
+            "industry": row.industry,
+            "llm_provider": row.llm_provider,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+            "rank": round(float(row.rank), 4),
+            "matched_steps": [
+                {"step": n, "step_key": REPORT_STEP_COLUMNS[n - 1]} for n in sorted(row.matched_steps)
+            ]
+        } for row in rows],
+        "facets": {
+            "industry": _facet(base, Company.industry, "industry"),
+            "provider": _facet(base, Report.llm_provider, "provider"),
+            "month": _facet(base, func.to_char(Report.created_at, "YYYY-MM"), "month")
+        }
+    }
+
+
+def search_personas(
+    db: Session,
+    q: str,
+    title: Optional[str] = None,
+    industry: Optional[str] = None,
+    provider: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    page: int = 1,
+    page_size: int = 20
+) -> Dict[str, Any]:
+    """
+    Rank personas by weighted match (name/title > pain point > use case > rest).
+    e.g. q="reconciliation", title="CFO"
+    """
+    tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+    rank = func.ts_rank_cd(Persona.search_vector, tsquery)
+    seen_at = func.coalesce(Persona.last_researched_at, Persona.created_at)
+    
+    base = db.query(Persona.id).join(Company, Company.id == Persona.company_id).outerjoin(
+        Report, Report.id == Persona.report_id
+    ).filter(Persona.search_vector.op("@@")(tsquery))
+    if title:
+        base = base.filter(Persona.title.ilike(f"%{title}%"))
+    base = _apply_filters(base, industry, provider, seen_at, date_from, date_to)
+    
+    total = base.count()
+    rows = base.with_entities(
+        Persona.id, Persona.name, Persona.title, Persona.pain_point, Persona.ai_use_case,
+        Persona.source, Persona.report_id, seen_at.label("last_seen"),
+        Company.id.label("company_id"), Company.name.label("company_name"), Company.industry,
+        rank.label("rank")
+    ).order_by(rank.desc(), seen_at.desc()).offset((page - 1) * page_size).limit(page_size).all()
+    
+    return {
+        "scope": "personas",
+        "query": q,
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "results": [{
+            "persona_id": row.id,
+            "name": row.name,
+            "title": row.title,
+            "pain_point": row.pain_point,
+            "ai_use_case": row.ai_use_case,
+            "source": row.source,
+            "report_id": row.report_id,
+            "company_id": row.company_id,
+            "company_name": row.company_name,
+            "industry": row.industry,
+            "last_seen": row.last_seen.isoformat() if row.last_seen else None,
+            "rank": round(float(row.rank), 4)
+        } for row in rows],
+        "facets": {
+            "industry": _facet(base, Company.industry, "industry"),
+            "provider": _facet(base, Report.llm_provider, "provider"),
+            "month": _facet(base, func.to_char(seen_at, "YYYY-MM"), "month")
+        }
+    }
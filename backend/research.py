@@ -3,16 +3,46 @@ import asyncio
 import json
 import uuid
 from datetime import datetime
-from typing import AsyncGenerator, Dict, Optional
-from llm_client import LLMClient
+from typing import AsyncGenerator, Dict, List, Optional, Tuple
+from failover import FailoverLLMClient
+from model_routing import ModelRouter
+from json_stream import IncrementalJSONParser, parse_json_text
+from schemas import PERSONA_REPAIR_SCHEMA, STEP_SCHEMAS, validate_against_schema
 from prompts import PromptTemplates
-from search_client import TavilySearchClient
+from search_client import EXECUTIVE_ROLES, TavilySearchClient
+from search_corpus import SearchCorpus
+from context_builder import ContextBuilder
 from parsers import extract_industry_from_text
+from validation_rules import is_placeholder_name
+from executive_directory import ExecutiveDirectory, known_executives_context, role_for_title
+
+# Steps whose LLM calls are hedged when hedge_requests is on (the long tail of a run)
+HEDGED_STEPS = {5, 6, 7}
+
+# Step 5 is regenerated in full if a persona repair leaves more than this share of placeholder names
+MAX_PLACEHOLDER_SHARE = 0.25
+
 
 class ResearchOrchestrator:
-    def __init__(self, tavily_api_key: Optional[str] = None):
+    def __init__(
+        self,
+        tavily_api_key: Optional[str] = None,
+        stream_tokens: bool = True,
+        hedge_requests: bool = False,
+        hedge_delay_seconds: Optional[float] = None,
+        model_routing: Optional[Dict] = None,
+        executive_directory: Optional[ExecutiveDirectory] = None
+    ):
         self.prompts = PromptTemplates()
         self.search_client = TavilySearchClient(tavily_api_key) if tavily_api_key else None
+        self.stream_tokens = stream_tokens
+        self.hedge_requests = hedge_requests
+        self.hedge_delay_seconds = hedge_delay_seconds
+        self.model_router = ModelRouter(model_routing)
+        # Search results seen during this run, deduplicated across steps
+        self.search_corpus = SearchCorpus()
+        # Executives found by earlier runs; step 5 only searches for the roles it lacks
+        self.executive_directory = executive_directory
         
         # Metadata tracking
         self.metadata = {
@@ -20,9 +50,29 @@ class ResearchOrchestrator:
             "start_time": None,
             "end_time": None,
             "total_tokens": 0,
+            "cache_read_tokens": 0,
+            "cache_creation_tokens": 0,
             "tavily_searches": 0,
+            "advanced_searches": 0,
+            "search_credits": 0,
+            "search_policy": [],
+            "search_results": 0,
+            "duplicate_search_results": 0,
+            "executive_roles_searched": [],
+            "executive_roles_reused": [],
             "llm_calls": 0,
-            "retries": 0
+            "retries": 0,
+            "persona_repairs": 0,
+            "repaired_personas": 0,
+            "schema_violations": 0,
+            "rate_limit_wait_seconds": 0,
+            "failovers": 0,
+            "hedged_requests": 0,
+            "hedge_wins": 0,
+            "model": None,
+            "step_models": {},
+            "model_usage": {},
+            "prompt_versions": {}
         }
     
     def _parse_json_response(self, response: str) -> dict:
@@ -31,23 +81,12 @@ class ResearchOrchestrator:
             # Try to parse as pure JSON first
             return json.loads(response)
         except json.JSONDecodeError:
-            # Try to extract JSON from markdown code blocks
-            import re
-            json_match = re.search(r'```json\s*(\{.*?\})\s*```', response, re.DOTALL)
-            if json_match:
-                try:
-                    return json.loads(json_match.group(1))
-                except json.JSONDecodeError:
-                    pass
-            
-            # Try to find JSON object in the response
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
-            if json_match:
-                try:
-                    return json.loads(json_match.group(0))
-                except json.JSONDecodeError:
-                    pass
-            
+            pass
+        
+        try:
+            # Skip code fences and surrounding prose, closing truncated output
+            return parse_json_text(response)
+        except ValueError:
             # Fallback: return raw text wrapped in error structure
             return {
                 "error": "Failed to parse JSON",
@@ -55,18 +94,119 @@ class ResearchOrchestrator:
                 "fallback": True
             }
     
+    def _parse_step_response(self, response: str, step: int) -> Tuple[dict, List[str]]:
+        """Parse a step response and check it against the step's JSON schema"""
+        result = self._parse_json_response(response)
+        
+        if isinstance(result, dict) and result.get("fallback"):
+            errors = ["$: response is not valid JSON"]
+        else:
+            errors = validate_against_schema(result, STEP_SCHEMAS[step]["schema"])
+        
+        if errors:
+            self.metadata["schema_violations"] += 1
+        return result, errors
+    
+    async def _stream_llm_step(
+        self,
+        llm: FailoverLLMClient,
+        prompt: str,
+        step: int,
+        step_name: str,
+        chunks: List[str],
+        route: Optional[str] = None,
+        prefix: Optional[str] = None,
+        **event_fields
+    ) -> AsyncGenerator[Dict, None]:
+        """
+        Call the LLM for a step, yielding step_delta events as tokens arrive
+        and a step_item event for every completed top-level array element.
+        Output is constrained to the step's JSON schema.
+        
+        The response text is collected into `chunks`; join it once the
+        generator is exhausted. With streaming disabled this makes a single
+        blocking call and yields nothing. `route` selects the model tier
+        (default "step<N>", see model_routing.py); `prefix` is the shared
+        context sent ahead of the prompt for provider prompt caching.
+        """
+        hedge = self.hedge_requests and step in HEDGED_STEPS
+        route = route or f"step{step}"
+        self.metadata["step_models"][route] = llm.router.model_for(llm.provider, route) or llm.model
+        
+        if not self.stream_tokens:
+            chunks.append(await llm.call_llm(
+                prompt, json_schema=STEP_SCHEMAS[step], hedge=hedge, route=route, prefix=prefix
+            ))
+            self._record_usage(llm)
+            return
+        
+        parser = IncrementalJSONParser()
+        async for delta in llm.stream_llm(
+            prompt, json_schema=STEP_SCHEMAS[step], hedge=hedge, route=route, prefix=prefix
+        ):
+            chunks.append(delta)
+            yield {
+                "type": "step_delta",
+                "step": step,
+                "step_name": step_name,
+                "delta": delta,
+                **event_fields
+            }
+            
+            # Emit each array element (persona, use case, ...) as soon as it closes
+            for item in parser.feed(delta):
+                yield {
+                    "type": "step_item",
+                    "step": step,
+                    "step_name": step_name,
+                    **item,
+                    **event_fields
+                }
+        
+        self._record_usage(llm)
+    
+    def _fit_search_results(self, step: str, search_results: List[Dict]) -> Tuple[str, List[Dict]]:
+        """
+        Rank a step's search results against the run's corpus and fit them into
+        the step's context budget; returns (web context, citations actually used)
+        """
+        ranked = self.search_corpus.rank(search_results)
+        builder = ContextBuilder.for_step(step).add_search_results("web", ranked)
+        web_context = builder.build()["web"]
+        return web_context, self.search_corpus.serve(builder.kept_results("web"))
+    
+    def _record_usage(self, llm: FailoverLLMClient):
+        """Copy token usage (total, cached and per model), rate limit waits and failover/hedge counts into metadata"""
+        self.metadata["total_tokens"] = llm.total_tokens
+        self.metadata["cache_read_tokens"] = llm.usage["cache_read_tokens"]
+        self.metadata["cache_creation_tokens"] = llm.usage["cache_creation_tokens"]
+        self.metadata["model_usage"] = llm.model_usage
+        self.metadata["rate_limit_wait_seconds"] = round(llm.rate_limit_wait_seconds, 1)
+        self.metadata.update(llm.stats)
+        self.metadata.update(self.search_corpus.stats)
+        # Version and hash of each prompt template used (see prompt_registry.py)
+        self.metadata["prompt_versions"] = dict(self.prompts.used)
+        if self.search_client:
+            self.metadata["tavily_searches"] = self.search_client.searches
+            policy_log = self.search_client.policy_log
+            self.metadata["search_policy"] = list(policy_log)
+            self.metadata["advanced_searches"] = sum(entry["depth"] == "advanced" for entry in policy_log)
+            self.metadata["search_credits"] = sum(entry["credits"] for entry in policy_log)
+    
     async def run_full_research(
         self, 
         company_name: str,
         llm_provider: str,
-        api_key: str
+        api_key: str,
+        fallback_provider: Optional[str] = None,
+        fallback_api_key: Optional[str] = None
     ) -> AsyncGenerator[Dict, None]:
         """
         Execute all 7 steps sequentially, yielding progress updates.
         
         Yields updates in format:
         {
-            "type": "progress" | "step_complete" | "complete" | "error",
+            "type": "progress" | "step_delta" | "step_complete" | "complete" | "error",
             "step": 1-7,
             "step_name": str,
             "data": str (result of step),
@@ -75,7 +215,16 @@ class ResearchOrchestrator:
         }
         """
         self.metadata["start_time"] = datetime.now().isoformat()
-        llm = LLMClient(provider=llm_provider, api_key=api_key)
+        llm = FailoverLLMClient(
+            provider=llm_provider,
+            api_key=api_key,
+            fallback_provider=fallback_provider,
+            fallback_api_key=fallback_api_key,
+            hedge_delay_seconds=self.hedge_delay_seconds,
+            router=self.model_router,
+            tool_schemas=list(STEP_SCHEMAS.values())
+        )
+        self.metadata["model"] = llm.model
         
         results = {
             "research_id": self.metadata["research_id"],
@@ -99,27 +248,31 @@ class ResearchOrchestrator:
             }
             
             # Get recent web data if search is available
-            web_context = ""
-            step1_citations = []
+            step1_search = []
             if self.search_client:
-                web_context, step1_citations = self.search_client.search_for_step(
-                    company_name, "strategic objectives plans initiatives 2024 2025"
-                )
-                self.metadata["tavily_searches"] += 1
+                # Tavily calls (and their retry backoff) block, so every search runs in a worker thread
+                step1_search = self.search_corpus.add(await asyncio.to_thread(
+                    self.search_client.search_for_step, company_name, "strategic objectives plans initiatives 2024 2025"
+                ))
             
+            web_context, step1_citations = self._fit_search_results("step1", step1_search)
             step1_prompt = self.prompts.step1_master_research(company_name)
             if web_context:
                 step1_prompt = web_context + "\n\n" + step1_prompt
             
-            step1_raw = await llm.call_llm(step1_prompt)
+            chunks = []
+            async for event in self._stream_llm_step(llm, step1_prompt, 1, "Strategic Objectives", chunks):
+                yield event
+            step1_raw = "".join(chunks)
             self.metadata["llm_calls"] += 1
             
             # Parse JSON response
-            step1_result = self._parse_json_response(step1_raw)
+            step1_result, step1_schema_errors = self._parse_step_response(step1_raw, 1)
             
             results["steps"]["step1_strategic_objectives"] = {
                 "status": "complete",
                 "data": step1_result,
+                "schema_errors": step1_schema_errors,
                 "raw": step1_raw,
                 "citations": step1_citations
             }
@@ -141,6 +294,15 @@ class ResearchOrchestrator:
                 "progress_percent": 14
             }
             
+            # Steps 2-7 all send the same step 1 context first so providers can cache it
+            shared = ContextBuilder.for_step("shared")
+            shared.add_json("step1", step1_raw, priority=1)
+            shared.add_search_results("web", self.search_corpus.rank(step1_search, top_n=None), priority=2)
+            contexts = shared.build()
+            # Later steps already see these results in the prefix
+            self.search_corpus.pin(shared.kept_results("web"))
+            shared_prefix = self.prompts.shared_context(company_name, contexts["step1"], contexts["web"])
+            
             # Step 2: Business Unit Alignment
             yield {
                 "type": "progress",
@@ -151,29 +313,32 @@ class ResearchOrchestrator:
             }
             
             # Get recent web data if search is available
-            web_context = ""
-            step2_citations = []
+            step2_search = []
             if self.search_client:
-                web_context, step2_citations = self.search_client.search_for_step(
-                    company_name, "business units divisions segments structure 2024 2025"
-                )
-                self.metadata["tavily_searches"] += 1
-            
-            # Pass raw string for context (not parsed JSON)
-            step1_context = step1_raw if isinstance(step1_result, dict) else str(step1_result)
-            step2_prompt = self.prompts.step2_bu_alignment(company_name, step1_context)
+                step2_search = self.search_corpus.add(await asyncio.to_thread(
+                    self.search_client.search_for_step, company_name, "business units divisions segments structure 2024 2025"
+                ))
+            
+            web_context, step2_citations = self._fit_search_results("step2", step2_search)
+            step2_prompt = self.prompts.step2_bu_alignment(company_name)
             if web_context:
                 step2_prompt = web_context + "\n\n" + step2_prompt
             
-            step2_raw = await llm.call_llm(step2_prompt)
+            chunks = []
+            async for event in self._stream_llm_step(
+                llm, step2_prompt, 2, "Business Unit Alignment", chunks, prefix=shared_prefix
+            ):
+                yield event
+            step2_raw = "".join(chunks)
             self.metadata["llm_calls"] += 1
             
             # Parse JSON response
-            step2_result = self._parse_json_response(step2_raw)
+            step2_result, step2_schema_errors = self._parse_step_response(step2_raw, 2)
             
             results["steps"]["step2_bu_alignment"] = {
                 "status": "complete",
                 "data": step2_result,
+                "schema_errors": step2_schema_errors,
                 "raw": step2_raw,
                 "citations": step2_citations
             }
@@ -209,26 +374,31 @@ class ResearchOrchestrator:
                 }
                 
                 # Get recent web data if search is available
-                web_context = ""
-                bu_citations = []
+                bu_search = []
                 if self.search_client:
-                    web_context, bu_citations = self.search_client.search_for_step(
-                        company_name, f"{bu} business unit operations initiatives 2024 2025"
-                    )
-                    self.metadata["tavily_searches"] += 1
-                    step3_citations.extend(bu_citations)
+                    bu_search = self.search_corpus.add(await asyncio.to_thread(
+                        self.search_client.search_for_step, company_name, f"{bu} business unit operations initiatives 2024 2025"
+                    ))
                 
-                step3_prompt = self.prompts.step3_bu_deepdive(company_name, bu, step1_context)
+                web_context, bu_citations = self._fit_search_results("step3", bu_search)
+                step3_citations.extend(c for c in bu_citations if c not in step3_citations)
+                step3_prompt = self.prompts.step3_bu_deepdive(company_name, bu)
                 if web_context:
                     step3_prompt = web_context + "\n\n" + step3_prompt
                 
-                bu_raw = await llm.call_llm(step3_prompt)
+                chunks = []
+                async for event in self._stream_llm_step(
+                    llm, step3_prompt, 3, "Business Unit Deep-Dive", chunks, prefix=shared_prefix, business_unit=bu
+                ):
+                    yield event
+                bu_raw = "".join(chunks)
                 self.metadata["llm_calls"] += 1
                 
                 # Parse JSON response
-                bu_parsed = self._parse_json_response(bu_raw)
+                bu_parsed, bu_schema_errors = self._parse_step_response(bu_raw, 3)
                 step3_results[bu] = {
                     "data": bu_parsed,
+                    "schema_errors": bu_schema_errors,
                     "raw": bu_raw
                 }
             
@@ -256,30 +426,42 @@ class ResearchOrchestrator:
             }
             
             # Get recent web data if search is available
-            web_context = ""
-            step4_citations = []
+            step4_search = []
             if self.search_client:
-                web_context, step4_citations = self.search_client.search_for_step(
-                    company_name, "AI artificial intelligence machine learning initiatives 2024 2025"
-                )
-                self.metadata["tavily_searches"] += 1
-            
-            # Prepare context strings for step4
-            step3_raw_contexts = {bu: data["raw"] for bu, data in step3_results.items()}
-            
-            step4_prompt = self.prompts.step4_ai_alignment(company_name, step1_context, step3_raw_contexts)
+                step4_search = self.search_corpus.add(await asyncio.to_thread(
+                    self.search_client.search_for_step, company_name, "AI artificial intelligence machine learning initiatives 2024 2025"
+                ))
+            
+            # Fit step 3 output and web results into the step 4 budget
+            builder = ContextBuilder.for_step("step4")
+            for bu, data in step3_results.items():
+                builder.add_json(f"step3:{bu}", data["raw"], priority=1)
+            builder.add_search_results("web", self.search_corpus.rank(step4_search), priority=2, max_share=0.4)
+            contexts = builder.build()
+            web_context = contexts["web"]
+            step4_citations = self.search_corpus.serve(builder.kept_results("web"))
+            
+            step4_prompt = self.prompts.step4_ai_alignment(
+                company_name, {bu: contexts[f"step3:{bu}"] for bu in step3_results}
+            )
             if web_context:
                 step4_prompt = web_context + "\n\n" + step4_prompt
             
-            step4_raw = await llm.call_llm(step4_prompt)
+            chunks = []
+            async for event in self._stream_llm_step(
+                llm, step4_prompt, 4, "AI Alignment", chunks, prefix=shared_prefix
+            ):
+                yield event
+            step4_raw = "".join(chunks)
             self.metadata["llm_calls"] += 1
             
             # Parse JSON response
-            step4_result = self._parse_json_response(step4_raw)
+            step4_result, step4_schema_errors = self._parse_step_response(step4_raw, 4)
             
             results["steps"]["step4_ai_alignment"] = {
                 "status": "complete",
                 "data": step4_result,
+                "schema_errors": step4_schema_errors,
                 "raw": step4_raw,
                 "citations": step4_citations
             }
@@ -301,26 +483,60 @@ class ResearchOrchestrator:
                 "progress_percent": 57
             }
             
+            # Roles with a fresh directory entry from an earlier run are not searched again
+            known_executives = {}
+            if self.executive_directory:
+                try:
+                    known_executives = await asyncio.to_thread(self.executive_directory.lookup, company_name)
+                except Exception as e:
+                    print(f"Executive directory lookup failed: {e}")
+            self.metadata["executive_roles_reused"] = list(known_executives)
+            
             # Get recent web data for executive names if search is available
             # Use multiple targeted searches for better executive name discovery
-            web_context = ""
-            step5_citations = []
+            step5_search = []
             if self.search_client:
-                web_context, step5_citations = self.search_client.search_executives_multi(company_name)
-                self.metadata["tavily_searches"] += 10  # 10 targeted searches (6 C-suite + 4 BU-level)
+                roles = [role for role in EXECUTIVE_ROLES if role not in known_executives]
+                if roles:
+                    step5_search = self.search_corpus.add(
+                        await asyncio.to_thread(self.search_client.search_executives_multi, company_name, roles=roles)
+                    )
+                self.metadata["executive_roles_searched"] = roles
+            
+            # Executive search results carry the names, so they come first
+            builder = ContextBuilder.for_step("step5")
+            if known_executives:
+                builder.add_text("directory", known_executives_context(known_executives), priority=1, max_share=0.2)
+            builder.add_search_results(
+                "web", self.search_corpus.rank(step5_search, top_n=None), priority=1, max_share=0.5,
+                title="EXECUTIVE SEARCH RESULTS (MULTIPLE TARGETED QUERIES)"
+            )
+            builder.add_json("step4", step4_raw, priority=2)
+            for bu, data in step3_results.items():
+                builder.add_json(f"step3:{bu}", data["raw"], priority=3)
+            contexts = builder.build()
+            web_context = contexts["web"]
+            step5_citations = self.search_corpus.serve(builder.kept_results("web"))
             
             step5_prompt = self.prompts.step5_persona_mapping(
-                company_name, step1_context, step3_raw_contexts, step4_raw
+                company_name, {bu: contexts[f"step3:{bu}"] for bu in step3_results}, contexts["step4"]
             )
             if web_context:
                 step5_prompt = web_context + "\n\n" + step5_prompt
+            if known_executives:
+                step5_prompt = contexts["directory"] + "\n\n" + step5_prompt
             
             # First attempt
-            step5_raw = await llm.call_llm(step5_prompt)
+            chunks = []
+            async for event in self._stream_llm_step(
+                llm, step5_prompt, 5, "Persona Mapping", chunks, prefix=shared_prefix
+            ):
+                yield event
+            step5_raw = "".join(chunks)
             self.metadata["llm_calls"] += 1
             
             # Parse and validate
-            step5_result = self._parse_json_response(step5_raw)
+            step5_result, step5_schema_errors = self._parse_step_response(step5_raw, 5)
             
             # Validate: Check if result contains TBD or lacks real names
             if self._needs_persona_retry(step5_raw):
@@ -328,14 +544,27 @@ class ResearchOrchestrator:
                     "type": "progress",
                     "step": 5,
                     "step_name": "Persona Mapping",
-                    "message": "Refining executive search...",
+                    "message": "Searching for missing executive names...",
                     "progress_percent": 62
                 }
                 
-                # Retry with stronger prompt
-                retry_prompt = f"""CRITICAL RETRY: The previous attempt failed to find actual executive names.
-
-{web_context}
+                # Repair only the placeholder slots, keeping the personas that have names
+                repaired = False
+                if isinstance(step5_result, dict) and isinstance(step5_result.get("personas"), list) and step5_result["personas"]:
+                    filled, repair_citations = await self._repair_personas(llm, company_name, step5_result)
+                    cited = {citation["url"] for citation in step5_citations}
+                    step5_citations += [c for c in repair_citations if c["url"] not in cited]
+                    if filled:
+                        step5_raw = json.dumps(step5_result, ensure_ascii=False)
+                        step5_schema_errors = validate_against_schema(step5_result, STEP_SCHEMAS[5]["schema"])
+                    personas = step5_result["personas"]
+                    placeholders = sum(is_placeholder_name(p.get("name") if isinstance(p, dict) else None) for p in personas)
+                    repaired = filled > 0 and placeholders <= MAX_PLACEHOLDER_SHARE * len(personas)
+                
+                if not repaired:
+                    # Nothing to repair (unparseable output, no personas), or the repair filled no
+                    # slots or left too many placeholders: regenerate
+                    retry_prompt = f"""CRITICAL RETRY: The previous attempt failed to find actual executive names.
 
 {step5_prompt}
 
@@ -345,15 +574,22 @@ class ResearchOrchestrator:
 - If a name is in the search results, you MUST use it
 - Review the search results carefully - names are present in the content
 - Do not proceed without finding at least 3 actual executive names"""
-                
-                step5_raw = await llm.call_llm(retry_prompt)
-                self.metadata["llm_calls"] += 1
-                self.metadata["retries"] += 1
-                step5_result = self._parse_json_response(step5_raw)
+                    
+                    chunks = []
+                    async for event in self._stream_llm_step(
+                        llm, retry_prompt, 5, "Persona Mapping", chunks,
+                        route="step5_retry", prefix=shared_prefix, retry=True
+                    ):
+                        yield event
+                    step5_raw = "".join(chunks)
+                    self.metadata["llm_calls"] += 1
+                    self.metadata["retries"] += 1
+                    step5_result, step5_schema_errors = self._parse_step_response(step5_raw, 5)
             
             results["steps"]["step5_persona_mapping"] = {
                 "status": "complete",
                 "data": step5_result,
+                "schema_errors": step5_schema_errors,
                 "raw": step5_raw,
                 "citations": step5_citations
             }
@@ -375,19 +611,30 @@ class ResearchOrchestrator:
                 "progress_percent": 71
             }
             
-            step6_raw = await llm.call_llm(
-                self.prompts.step6_value_realization(
-                    company_name, step1_context, step3_raw_contexts, step4_raw, step5_raw
-                )
+            contexts = (
+                ContextBuilder.for_step("step6")
+                .add_json("step4", step4_raw, priority=1)
+                .add_json("step5", step5_raw, priority=1)
+                .build()
+            )
+            step6_prompt = self.prompts.step6_value_realization(
+                company_name, contexts["step4"], contexts["step5"]
             )
+            chunks = []
+            async for event in self._stream_llm_step(
+                llm, step6_prompt, 6, "Value Realization", chunks, prefix=shared_prefix
+            ):
+                yield event
+            step6_raw = "".join(chunks)
             self.metadata["llm_calls"] += 1
             
             # Parse JSON response
-            step6_result = self._parse_json_response(step6_raw)
+            step6_result, step6_schema_errors = self._parse_step_response(step6_raw, 6)
             
             results["steps"]["step6_value_realization"] = {
                 "status": "complete",
                 "data": step6_result,
+                "schema_errors": step6_schema_errors,
                 "raw": step6_raw,
                 "citations": []  # No web search for step 6
             }
@@ -409,19 +656,31 @@ class ResearchOrchestrator:
                 "progress_percent": 85
             }
             
-            step7_raw = await llm.call_llm(
-                self.prompts.step7_outreach_email(
-                    company_name, step1_context, step4_raw, step5_raw, step6_raw
-                )
+            contexts = (
+                ContextBuilder.for_step("step7")
+                .add_json("step5", step5_raw, priority=1)
+                .add_json("step6", step6_raw, priority=1)
+                .add_json("step4", step4_raw, priority=2)
+                .build()
             )
+            step7_prompt = self.prompts.step7_outreach_email(
+                company_name, contexts["step4"], contexts["step5"], contexts["step6"]
+            )
+            chunks = []
+            async for event in self._stream_llm_step(
+                llm, step7_prompt, 7, "Outreach Email", chunks, prefix=shared_prefix
+            ):
+                yield event
+            step7_raw = "".join(chunks)
             self.metadata["llm_calls"] += 1
             
             # Parse JSON response
-            step7_result = self._parse_json_response(step7_raw)
+            step7_result, step7_schema_errors = self._parse_step_response(step7_raw, 7)
             
             results["steps"]["step7_outreach_email"] = {
                 "status": "complete",
                 "data": step7_result,
+                "schema_errors": step7_schema_errors,
                 "raw": step7_raw,
                 "citations": []  # No web search for step 7
             }
@@ -466,17 +725,73 @@ class ResearchOrchestrator:
                 "progress_percent": 0
             }
     
+    async def _repair_personas(
+        self, llm: FailoverLLMClient, company_name: str, step5_result: Dict
+    ) -> Tuple[int, List[Dict]]:
+        """
+        Fill in placeholder persona names in place: one role search per missing
+        slot, then a small fill-in prompt. Returns (names filled, citations used).
+        """
+        personas = step5_result["personas"]
+        slots = [
+            {"slot": index, "title": persona.get("title", ""), "business_unit": persona.get("business_unit", "")}
+            for index, persona in enumerate(personas)
+            if isinstance(persona, dict) and is_placeholder_name(persona.get("name"))
+        ]
+        
+        web_context, citations = "", []
+        if self.search_client:
+            roles = list(dict.fromkeys(
+                " ".join(filter(None, [slot["title"] or "executive", slot["business_unit"]])) for slot in slots
+            ))
+            found = self.search_corpus.add(
+                await asyncio.to_thread(self.search_client.search_executives_multi, company_name, roles=roles)
+            )
+            for slot in slots:
+                role = role_for_title(slot["title"])
+                if role and role not in self.metadata["executive_roles_searched"]:
+                    self.metadata["executive_roles_searched"].append(role)
+            web_context, citations = self._fit_search_results("step5_repair", found)
+        
+        route = "step5_repair"
+        self.metadata["step_models"][route] = llm.router.model_for(llm.provider, route) or llm.model
+        response = await llm.call_llm(
+            self.prompts.step5_persona_repair(company_name, slots, web_context),
+            max_tokens=1000, json_schema=PERSONA_REPAIR_SCHEMA, route=route
+        )
+        self._record_usage(llm)
+        self.metadata["llm_calls"] += 1
+        self.metadata["persona_repairs"] += 1
+        
+        try:
+            repair = parse_json_text(response)
+        except ValueError:
+            print("Persona repair returned unparseable output")
+            return 0, citations
+        
+        open_slots = {slot["slot"] for slot in slots}
+        filled = 0
+        for fix in repair.get("personas", []) if isinstance(repair, dict) else []:
+            slot = fix.get("slot") if isinstance(fix, dict) else None
+            if slot not in open_slots or is_placeholder_name(fix.get("name")):
+                continue
+            persona = personas[slot]
+            persona["name"] = fix["name"]
+            persona["title"] = fix.get("title") or persona.get("title", "")
+            persona["data_source"] = fix.get("data_source") or persona.get("data_source", "")
+            open_slots.discard(slot)
+            filled += 1
+        
+        self.metadata["repaired_personas"] += filled
+        return filled, citations
+    
     def _needs_persona_retry(self, result: str) -> bool:
         """Check if persona mapping result needs retry due to missing names"""
         # Handle JSON responses
         try:
             data = json.loads(result) if isinstance(result, str) else result
             if isinstance(data, dict) and "personas" in data:
-                for persona in data["personas"]:
-                    name = persona.get("name", "").lower()
-                    if not name or "tbd" in name or name in ["", "-", "n/a", "not available", "to be determined"]:
-                        return True
-                return False
+                return any(is_placeholder_name(persona.get("name")) for persona in data["personas"])
         except:
             pass
         
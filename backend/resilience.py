@@ -0,0 +1,313 @@
+"""
+Shared resilience layer for LLM and search calls.
+
+- Error classification: rate limits, overload (429/529), 5xx, timeouts and
+  connection failures are retryable; other 4xx (bad key, bad request) are fatal
+- Jittered exponential backoff that honours retry-after / retry-after-ms
+- Circuit breakers per provider and API key, so a failing provider is
+  skipped quickly instead of every caller waiting out its retries, and one
+  user's rate-limited or exhausted key doesn't block other users' keys
+- Per-call deadlines covering all attempts (for streams, the whole stream
+  including items after the first), and for streams a timeout on the
+  first item. Running out of time is the caller's limit, not a provider
+  failure, so it doesn't count toward the circuit breaker
+"""
+import asyncio
+import hashlib
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import AsyncGenerator, Awaitable, Callable, Dict, Optional, TypeVar
+
+import httpx
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+
+
+class TransientProviderError(Exception):
+    """A provider-reported transient failure that did not arrive as an HTTP status (e.g. a stream error event)"""
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the provider while its circuit is open"""
+
+
+class DeadlineExceededError(TimeoutError):
+    """Raised when a call (including retries) runs past its deadline"""
+
+
+class RetryPolicy:
+    """How many times to retry, how long to wait between attempts, and the overall deadline"""
+    
+    def __init__(
+        self,
+        max_attempts: int = 4,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        deadline: Optional[float] = None,
+        first_item_timeout: Optional[float] = None
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        # Streams only: how long an attempt may take to produce its first item
+        self.first_item_timeout = first_item_timeout
+    
+    def with_deadline(self, deadline: Optional[float]) -> "RetryPolicy":
+        """Copy of this policy with another overall deadline"""
+        return RetryPolicy(self.max_attempts, self.base_delay, self.max_delay, deadline, self.first_item_timeout)
+    
+    def backoff(self, attempt: int, error: Exception) -> float:
+        """Delay before retry number `attempt` (1-based): retry-after if given, else full jitter"""
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive retryable failures and rejects
+    calls for `reset_timeout` seconds. Then exactly one caller gets through as
+    a trial while the rest are still rejected: success closes the circuit,
+    failure opens it again. A trial that never reports back (cancelled, or a
+    non-retryable error) expires after another `reset_timeout`.
+    """
+    
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_started_at: Optional[float] = None
+    
+    @property
+    def trial_in_flight(self) -> bool:
+        return self.trial_started_at is not None and time.monotonic() - self.trial_started_at < self.reset_timeout
+    
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout or self.trial_in_flight:
+            return "open"
+        return "half_open"
+    
+    def check(self):
+        """Raise CircuitOpenError if calls are currently rejected; in half_open, the caller becomes the trial"""
+        state = self.state
+        if state == "open":
+            if self.trial_in_flight:
+                raise CircuitOpenError(f"{self.name} circuit is open, trial call in progress")
+            remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+            raise CircuitOpenError(f"{self.name} circuit is open, retry in {remaining:.0f}s")
+        if state == "half_open":
+            self.trial_started_at = time.monotonic()
+    
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_started_at = None
+    
+    def record_failure(self):
+        self.failures += 1
+        if self.trial_started_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self.trial_started_at = None
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(provider: str, api_key: str) -> CircuitBreaker:
+    """Process-wide circuit breaker for a provider (e.g. "anthropic", "openai", "tavily") and API key"""
+    # Same key shape as rate_limiter.bucket_key
+    key = f"{provider}:{hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]}"
+    if key not in _breakers:
+        _breakers[key] = CircuitBreaker(provider)
+    return _breakers[key]
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    # httpx.HTTPStatusError and requests.HTTPError both carry the response
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def is_retryable(error: Exception) -> bool:
+    """Classify a failure as transient (worth retrying) or fatal"""
+    if isinstance(error, TransientProviderError):
+        return True
+    if isinstance(error, (CircuitOpenError, DeadlineExceededError)):
+        return False
+    
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES or status >= 500
+    
+    # Timeouts and connection failures (httpx, asyncio, requests/socket errors)
+    return isinstance(error, (httpx.TransportError, asyncio.TimeoutError, TimeoutError, OSError))
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Server-requested wait from retry-after-ms / retry-after headers, if any"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _remaining(deadline_at: Optional[float]) -> Optional[float]:
+    return None if deadline_at is None else deadline_at - time.monotonic()
+
+
+async def call_with_retry(
+    call: Callable[[], Awaitable[T]],
+    breaker: CircuitBreaker,
+    policy: RetryPolicy
+) -> T:
+    """Await `call()` with retries, backoff, circuit breaking and the policy deadline"""
+    deadline_at = time.monotonic() + policy.deadline if policy.deadline else None
+    
+    for attempt in range(1, policy.max_attempts + 1):
+        breaker.check()
+        remaining = _remaining(deadline_at)
+        try:
+            if remaining is None:
+                result = await call()
+            else:
+                result = await asyncio.wait_for(call(), timeout=max(remaining, 0))
+        except Exception as e:
+            remaining = _remaining(deadline_at)
+            if remaining is not None and remaining <= 0:
+                raise DeadlineExceededError(f"{breaker.name} call exceeded {policy.deadline:.0f}s deadline") from e
+            if not is_retryable(e):
+                raise
+            
+            breaker.record_failure()
+            delay = policy.backoff(attempt, e)
+            if attempt == policy.max_attempts or (remaining is not None and delay >= remaining):
+                raise
+            await asyncio.sleep(delay)
+        else:
+            breaker.record_success()
+            return result
+
+
+async def stream_with_retry(
+    open_stream: Callable[[], AsyncGenerator[T, None]],
+    breaker: CircuitBreaker,
+    policy: RetryPolicy
+) -> AsyncGenerator[T, None]:
+    """
+    Iterate a stream from `open_stream()`, retrying failures that happen before
+    the first item arrives. Once anything has been yielded the caller has
+    consumed partial output, so later failures are raised as-is. An attempt
+    with no item within `policy.first_item_timeout`, or a stream still running
+    at `policy.deadline`, raises DeadlineExceededError.
+    """
+    deadline_at = time.monotonic() + policy.deadline if policy.deadline else None
+    
+    for attempt in range(1, policy.max_attempts + 1):
+        breaker.check()
+        stream = open_stream()
+        limits = [limit for limit in (policy.first_item_timeout, _remaining(deadline_at)) if limit is not None]
+        timeout = max(min(limits), 0) if limits else None
+        first = asyncio.ensure_future(stream.__anext__())
+        try:
+            done, _ = await asyncio.wait({first}, timeout=timeout)
+        finally:
+            if not first.done():
+                first.cancel()
+                try:
+                    await first
+                except (asyncio.CancelledError, Exception):
+                    pass
+                await stream.aclose()
+        if not done:
+            raise DeadlineExceededError(f"{breaker.name} stream produced no output within {timeout:.0f}s")
+        
+        try:
+            item = first.result()
+        except StopAsyncIteration:
+            breaker.record_success()
+            return
+        except Exception as e:
+            if not is_retryable(e):
+                raise
+            
+            breaker.record_failure()
+            delay = policy.backoff(attempt, e)
+            remaining = _remaining(deadline_at)
+            if attempt == policy.max_attempts or (remaining is not None and delay >= remaining):
+                raise
+            await asyncio.sleep(delay)
+            continue
+        
+        breaker.record_success()
+        try:
+            yield item
+            while True:
+                remaining = _remaining(deadline_at)
+                try:
+                    if remaining is None:
+                        item = await stream.__anext__()
+                    else:
+                        item = await asyncio.wait_for(stream.__anext__(), timeout=max(remaining, 0))
+                except StopAsyncIteration:
+                    return
+                except asyncio.TimeoutError as e:
+                    if deadline_at is None or _remaining(deadline_at) > 0:
+                        raise
+                    raise DeadlineExceededError(f"{breaker.name} stream exceeded {policy.deadline:.0f}s deadline") from e
+                yield item
+        finally:
+            await stream.aclose()
+
+
+def call_with_retry_sync(call: Callable[[], T], breaker: CircuitBreaker, policy: RetryPolicy) -> T:
+    """
+    Blocking counterpart of call_with_retry for synchronous SDKs (Tavily).
+    Backoff sleeps block too: call it from a worker thread (asyncio.to_thread), never on the event loop.
+    """
+    deadline_at = time.monotonic() + policy.deadline if policy.deadline else None
+    
+    for attempt in range(1, policy.max_attempts + 1):
+        breaker.check()
+        try:
+            result = call()
+        except Exception as e:
+            if not is_retryable(e):
+                raise
+            
+            breaker.record_failure()
+            delay = policy.backoff(attempt, e)
+            remaining = _remaining(deadline_at)
+            if attempt == policy.max_attempts or (remaining is not None and delay >= remaining):
+                raise
+            time.sleep(delay)
+        else:
+            breaker.record_success()
+            return result
@@ -0,0 +1,278 @@
+"""
+JSON schemas for the structured output of each research step.
+
+Mirrors the OUTPUT FORMAT blocks in prompts.py. Schemas are in OpenAI's
+strict `json_schema` format ({"name", "strict", "schema"}); LLMClient sends
+them as `response_format` to OpenAI and as a forced tool to Anthropic.
+Strict mode requires every property to be listed in `required` and
+`additionalProperties: false` on every object.
+"""
+from typing import Any, Dict, List
+
+
+def _string() -> Dict:
+    return {"type": "string"}
+
+
+def _integer() -> Dict:
+    return {"type": "integer"}
+
+
+def _status() -> Dict:
+    return {"type": "string", "enum": ["RED", "YELLOW", "GREEN"]}
+
+
+def _string_list() -> Dict:
+    return {"type": "array", "items": {"type": "string"}}
+
+
+def _object(**properties) -> Dict:
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False
+    }
+
+
+def _array_of(**properties) -> Dict:
+    return {"type": "array", "items": _object(**properties)}
+
+
+def _step_schema(name: str, schema: Dict) -> Dict:
+    return {"name": name, "strict": True, "schema": schema}
+
+
+STEP1_SCHEMA = _step_schema("strategic_objectives", _object(
+    company=_string(),
+    industry=_string(),
+    strategy_horizon=_string(),
+    objectives=_array_of(
+        objective=_string(),
+        description=_string(),
+        target_metrics=_string_list(),
+        primary_sources=_string_list(),
+        evidence_type=_string()
+    ),
+    data_quality_note=_string()
+))
+
+STEP2_SCHEMA = _step_schema("bu_alignment", _object(
+    company=_string(),
+    business_units=_array_of(
+        name=_string(),
+        primary_focus=_string(),
+        strategic_alignment=_string(),
+        core_metrics=_string_list(),
+        sources=_string_list()
+    ),
+    data_timestamp=_string()
+))
+
+STEP3_SCHEMA = _step_schema("bu_deepdive", _object(
+    business_unit=_string(),
+    company=_string(),
+    main_objectives=_array_of(
+        objective=_string(),
+        description=_string(),
+        timeline=_string()
+    ),
+    key_metrics=_array_of(
+        metric=_string(),
+        current_value=_string(),
+        target=_string(),
+        source=_string()
+    ),
+    challenges=_array_of(
+        category=_string(),
+        challenge=_string(),
+        impact=_string()
+    ),
+    data_timestamp=_string()
+))
+
+STEP4_SCHEMA = _step_schema("ai_alignment", _object(
+    company=_string(),
+    ai_use_cases=_array_of(
+        objective=_string(),
+        ai_use_case=_string(),
+        expected_outcome=_string(),
+        strategic_alignment=_string(),
+        business_unit=_string()
+    ),
+    focus_period=_string()
+))
+
+PERSONA_SCHEMA = _object(
+    name=_string(),
+    title=_string(),
+    level=_string(),
+    business_unit=_string(),
+    buying_role=_string(),
+    decision_authority=_string(),
+    reports_to=_string(),
+    pain_point=_string(),
+    ai_use_case=_string(),
+    expected_outcome=_string(),
+    strategic_alignment=_string(),
+    engagement_approach=_string(),
+    potential_barriers=_string(),
+    outreach_priority={"type": "integer"},
+    value_hook=_string(),
+    data_source=_string()
+)
+
+STEP5_SCHEMA = _step_schema("persona_mapping", _object(
+    company=_string(),
+    personas={"type": "array", "items": PERSONA_SCHEMA},
+    buying_committee_summary=_string(),
+    research_note=_string()
+))
+
+# Step 5 repair: names for the persona slots the first attempt left as "TBD"
+PERSONA_REPAIR_SCHEMA = _step_schema("persona_repair", _object(
+    personas=_array_of(
+        slot=_integer(),
+        name=_string(),
+        title=_string(),
+        data_source=_string()
+    )
+))
+
+STEP6_SCHEMA = _step_schema("value_realization", _object(
+    company=_string(),
+    value_realizations=_array_of(
+        use_case_name=_string(),
+        business_unit=_string(),
+        executive_sponsor=_string(),
+        problem_statement=_string(),
+        solution_overview=_string(),
+        financial_impact=_object(**{
+            "annual_cost_savings": _string(),
+            "revenue_opportunity": _string(),
+            "efficiency_gains": _string(),
+            "payback_period": _string(),
+            "3_year_roi": _string()
+        }),
+        implementation=_object(
+            timeline=_string(),
+            budget_required=_string(),
+            headcount_required=_string(),
+            technology_stack=_string_list()
+        ),
+        success_metrics=_array_of(
+            metric=_string(),
+            baseline=_string(),
+            target=_string(),
+            timeline=_string()
+        ),
+        risks_and_mitigation=_array_of(
+            risk=_string(),
+            likelihood=_string(),
+            impact=_string(),
+            mitigation=_string()
+        ),
+        strategic_differentiation=_string(),
+        quick_wins=_string()
+    ),
+    executive_summary=_string()
+))
+
+STEP7_SCHEMA = _step_schema("outreach_email", _object(
+    company=_string(),
+    primary_persona=_string(),
+    subject_line=_string(),
+    email_body=_string(),
+    email_structure=_object(
+        hook=_string(),
+        challenge=_string(),
+        pivot=_string(),
+        proof=_string(),
+        cta=_string()
+    ),
+    tone=_string(),
+    key_talking_points=_string_list()
+))
+
+# Keyed by step number
+STEP_SCHEMAS = {
+    1: STEP1_SCHEMA,
+    2: STEP2_SCHEMA,
+    3: STEP3_SCHEMA,
+    4: STEP4_SCHEMA,
+    5: STEP5_SCHEMA,
+    6: STEP6_SCHEMA,
+    7: STEP7_SCHEMA
+}
+
+# Judge verdicts (validation.py)
+STEP_VERDICT = _object(
+    score=_integer(),
+    status=_status(),
+    issues=_string_list(),
+    strengths=_string_list(),
+    recommendations=_string_list()
+)
+
+OVERALL_VERDICT = _object(
+    score=_integer(),
+    status=_status(),
+    critical_issues=_string_list(),
+    warnings=_string_list(),
+    assessment=_string(),
+    recommendations=_string_list()
+)
+
+
+STEP_VERDICT_SCHEMA = _step_schema("step_validation", STEP_VERDICT)
+
+OVERALL_VERDICT_SCHEMA = _step_schema("overall_validation", OVERALL_VERDICT)
+
+
+def report_verdict_schema(step_keys: List[str]) -> Dict:
+    """Batched judge output: one verdict per step key plus the overall verdict"""
+    return _step_schema("report_validation", _object(
+        steps=_object(**{key: STEP_VERDICT for key in step_keys}),
+        overall=OVERALL_VERDICT
+    ))
+
+
+_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool
+}
+
+
+def validate_against_schema(data: Any, schema: Dict, path: str = "$") -> List[str]:
+    """
+    Check data against the subset of JSON Schema used above.
+    
+    Returns a list of "path: problem" strings; empty when the data conforms.
+    """
+    expected = schema.get("type")
+    python_type = _TYPES.get(expected)
+    if python_type and (not isinstance(data, python_type) or (expected != "boolean" and isinstance(data, bool))):
+        return [f"{path}: expected {expected}, got {type(data).__name__}"]
+    if "enum" in schema and data not in schema["enum"]:
+        return [f"{path}: {data!r} is not one of {schema['enum']}"]
+    
+    errors = []
+    if expected == "object":
+        properties = schema.get("properties", {})
+        for key in schema.get("required", []):
+            if key not in data:
+                errors.append(f"{path}: missing required property '{key}'")
+        for key, value in data.items():
+            if key in properties:
+                errors.extend(validate_against_schema(value, properties[key], f"{path}.{key}"))
+            elif schema.get("additionalProperties") is False:
+                errors.append(f"{path}: unexpected property '{key}'")
+    elif expected == "array" and "items" in schema:
+        for index, item in enumerate(data):
+            errors.extend(validate_against_schema(item, schema["items"], f"{path}[{index}]"))
+    
+    return errors
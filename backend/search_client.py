@@ -2,7 +2,18 @@
 Tavily Search Client for real-time web research
 """
 from tavily import TavilyClient as TavilyAPI
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional
+from resilience import CircuitOpenError, RetryPolicy, call_with_retry_sync, get_breaker
+from search_policy import CREDITS, entity_terms, escalated_max_results, escalation_reason, log_entry
+
+# Roles searched for step 5 by default: C-suite, then BU-level leaders
+EXECUTIVE_ROLES = [
+    "CFO Chief Financial Officer", "CTO Chief Technology Officer",
+    "COO Chief Operating Officer", "CRO Chief Risk Officer",
+    "CDO Chief Data Officer", "CISO Chief Information Security Officer",
+    "Division President", "Business Unit Head EVP SVP",
+    "VP Vice President Operations", "VP Technology Innovation"
+]
 
 
 class TavilySearchClient:
@@ -11,67 +22,103 @@ class TavilySearchClient:
     def __init__(self, api_key: str):
         """Initialize Tavily client with API key"""
         self.client = TavilyAPI(api_key=api_key)
+        self.retry_policy = RetryPolicy(max_attempts=3, base_delay=0.5, max_delay=10.0, deadline=60.0)
+        self.breaker = get_breaker("tavily", api_key)
+        # Searches actually sent (retries of one search count once)
+        self.searches = 0
+        # Depth used per query and why, see search_policy.py
+        self.policy_log: List[Dict] = []
+    
+    def _search_api(self, **kwargs) -> Dict:
+        """Call Tavily with retries; raises once retries are exhausted or the circuit is open"""
+        attempts = 0
+        
+        def search():
+            nonlocal attempts
+            attempts += 1
+            if attempts == 1:
+                self.searches += 1  # a search rejected by the circuit never gets here
+            return self.client.search(**kwargs)
+        
+        return call_with_retry_sync(search, self.breaker, self.retry_policy)
+    
+    def _results(self, response: Dict, query: str) -> List[Dict]:
+        if not response or 'results' not in response:
+            return []
+        
+        return [
+            {
+                "title": result.get('title', 'No title'),
+                "url": result.get('url', 'No URL'),
+                "content": result.get('content', 'No content available'),
+                "score": result.get('score', 0),
+                "query": query
+            }
+            for result in response['results']
+        ]
     
-    def search(self, query: str, max_results: int = 5) -> Tuple[str, List[Dict]]:
+    def _adaptive_search(self, query: str, max_results: int, entities: List[List[str]]) -> List[Dict]:
+        """
+        Basic-depth search, escalated to one advanced search when the results
+        are weak (see search_policy.py); the outcome goes into `policy_log`.
+        Raises like _search_api if the basic search fails.
         """
-        Perform a web search and return formatted results plus structured citations
+        results = self._results(self._search_api(
+            query=query,
+            search_depth="basic",
+            max_results=max_results,
+            include_domains=[],
+            exclude_domains=[]
+        ), query)
+        reason = escalation_reason(results, entities)
+        entry = log_entry(query, results, entities, reason)
+        
+        if reason:
+            try:
+                advanced = self._results(self._search_api(
+                    query=query,
+                    search_depth="advanced",
+                    max_results=escalated_max_results(max_results),
+                    include_domains=[],
+                    exclude_domains=[]
+                ), query)
+                entry["credits"] += CREDITS["advanced"]
+            except Exception as e:
+                print(f"Tavily advanced search failed, keeping basic results: {e}")
+                advanced = []
+            if advanced:
+                results = advanced
+                entry["depth"] = "advanced"
+        
+        entry["results"] = len(results)
+        self.policy_log.append(entry)
+        return results
+    
+    def search(self, query: str, max_results: int = 5, entities: Optional[List[List[str]]] = None) -> List[Dict]:
+        """
+        Perform a web search and return structured results
         
         Args:
             query: Search query string
             max_results: Maximum number of results to return
+            entities: Terms per entity the results should mention (see search_policy.entity_terms);
+                poor coverage escalates the search to advanced depth
             
         Returns:
-            Tuple of (formatted string with search results, list of citation dicts)
+            List of {"title", "url", "content", "score", "query"} dicts in Tavily's rank order.
+            Empty on failure so no error text reaches the LLM prompt; prompts are
+            rendered from these by context_builder.py.
         """
         try:
-            # Perform search with Tavily
-            response = self.client.search(
-                query=query,
-                search_depth="advanced",  # Use advanced search for better quality
-                max_results=max_results,
-                include_domains=[],
-                exclude_domains=[]
-            )
-            
-            # Format results for LLM context
-            if not response or 'results' not in response:
-                return "No search results found.", []
-            
-            results = response['results']
-            if not results:
-                return "No search results found.", []
-            
-            # Build formatted output and structured citations
-            formatted_results = ["=== RECENT WEB SEARCH RESULTS ===\n"]
-            citations = []
-            
-            for idx, result in enumerate(results, 1):
-                title = result.get('title', 'No title')
-                url = result.get('url', 'No URL')
-                content = result.get('content', 'No content available')
-                score = result.get('score', 0)
-                
-                formatted_results.append(f"{idx}. {title}")
-                formatted_results.append(f"   URL: {url}")
-                formatted_results.append(f"   Relevance: {score:.2f}")
-                formatted_results.append(f"   Content: {content}")
-                formatted_results.append("")  # Blank line between results
-                
-                # Store structured citation
-                citations.append({
-                    "title": title,
-                    "url": url,
-                    "relevance_score": score
-                })
-            
-            formatted_results.append("=== END OF WEB SEARCH RESULTS ===\n")
-            
-            return "\n".join(formatted_results), citations
-            
+            return self._adaptive_search(query, max_results, entities or [])
+        except CircuitOpenError as e:
+            print(f"Tavily search skipped: {e}")
+            return []
         except Exception as e:
-            return f"Search error: {str(e)}", []
+            print(f"Tavily search error: {e}")
+            return []
     
-    def search_for_step(self, company_name: str, step_focus: str) -> Tuple[str, List[Dict]]:
+    def search_for_step(self, company_name: str, step_focus: str) -> List[Dict]:
         """
         Perform a targeted search for a specific research step
         
@@ -80,21 +127,13 @@ class TavilySearchClient:
             step_focus: The focus area for this step (e.g., "strategic objectives", "key initiatives")
             
         Returns:
-            Tuple of (formatted search results, list of citations)
-        Perform a targeted search for a specific research step
-        
-        Args:
-            company_name: Name of the company being researched
-            step_focus: The focus area for this step (e.g., "strategic objectives", "key initiatives")
-            
-        Returns:
-            Formatted search results
+            List of search results
         """
         # Build query that prioritizes recent information
         query = f"{company_name} {step_focus} 2024 2025 2026"
-        return self.search(query, max_results=5)
+        return self.search(query, max_results=5, entities=[entity_terms(company_name)])
     
-    def search_executives_multi(self, company_name: str, roles: list = None) -> Tuple[str, List[Dict]]:
+    def search_executives_multi(self, company_name: str, roles: list = None) -> List[Dict]:
         """
         Perform multiple targeted searches for specific executive roles
         
@@ -103,54 +142,27 @@ class TavilySearchClient:
             roles: List of specific roles to search for (e.g., ["CFO", "CTO", "CRO"])
             
         Returns:
-            Tuple of (combined formatted search results, list of citations)
+            Top 2 results per role, each tagged with the "role" it was found for
         """
-        if not roles:
-            roles = [
-                # C-Suite executives
-                "CFO Chief Financial Officer", "CTO Chief Technology Officer", 
-                "COO Chief Operating Officer", "CRO Chief Risk Officer",
-                "CDO Chief Data Officer", "CISO Chief Information Security Officer",
-                # BU-level leaders
-                "Division President", "Business Unit Head EVP SVP",
-                "VP Vice President Operations", "VP Technology Innovation"
-            ]
-        
-        all_results = ["=== EXECUTIVE SEARCH RESULTS (MULTIPLE TARGETED QUERIES) ===\n"]
-        citations = []
+        if roles is None:
+            roles = EXECUTIVE_ROLES
         
+        results = []
         for role in roles:
             query = f"{company_name} {role} name current 2024 2025"
             try:
-                response = self.client.search(
-                    query=query,
-                    search_depth="advanced",
-                    max_results=3,
-                    include_domains=[],
-                    exclude_domains=[]
+                found = self._adaptive_search(
+                    query, max_results=3, entities=[entity_terms(company_name), entity_terms(role)]
                 )
-                
-                if response and 'results' in response and response['results']:
-                    all_results.append(f"\n--- Search for {role} ---")
-                    for idx, result in enumerate(response['results'][:2], 1):  # Top 2 per role
-                        title = result.get('title', 'No title')
-                        url = result.get('url', 'No URL')
-                        content = result.get('content', 'No content available')
-                        score = result.get('score', 0)
-                        
-                        all_results.append(f"{idx}. {title}")
-                        all_results.append(f"   URL: {url}")
-                        all_results.append(f"   Content: {content}")
-                        all_results.append("")
-                        
-                        # Store citation
-                        citations.append({
-                            "title": title,
-                            "url": url,
-                            "relevance_score": score
-                        })
+            except CircuitOpenError as e:
+                print(f"Tavily search skipped: {e}")
+                break
             except Exception as e:
-                all_results.append(f"\n--- Search for {role} failed: {str(e)} ---\n")
+                print(f"Tavily search for {role} failed: {e}")
+                continue
+            
+            # Top 2 per role
+            results.extend(dict(result, role=role) for result in found[:2])
         
-        all_results.append("\n=== END OF EXECUTIVE SEARCH RESULTS ===\n")
-        return "\n".join(all_results), citations
+        return results
+
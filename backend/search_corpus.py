@@ -0,0 +1,122 @@
+"""
+Per-run corpus of web search results.
+
+Every step's Tavily results go through one SearchCorpus so that:
+
+- the same page found by several queries (same URL, or same content under
+  a different URL) is kept once
+- each step is served its own results ranked by Tavily score and overlap
+  with the query, with results earlier steps already put in a prompt
+  pushed down, and results already in the shared step 1 prefix left out
+- citations list each source once
+"""
+import hashlib
+import re
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Weight of Tavily's score vs. query term overlap when ranking
+SCORE_WEIGHT = 0.6
+RELEVANCE_WEIGHT = 0.4
+
+# Rank multiplier for results an earlier step already used
+SEEN_PENALTY = 0.5
+
+# Results served per search step
+DEFAULT_TOP_N = 5
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {"the", "and", "for", "with", "name", "current", "business", "unit"}
+
+
+def normalize_url(url: str) -> str:
+    """Lowercased scheme/host, no fragment, tracking parameters or trailing slash"""
+    parts = urlsplit(url.strip())
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query) if not k.lower().startswith("utm_")])
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), query, ""))
+
+
+def content_hash(content: str) -> str:
+    """Hash of the snippet with case and whitespace normalized"""
+    normalized = " ".join(content.lower().split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def query_relevance(query: str, text: str) -> float:
+    """Fraction of the query's terms that appear in the text (0-1)"""
+    terms = {term for term in _WORD.findall(query.lower()) if len(term) > 2 and term not in _STOPWORDS}
+    if not terms:
+        return 0.0
+    words = set(_WORD.findall(text.lower()))
+    return len(terms & words) / len(terms)
+
+
+class SearchCorpus:
+    """Deduplicated search results for one research run"""
+    
+    def __init__(self):
+        self._entries: Dict[str, Dict] = {}  # normalized URL -> result
+        self._by_hash: Dict[str, str] = {}  # content hash -> normalized URL
+        self._served = set()
+        self._pinned = set()
+        self.stats = {"search_results": 0, "duplicate_search_results": 0}
+    
+    def add(self, results: List[Dict]) -> List[Dict]:
+        """
+        Register a query's results and return them deduplicated against the
+        run so far. Each result carries the "query" that found it; duplicates
+        keep the best score and relevance seen.
+        """
+        added = []
+        added_keys = set()
+        for result in results:
+            self.stats["search_results"] += 1
+            url = normalize_url(result["url"])
+            digest = content_hash(result["content"])
+            relevance = query_relevance(result.get("query", ""), f"{result['title']} {result['content']}")
+            
+            key = url if url in self._entries else self._by_hash.get(digest)
+            if key is None:
+                key = url
+                self._entries[key] = dict(result, relevance=relevance)
+                self._by_hash[digest] = key
+            else:
+                self.stats["duplicate_search_results"] += 1
+                entry = self._entries[key]
+                entry["score"] = max(entry["score"], result["score"])
+                entry["relevance"] = max(entry["relevance"], relevance)
+            
+            if key not in added_keys:
+                added_keys.add(key)
+                added.append(self._entries[key])
+        return added
+    
+    def rank(self, results: List[Dict], top_n: Optional[int] = DEFAULT_TOP_N) -> List[Dict]:
+        """A step's results, best first: pinned results dropped, already-served ones penalized"""
+        candidates = [result for result in results if self._key(result) not in self._pinned]
+        
+        def rank_score(result: Dict) -> float:
+            score = SCORE_WEIGHT * result["score"] + RELEVANCE_WEIGHT * result["relevance"]
+            return score * SEEN_PENALTY if self._key(result) in self._served else score
+        
+        ranked = sorted(candidates, key=rank_score, reverse=True)
+        return ranked if top_n is None else ranked[:top_n]
+    
+    def serve(self, results: List[Dict]) -> List[Dict]:
+        """Record results as used in a prompt; returns their citations"""
+        self._served.update(self._key(result) for result in results)
+        return [
+            {
+                "title": result["title"],
+                "url": result["url"],
+                "relevance_score": result["score"]
+            }
+            for result in results
+        ]
+    
+    def pin(self, results: List[Dict]):
+        """Results included in the shared prefix every later step already sees"""
+        self._pinned.update(self._key(result) for result in results)
+    
+    def _key(self, result: Dict) -> str:
+        return normalize_url(result["url"])
@@ -0,0 +1,84 @@
+"""
+Adaptive Tavily search depth.
+
+Every query is sent at basic depth first (1 API credit, fast). It is
+escalated to one advanced search (2 credits, slower) only when the basic
+results look weak:
+
+- low_score: the best result's relevance score is below MIN_TOP_SCORE
+- low_coverage: fewer than MIN_COVERAGE of the results mention every
+  entity of the query (the company, plus the role for executive searches)
+- no_results
+
+TavilySearchClient logs the outcome of each query (see `log_entry`) and
+the orchestrator copies the log into report metadata as "search_policy",
+with the totals as "advanced_searches" and "search_credits".
+"""
+import re
+from typing import Dict, List, Optional
+
+MIN_TOP_SCORE = 0.5
+MIN_COVERAGE = 0.5
+
+# An escalated query also asks for more results
+ESCALATED_RESULTS_FACTOR = 2
+MAX_RESULTS = 10
+
+# Credits per search by depth
+CREDITS = {"basic": 1, "advanced": 2}
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Words that don't identify a company or role on their own
+_GENERIC = {
+    "inc", "corp", "corporation", "company", "co", "ltd", "llc", "plc", "group", "holdings", "the", "and",
+    "chief", "officer"
+}
+
+
+def entity_terms(text: str) -> List[str]:
+    """Distinctive words of a company name or role; a result mentioning any of them covers the entity"""
+    return [word for word in _WORD.findall(text.lower()) if len(word) > 2 and word not in _GENERIC]
+
+
+def entity_coverage(results: List[Dict], entities: List[List[str]]) -> float:
+    """Fraction of results whose title or content mentions every entity"""
+    if not results:
+        return 0.0
+    entities = [terms for terms in entities if terms]
+    covered = 0
+    for result in results:
+        words = set(_WORD.findall(f"{result['title']} {result['content']}".lower()))
+        covered += all(words & set(terms) for terms in entities)
+    return covered / len(results)
+
+
+def escalation_reason(results: List[Dict], entities: List[List[str]]) -> Optional[str]:
+    """Why basic-depth results need an advanced search, or None if they are good enough"""
+    if not results:
+        return "no_results"
+    if max(result["score"] for result in results) < MIN_TOP_SCORE:
+        return "low_score"
+    if entity_coverage(results, entities) < MIN_COVERAGE:
+        return "low_coverage"
+    return None
+
+
+def escalated_max_results(max_results: int) -> int:
+    return min(max_results * ESCALATED_RESULTS_FACTOR, MAX_RESULTS)
+
+
+def log_entry(query: str, results: List[Dict], entities: List[List[str]], reason: Optional[str]) -> Dict:
+    """
+    Policy log entry for a query, from its basic-depth results; the client
+    updates depth, results and credits if it escalates
+    """
+    return {
+        "query": query,
+        "depth": "basic",
+        "escalation_reason": reason,
+        "top_score": round(max((result["score"] for result in results), default=0), 2),
+        "coverage": round(entity_coverage(results, entities), 2),
+        "results": len(results),
+        "credits": CREDITS["basic"]
+    }
@@ -1,18 +1,69 @@
 """
 Research validation orchestration using Judge LLM
 """
+import asyncio
 import json
-import re
+import os
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import AsyncGenerator, Dict, Any, List, Optional, Tuple
 from judge_client import JudgeLLMClient
-from prompts_judge import validation_prompt_step, overall_validation_prompt
+from judge_verdicts import JudgeOutputError, OverallVerdict, ReportVerdict, StepVerdict, parse_verdict
+from prompts_judge import (
+    JUDGE_BATCH, JUDGE_BATCH_SECTION, JUDGE_OVERALL, JUDGE_STEP, judge_prompt_version,
+    validation_prompt_step, overall_validation_prompt, batch_validation_prompt
+)
+from schemas import OVERALL_VERDICT_SCHEMA, STEP_VERDICT_SCHEMA, report_verdict_schema
+from validation_rules import check_step, score_to_status
+from validation_store import ValidationStore, content_hash, step_content_hash
+
+# Validator step key -> step key in research results (and report column)
+STEP_COLUMNS = {
+    "step1_overview": "step1_strategic_objectives",
+    "step2_business_priorities": "step2_bu_alignment",
+    "step3_tech_stack": "step3_bu_deepdive",
+    "step4_ai_alignment": "step4_ai_alignment",
+    "step5_persona_mapping": "step5_persona_mapping",
+    "step6_value_realization": "step6_value_realization",
+    "step7_outreach": "step7_outreach_email",
+}
+
+
+def build_report_data(company_name: str, steps: Dict[str, Any], report_id: Optional[int] = None) -> Dict[str, Any]:
+    """Validator input from steps keyed as in research results / report columns"""
+    return {
+        "id": report_id,
+        "results": {
+            "company_name": company_name,
+            "steps": {key: steps.get(column) for key, column in STEP_COLUMNS.items()}
+        }
+    }
 
 class ResearchValidator:
     """Orchestrates validation of research using judge LLM"""
     
-    def __init__(self, judge_api_key: str):
+    def __init__(
+        self,
+        judge_api_key: str,
+        max_concurrency: Optional[int] = None,
+        store: Optional[ValidationStore] = None,
+        force: bool = False,
+        batch: bool = False
+    ):
         self.judge = JudgeLLMClient(api_key=judge_api_key)
+        # Stored verdicts are keyed on the judge prompts that produced them
+        self.prompt_version = judge_prompt_version([JUDGE_STEP, JUDGE_OVERALL])
+        self.batch_prompt_version = f"{judge_prompt_version([JUDGE_BATCH_SECTION, JUDGE_BATCH])}-batch"
+        # Cap on concurrent judge calls per validation run
+        self.max_concurrency = max_concurrency or int(os.getenv("JUDGE_MAX_CONCURRENCY", "4"))
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        # Stored verdicts are reused for unchanged content unless `force` is set
+        self.store = store
+        self.force = force
+        self.judge_calls = 0
+        # Batch mode: one judge call for every step plus the overall assessment
+        self.batch = batch
+        self.batch_max_tokens = int(os.getenv("JUDGE_BATCH_MAX_TOKENS", "4000"))
+        self.batch_fallback: Optional[str] = None
         
         # Map step keys to their names (we'll skip actual prompt retrieval for simplicity)
         self.step_config = {
@@ -39,7 +90,7 @@ class ResearchValidator:
             }
         }
     
-    def validate_research(self, report_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def validate_research(self, report_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Validate entire research report
         
@@ -49,15 +100,41 @@ class ResearchValidator:
         Returns:
             Validation report with scores and findings
         """
+        async for event in self.validate_research_stream(report_data):
+            if event["type"] == "complete":
+                return event["validation_report"]
+    
+    async def validate_research_stream(self, report_data: Dict[str, Any]) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Validate all steps concurrently (at most `max_concurrency` judge calls at
+        once), yielding step_start / step_complete events as each step starts and
+        finishes, then overall_start and a final complete event with the report.
+        Structural rules (validation_rules.py) run first and are reported at
+        once as step_checked; steps with a critical rule finding are scored by
+        the rules alone. Steps with a stored verdict for the same content
+        complete immediately with `cached: true`. A judge call whose output is
+        truncated or doesn't match the verdict schema is reported in
+        `judge_errors` and the step keeps its rule score.
+        
+        In batch mode the remaining steps and the overall assessment come from a
+        single judge call (batch_start); if its output is truncated or doesn't
+        match the schema, a batch_fallback event is sent and the steps are
+        judged one by one as above.
+        """
         results = report_data.get("results", {})
         steps = results.get("steps", {})
         
         validation_report = {
             "validation_timestamp": datetime.now().isoformat(),
-            "judge_model": "gpt-4o",
+            "judge_model": self.judge.model,
             "company_name": results.get("company_name", "Unknown"),
             "report_id": report_data.get("id"),
+            "prompt_version": self.batch_prompt_version if self.batch else self.prompt_version,
+            "mode": "batch" if self.batch else "per_step",
             "step_validations": {},
+            "cached_steps": [],
+            "rule_only_steps": [],
+            "judge_errors": {},
             "overall_score": 0,
             "overall_status": "YELLOW",
             "critical_issues": [],
@@ -65,49 +142,248 @@ class ResearchValidator:
             "recommendations": []
         }
         
-        # Validate each step
-        step_scores = {}
-        for step_key, step_data in steps.items():
-            if step_key not in self.step_config:
-                continue
-            
-            validation = self._validate_step(
-                step_key=step_key,
-                step_data=step_data,
-                company_name=results.get("company_name")
-            )
-            
+        step_items = [(key, data) for key, data in steps.items() if key in self.step_config]
+        rules = {}
+        for step_key, step_data in step_items:
+            rules[step_key] = check_step(step_key, step_data)
+            yield {
+                "type": "step_checked",
+                "step_key": step_key,
+                "score": rules[step_key]["score"],
+                "status": rules[step_key]["status"],
+                "issues": rules[step_key]["issues"]
+            }
+        
+        def complete(step_key: str, validation: Dict[str, Any], cached: bool) -> Dict[str, Any]:
             validation_report["step_validations"][step_key] = validation
-            step_scores[self.step_config[step_key]["name"]] = {
+            if cached:
+                validation_report["cached_steps"].append(step_key)
+            if validation.get("judge_error"):
+                validation_report["judge_errors"][step_key] = validation["judge_error"]
+            return {
+                "type": "step_complete",
+                "step_key": step_key,
                 "score": validation["score"],
-                "status": validation["status"]
+                "status": validation["status"],
+                "cached": cached,
+                "judge_error": validation.get("judge_error")
             }
         
-        # Overall validation
-        overall = self._validate_overall(step_scores, results)
+        overall = None
+        judged = [(key, data) for key, data in step_items if not rules[key]["critical"]]
+        if self.batch and judged:
+            yield {"type": "batch_start", "step_keys": [key for key, _ in judged]}
+            batch = await self._validate_batch(judged, rules, results.get("company_name"))
+            if batch is None:
+                validation_report["batch_fallback"] = self.batch_fallback
+                yield {"type": "batch_fallback", "reason": self.batch_fallback}
+            else:
+                for step_key, _ in judged:
+                    yield complete(step_key, batch["steps"][step_key], batch["cached"])
+                overall = batch["overall"]
+                if batch["cached"]:
+                    validation_report["cached_steps"].append("overall")
+        
+        events: asyncio.Queue = asyncio.Queue()
+        
+        async def validate(step_key: str, step_data: Dict):
+            try:
+                step_hash = step_content_hash(step_data)
+                validation = None if rules[step_key]["critical"] else self._stored(step_key, step_hash)
+                cached = validation is not None
+                if rules[step_key]["critical"]:
+                    # Broken structure: no need to pay for a semantic review
+                    validation = self._rules_verdict(rules[step_key])
+                    validation_report["rule_only_steps"].append(step_key)
+                elif not cached:
+                    async with self.semaphore:
+                        events.put_nowait({"type": "step_start", "step_key": step_key})
+                        validation = await self._validate_step(
+                            step_key=step_key,
+                            step_data=step_data,
+                            company_name=results.get("company_name"),
+                            rules=rules[step_key]
+                        )
+                    self._save(step_key, step_hash, validation)
+            except Exception as e:
+                events.put_nowait(e)
+                return
+            events.put_nowait(complete(step_key, validation, cached))
+        
+        remaining = [
+            (key, data) for key, data in step_items if key not in validation_report["step_validations"]
+        ]
+        tasks = [asyncio.create_task(validate(key, data)) for key, data in remaining]
+        try:
+            completed = 0
+            while completed < len(tasks):
+                event = await events.get()
+                if isinstance(event, Exception):
+                    raise event
+                completed += event["type"] == "step_complete"
+                yield event
+        finally:
+            for task in tasks:
+                task.cancel()
+        
+        # Overall validation, in step order regardless of completion order
+        step_scores = {
+            self.step_config[key]["name"]: {
+                "score": validation_report["step_validations"][key]["score"],
+                "status": validation_report["step_validations"][key]["status"]
+            }
+            for key, _ in step_items
+        }
+        validation_report["step_validations"] = {
+            key: validation_report["step_validations"][key] for key, _ in step_items
+        }
+        
+        yield {"type": "overall_start"}
+        if overall is None:
+            overall_hash = content_hash(step_scores)
+            overall = self._stored("overall", overall_hash)
+            if overall is None:
+                overall = await self._validate_overall(step_scores, results)
+                self._save("overall", overall_hash, overall)
+            else:
+                validation_report["cached_steps"].append("overall")
+        if overall.get("judge_error"):
+            validation_report["judge_errors"]["overall"] = overall["judge_error"]
         validation_report.update({
             "overall_score": overall["score"],
             "overall_status": overall["status"],
             "critical_issues": overall.get("critical_issues", []),
             "warnings": overall.get("warnings", []),
             "overall_assessment": overall.get("assessment", ""),
-            "recommendations": overall.get("recommendations", [])
+            "recommendations": overall.get("recommendations", []),
+            "judge_calls": self.judge_calls
         })
         
-        return validation_report
+        yield {"type": "complete", "validation_report": validation_report}
     
-    def _validate_step(self, step_key: str, step_data: Dict, company_name: str) -> Dict[str, Any]:
-        """Validate a single research step"""
+    async def _validate_batch(
+        self, judged: List[Tuple[str, Dict]], rules: Dict[str, Dict], company_name: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Judge all `judged` steps plus the overall assessment in one call.
+        
+        Returns {"steps": {step_key: verdict}, "overall": verdict, "cached"},
+        or None (reason in `batch_fallback`) if the output was truncated or
+        didn't parse, in which case nothing is stored.
+        """
+        hashes = {key: step_content_hash(data) for key, data in judged}
+        overall_hash = content_hash(hashes)
+        version = self.batch_prompt_version
+        
+        # All-or-nothing: a single changed step means one new call for the lot
+        stored = {key: self._stored(key, hashes[key], version) for key in hashes}
+        stored_overall = self._stored("overall", overall_hash, version)
+        if stored_overall is not None and all(stored.values()):
+            return {"steps": stored, "overall": stored_overall, "cached": True}
+        
+        sections = []
+        for key, data in judged:
+            content, citations = self._step_content(data)
+            sections.append({
+                "step_key": key,
+                "step_name": self.step_config[key]["name"],
+                "output_data": json.dumps(content, indent=2) if isinstance(content, dict) else str(content),
+                "citations": citations,
+                "findings": rules[key]["issues"]
+            })
+        prompt = batch_validation_prompt(company_name, sections)
+        schema = report_verdict_schema(list(hashes))
+        
+        try:
+            self.judge_calls += 1
+            content, finish_reason = await self.judge.validate_json(
+                prompt, schema, max_tokens=self.batch_max_tokens
+            )
+            verdict = parse_verdict(ReportVerdict, content, finish_reason)
+            if set(verdict.steps) != set(hashes):
+                raise JudgeOutputError(f"verdicts for {sorted(verdict.steps)}, expected {sorted(hashes)}")
+        except Exception as e:
+            self.batch_fallback = str(e)
+            print(f"Batch validation failed, judging steps one by one: {e}")
+            return None
+        
+        step_verdicts = {}
+        for key in hashes:
+            step_verdicts[key] = self._merge_rules(verdict.steps[key].model_dump(), rules[key])
+            self._save(key, hashes[key], step_verdicts[key], version)
+        overall = verdict.overall.model_dump()
+        self._save("overall", overall_hash, overall, version)
+        return {"steps": step_verdicts, "overall": overall, "cached": False}
+    
+    def _rules_verdict(self, rules: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "score": rules["score"],
+            "status": rules["status"],
+            "issues": rules["issues"],
+            "strengths": [],
+            "recommendations": ["Fix the structural issues and re-run this step before a quality review"],
+            "checks": rules["findings"],
+            "judged": False
+        }
+    
+    def _judge_failed(self, rules: Dict[str, Any], reason: str) -> Dict[str, Any]:
+        """Verdict when the judge call or its output failed: the rule score, flagged as unjudged"""
+        return {
+            "score": rules["score"],
+            "status": rules["status"],
+            "issues": rules["issues"] + [f"Judge review failed: {reason}"],
+            "strengths": [],
+            "recommendations": ["Re-run validation for a semantic review of this step"],
+            "checks": rules["findings"],
+            "judged": False,
+            "judge_error": reason
+        }
+    
+    def _merge_rules(self, validation: Dict[str, Any], rules: Dict[str, Any]) -> Dict[str, Any]:
+        """Fold rule findings into the judge's verdict; the lower of the two scores wins"""
+        merged = dict(validation, checks=rules["findings"], judged=True)
+        merged["issues"] = rules["issues"] + validation.get("issues", [])
+        if rules["score"] < validation["score"]:
+            merged["score"] = rules["score"]
+            merged["status"] = score_to_status(rules["score"])
+        return merged
+    
+    def _rules_context(self, rules: Dict[str, Any]) -> str:
+        findings = "\n".join(f"- {issue}" for issue in rules["issues"]) or "- None"
+        return f"""**AUTOMATED STRUCTURAL CHECKS (already scored - do not re-check):**
+Schema conformance, empty sections, placeholder names and presence of citations were checked automatically.
+Findings:
+{findings}
+
+Focus your review on semantic quality: whether claims are accurate and supported, specific rather than generic, and consistent."""
+    
+    def _stored(self, step_key: str, content_hash: str, prompt_version: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        if self.store is None or self.force:
+            return None
+        return self.store.get(step_key, content_hash, self.judge.model, prompt_version or self.prompt_version)
+    
+    def _save(self, step_key: str, content_hash: str, validation: Dict[str, Any], prompt_version: Optional[str] = None):
+        # Verdicts that fell back after a judge error are not worth reusing
+        if self.store is not None and not validation.get("judge_error"):
+            self.store.save(
+                step_key, content_hash, self.judge.model, prompt_version or self.prompt_version, validation
+            )
+    
+    def _step_content(self, step_data: Any) -> Tuple[Any, List[Dict]]:
+        """A step's output and its citations"""
+        if isinstance(step_data, dict):
+            return step_data.get("data", step_data), step_data.get("citations", [])
+        return step_data, []
+    
+    async def _validate_step(
+        self, step_key: str, step_data: Dict, company_name: str, rules: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Validate a single research step, folding in the structural rule results"""
         
         config = self.step_config[step_key]
         
         # Extract step content and citations
-        if isinstance(step_data, dict):
-            content = step_data.get("data", step_data)
-            citations = step_data.get("citations", [])
-        else:
-            content = step_data
-            citations = []
+        content, citations = self._step_content(step_data)
         
         # Get original prompt description (simplified)
         original_prompt = f"Generate {config['name']} for {company_name} including all required elements and structure."
@@ -123,138 +399,39 @@ class ResearchValidator:
             step_name=config["name"],
             original_prompt=original_prompt,
             output_data=output_str,
-            citations=citations
+            citations=citations,
+            step_context=self._rules_context(rules)
         )
         
         # Get judge response
         try:
-            judge_response = self.judge.validate(validation_prompt)
-            parsed = self._parse_step_validation(judge_response)
-            return parsed
+            self.judge_calls += 1
+            content, finish_reason = await self.judge.validate_json(validation_prompt, STEP_VERDICT_SCHEMA)
+            verdict = parse_verdict(StepVerdict, content, finish_reason)
+            return self._merge_rules(verdict.model_dump(), rules)
         except Exception as e:
-            return {
-                "score": 50,
-                "status": "YELLOW",
-                "issues": [f"Validation error: {str(e)}"],
-                "strengths": [],
-                "recommendations": ["Unable to complete validation"]
-            }
+            print(f"Judge failed on {step_key}: {e}")
+            return self._judge_failed(rules, str(e))
     
-    def _validate_overall(self, step_scores: Dict, full_research: Dict) -> Dict[str, Any]:
+    async def _validate_overall(self, step_scores: Dict, full_research: Dict) -> Dict[str, Any]:
         """Validate overall research quality across all steps"""
         
         overall_prompt = overall_validation_prompt(step_scores, full_research)
         
         try:
-            judge_response = self.judge.validate(overall_prompt)
-            parsed = self._parse_overall_validation(judge_response)
-            return parsed
+            self.judge_calls += 1
+            content, finish_reason = await self.judge.validate_json(overall_prompt, OVERALL_VERDICT_SCHEMA)
+            return parse_verdict(OverallVerdict, content, finish_reason).model_dump()
         except Exception as e:
-            # Fallback: average of step scores
-            avg_score = sum(s["score"] for s in step_scores.values()) / len(step_scores) if step_scores else 50
+            print(f"Judge failed on overall validation: {e}")
+            # Fallback: average of step scores, flagged as such
+            avg_score = sum(s["score"] for s in step_scores.values()) / len(step_scores) if step_scores else 0
             return {
                 "score": int(avg_score),
-                "status": self._score_to_status(avg_score),
-                "critical_issues": [f"Overall validation error: {str(e)}"],
+                "status": score_to_status(avg_score),
+                "critical_issues": [f"Overall judge review failed: {e}"],
                 "warnings": [],
-                "assessment": "Unable to complete overall validation",
-                "recommendations": ["Review individual step scores"]
+                "assessment": "Overall validation failed; the score is the average of the step scores",
+                "recommendations": ["Re-run validation for a cross-step review"],
+                "judge_error": str(e)
             }
-    
-    def _parse_step_validation(self, response: str) -> Dict[str, Any]:
-        """Parse judge response for step validation"""
-        
-        # Extract score
-        score_match = re.search(r'Score:\s*(\d+)', response, re.IGNORECASE)
-        score = int(score_match.group(1)) if score_match else 75
-        
-        # Extract status
-        status_match = re.search(r'Status:\s*(RED|YELLOW|GREEN)', response, re.IGNORECASE)
-        status = status_match.group(1).upper() if status_match else self._score_to_status(score)
-        
-        # Extract issues
-        issues_match = re.search(r'Issues:(.*?)(?:Strengths:|$)', response, re.DOTALL | re.IGNORECASE)
-        issues = self._parse_list_items(issues_match.group(1)) if issues_match else []
-        
-        # Extract strengths
-        strengths_match = re.search(r'Strengths:(.*?)(?:Recommendations:|$)', response, re.DOTALL | re.IGNORECASE)
-        strengths = self._parse_list_items(strengths_match.group(1)) if strengths_match else []
-        
-        # Extract recommendations
-        recs_match = re.search(r'Recommendations:(.*?)$', response, re.DOTALL | re.IGNORECASE)
-        recommendations = self._parse_list_items(recs_match.group(1)) if recs_match else []
-        
-        return {
-            "score": score,
-            "status": status,
-            "issues": issues,
-            "strengths": strengths,
-            "recommendations": recommendations
-        }
-    
-    def _parse_overall_validation(self, response: str) -> Dict[str, Any]:
-        """Parse judge response for overall validation"""
-        
-        # Extract overall score
-        score_match = re.search(r'Overall Score:\s*(\d+)', response, re.IGNORECASE)
-        score = int(score_match.group(1)) if score_match else 75
-        
-        # Extract status
-        status_match = re.search(r'Overall Status:\s*(RED|YELLOW|GREEN)', response, re.IGNORECASE)
-        status = status_match.group(1).upper() if status_match else self._score_to_status(score)
-        
-        # Extract critical issues
-        critical_match = re.search(r'Critical Issues:(.*?)(?:Warnings:|$)', response, re.DOTALL | re.IGNORECASE)
-        critical_issues = self._parse_list_items(critical_match.group(1)) if critical_match else []
-        
-        # Extract warnings
-        warnings_match = re.search(r'Warnings:(.*?)(?:Overall Assessment:|$)', response, re.DOTALL | re.IGNORECASE)
-        warnings = self._parse_list_items(warnings_match.group(1)) if warnings_match else []
-        
-        # Extract assessment
-        assessment_match = re.search(r'Overall Assessment:(.*?)(?:Recommendations:|$)', response, re.DOTALL | re.IGNORECASE)
-        assessment = assessment_match.group(1).strip() if assessment_match else ""
-        
-        # Extract recommendations
-        recs_match = re.search(r'Recommendations:(.*?)$', response, re.DOTALL | re.IGNORECASE)
-        recommendations = self._parse_list_items(recs_match.group(1)) if recs_match else []
-        
-        return {
-            "score": score,
-            "status": status,
-            "critical_issues": critical_issues,
-            "warnings": warnings,
-            "assessment": assessment,
-            "recommendations": recommendations
-        }
-    
-    def _parse_list_items(self, text: str) -> List[str]:
-        """Parse bulleted/numbered list items from text"""
-        if not text:
-            return []
-        
-        # Split by lines and find list items
-        lines = text.strip().split('\n')
-        items = []
-        for line in lines:
-            line = line.strip()
-            # Match bullets, numbers, or dashes
-            if re.match(r'^[-*•]\s+', line) or re.match(r'^\d+\.\s+', line):
-                item = re.sub(r'^[-*•\d.]\s+', '', line).strip()
-                if item and item.lower() != 'none':
-                    items.append(item)
-        
-        # If no items found but text exists, return as single item
-        if not items and text.strip().lower() != 'none':
-            items = [text.strip()]
-        
-        return items
-    
-    def _score_to_status(self, score: int) -> str:
-        """Convert numeric score to color status"""
-        if score >= 85:
-            return "GREEN"
-        elif score >= 70:
-            return "YELLOW"
-        else:
-            return "RED"
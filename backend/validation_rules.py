@@ -0,0 +1,128 @@
+"""
+Deterministic checks run on each step before the judge LLM.
+
+Structural problems - output that didn't parse, schema violations, empty
+sections, placeholder ("TBD") executive names, missing citations - are
+found and scored locally, for free. A step with a critical finding is
+scored by the rules alone; everything else still goes to the judge for
+the semantic review, with the rule findings folded into its verdict.
+"""
+from typing import Any, Dict, List
+
+from schemas import STEP_SCHEMAS, validate_against_schema
+
+# Persona names that mean "not found"
+PLACEHOLDER_NAMES = {"", "-", "n/a", "na", "not available", "to be determined", "unknown", "none"}
+
+# Validation step key -> (research step number, whether the step is backed by web search)
+RULE_STEPS = {
+    "step1_overview": (1, True),
+    "step2_business_priorities": (2, True),
+    "step3_tech_stack": (3, True),
+    "step4_ai_alignment": (4, True),
+    "step5_persona_mapping": (5, True),
+    "step6_value_realization": (6, False),
+    "step7_outreach": (7, False),
+}
+
+# Score deduction per finding
+DEDUCTIONS = {"critical": 40, "major": 15, "minor": 5}
+
+
+def is_placeholder_name(name: Any) -> bool:
+    """True for empty, "TBD" and similar stand-in persona names"""
+    name = str(name or "").strip().lower()
+    return name in PLACEHOLDER_NAMES or "tbd" in name
+
+
+def score_to_status(score: int) -> str:
+    """Convert numeric score to color status"""
+    if score >= 85:
+        return "GREEN"
+    elif score >= 70:
+        return "YELLOW"
+    else:
+        return "RED"
+
+
+def _finding(severity: str, check: str, message: str) -> Dict[str, str]:
+    return {"severity": severity, "check": check, "message": message}
+
+
+def _empty_strings(data: Any) -> int:
+    if isinstance(data, dict):
+        return sum(_empty_strings(value) for value in data.values())
+    if isinstance(data, list):
+        return sum(_empty_strings(value) for value in data)
+    return int(isinstance(data, str) and not data.strip())
+
+
+def _check_structure(data: Any, schema: Dict, label: str) -> List[Dict[str, str]]:
+    """Parse failures, schema violations, empty top-level arrays and empty fields"""
+    if not isinstance(data, dict) or not data:
+        return [_finding("critical", "parse", f"{label}: no structured output")]
+    if data.get("fallback") or "error" in data:
+        return [_finding("critical", "parse", f"{label}: output could not be parsed as JSON")]
+    
+    findings = []
+    errors = validate_against_schema(data, schema["schema"])
+    if errors:
+        findings.append(_finding(
+            "major", "schema", f"{label}: {len(errors)} schema violation(s), e.g. {errors[0]}"
+        ))
+    
+    for key, spec in schema["schema"]["properties"].items():
+        if spec.get("type") == "array" and isinstance(data.get(key), list) and not data[key]:
+            findings.append(_finding("critical", "empty", f"{label}: '{key}' is empty"))
+    
+    empty = _empty_strings(data)
+    if empty:
+        findings.append(_finding("minor", "empty", f"{label}: {empty} empty field(s)"))
+    return findings
+
+
+def check_step(step_key: str, step_data: Any) -> Dict[str, Any]:
+    """
+    Run the structural checks for one step.
+    
+    Returns {"score", "status", "issues", "findings", "critical"}; `critical`
+    means the step failed badly enough that the judge is not needed.
+    """
+    step_number, uses_search = RULE_STEPS[step_key]
+    schema = STEP_SCHEMAS[step_number]
+    data = step_data.get("data") if isinstance(step_data, dict) else step_data
+    
+    findings = []
+    if step_number == 3:
+        # Step 3 holds one deep-dive per business unit
+        if not isinstance(data, dict) or not data:
+            findings.append(_finding("critical", "empty", "No business unit deep-dives"))
+        else:
+            for bu, bu_data in data.items():
+                bu_result = bu_data.get("data") if isinstance(bu_data, dict) else bu_data
+                findings.extend(_check_structure(bu_result, schema, bu))
+    else:
+        findings.extend(_check_structure(data, schema, "Output"))
+    
+    if step_number == 5 and isinstance(data, dict) and isinstance(data.get("personas"), list) and data["personas"]:
+        personas = data["personas"]
+        placeholders = sum(is_placeholder_name(p.get("name") if isinstance(p, dict) else None) for p in personas)
+        if placeholders == len(personas):
+            findings.append(_finding("critical", "names", "No persona has a real executive name"))
+        elif placeholders:
+            findings.append(_finding(
+                "major", "names", f"{placeholders} of {len(personas)} personas have placeholder names (TBD)"
+            ))
+    
+    citations = step_data.get("citations") if isinstance(step_data, dict) else None
+    if uses_search and not citations:
+        findings.append(_finding("major", "citations", "No source citations"))
+    
+    score = max(0, 100 - sum(DEDUCTIONS[finding["severity"]] for finding in findings))
+    return {
+        "score": score,
+        "status": score_to_status(score),
+        "issues": [finding["message"] for finding in findings],
+        "findings": findings,
+        "critical": any(finding["severity"] == "critical" for finding in findings)
+    }
@@ -0,0 +1,122 @@
+"""
+Stored judge validations.
+
+Every judge verdict is saved in validation_results keyed by a hash of what
+was judged (step data and citations, or the step scores for the overall
+pass), the judge model and the judge prompt version. Re-validating a report
+reuses stored verdicts for unchanged steps, so only changed steps cost a
+judge call. Rows also carry the report they were recorded for, which gives
+each report a score history. Background validation (auto_validation.py)
+runs before the report is saved, so its rows carry the research run's id
+and are linked to the report on save.
+"""
+import hashlib
+import json
+import uuid
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from database import Report, ValidationResult
+
+
+def content_hash(content: Any) -> str:
+    """sha256 of the canonical JSON form of `content`"""
+    canonical = json.dumps(content, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def step_content_hash(step_data: Any) -> str:
+    """Hash of the parts of a step the judge sees: its data and citations"""
+    if isinstance(step_data, dict):
+        return content_hash({"data": step_data.get("data", step_data), "citations": step_data.get("citations", [])})
+    return content_hash({"data": step_data, "citations": []})
+
+
+class ValidationStore:
+    """Lookup and storage of judge verdicts for one report's (or research run's) validation run"""
+    
+    def __init__(self, db: Session, report_id: Optional[int] = None, research_id: Optional[uuid.UUID] = None):
+        self.db = db
+        self.report_id = report_id
+        self.research_id = research_id
+    
+    def get(self, step_key: str, content_hash: str, judge_model: str, prompt_version: str) -> Optional[Dict]:
+        """
+        Latest stored verdict for this content, or None. A verdict first recorded
+        for another report is also recorded for this one, so its history is complete.
+        """
+        row = (
+            self.db.query(ValidationResult)
+            .filter(
+                ValidationResult.content_hash == content_hash,
+                ValidationResult.judge_model == judge_model,
+                ValidationResult.prompt_version == prompt_version,
+                ValidationResult.step_key == step_key
+            )
+            .order_by(ValidationResult.created_at.desc())
+            .first()
+        )
+        if row is None:
+            return None
+        
+        report_id = self._report_id()
+        if report_id is not None:
+            recorded_elsewhere = row.report_id != report_id
+        else:
+            recorded_elsewhere = self.research_id is not None and row.research_id != self.research_id
+        if recorded_elsewhere:
+            self.save(step_key, content_hash, judge_model, prompt_version, row.result)
+        return row.result
+    
+    def save(self, step_key: str, content_hash: str, judge_model: str, prompt_version: str, result: Dict):
+        self.db.add(ValidationResult(
+            report_id=self._report_id(),
+            research_id=self.research_id,
+            step_key=step_key,
+            content_hash=content_hash,
+            judge_model=judge_model,
+            prompt_version=prompt_version,
+            score=result.get("score"),
+            status=result.get("status"),
+            result=result
+        ))
+        self.db.commit()
+    
+    def _report_id(self) -> Optional[int]:
+        # A background run's report may be saved while it is still validating
+        if self.report_id is None and self.research_id is not None:
+            report = self.db.query(Report.id).filter(Report.research_id == self.research_id).first()
+            self.report_id = report.id if report else None
+        return self.report_id
+
+
+def link_research_validations(db: Session, research_id: uuid.UUID, report_id: int) -> int:
+    """Attach verdicts recorded for a research run before its report was saved; returns the row count"""
+    return (
+        db.query(ValidationResult)
+        .filter(ValidationResult.research_id == research_id, ValidationResult.report_id.is_(None))
+        .update({ValidationResult.report_id: report_id}, synchronize_session=False)
+    )
+
+
+def validation_history(db: Session, report_id: int) -> Dict[str, Any]:
+    """Score history per step (and "overall") for a report, oldest first"""
+    rows = (
+        db.query(ValidationResult)
+        .filter(ValidationResult.report_id == report_id)
+        .order_by(ValidationResult.created_at)
+        .all()
+    )
+    
+    steps: Dict[str, list] = {}
+    for row in rows:
+        steps.setdefault(row.step_key, []).append({
+            "score": row.score,
+            "status": row.status,
+            "judge_model": row.judge_model,
+            "prompt_version": row.prompt_version,
+            "content_hash": row.content_hash,
+            "validated_at": row.created_at.isoformat() if row.created_at else None
+        })
+    return {"report_id": report_id, "steps": steps}
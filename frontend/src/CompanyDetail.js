@@ -232,7 +232,7 @@ const CompanyDetail = () => {
       const reader = response.body.getReader();
       const decoder = new TextDecoder();
       let buffer = '';
-      let stepCount = 0;
+      let completedSteps = 0;
       const totalSteps = 8; // 7 steps + 1 overall
 
       while (true) {
@@ -248,16 +248,26 @@ const CompanyDetail = () => {
             const data = JSON.parse(line.slice(6));
             
             if (data.type === 'step_start') {
-              stepCount++;
+              // Steps are validated in parallel; progress advances as each one completes
               const icon = stepIcons[data.step_key] || '📊';
               const name = stepNames[data.step_key] || data.step_key;
               setValidationStep(`${icon} Validating ${name}...`);
-              setValidationProgress(Math.round((stepCount / totalSteps) * 100));
+            } else if (data.type === 'step_checked') {
+              // Instant structural checks; the judge's verdict follows in step_complete
+              const name = stepNames[data.step_key] || data.step_key;
+              setValidationStep(`🔎 ${name}: structural checks ${data.score}/100`);
+            } else if (data.type === 'batch_start') {
+              setValidationStep(`🔬 Validating ${data.step_keys.length} steps in one pass...`);
+            } else if (data.type === 'batch_fallback') {
+              // Batched output was truncated or malformed; steps are re-judged one by one
+              setValidationStep('🔁 Batched validation incomplete, validating step by step...');
             } else if (data.type === 'step_complete') {
+              completedSteps++;
               const icon = stepIcons[data.step_key] || '📊';
               const name = stepNames[data.step_key] || data.step_key;
               const status = data.status === 'GREEN' ? '✅' : data.status === 'YELLOW' ? '⚠️' : '❌';
-              setValidationStep(`${status} ${icon} ${name}: ${data.score}/100`);
+              setValidationStep(`${status} ${icon} ${name}: ${data.score}/100${data.cached ? ' (unchanged)' : ''}`);
+              setValidationProgress(Math.round((completedSteps / totalSteps) * 100));
             } else if (data.type === 'overall_start') {
               setValidationStep('🔬 Computing overall assessment...');
               setValidationProgress(95);
@@ -100,6 +100,24 @@ const ResearchForm = () => {
     await startResearch();
   };
 
+  // Background validation runs after the research stream ends; poll until it finishes
+  const pollValidation = async (researchId, attempts = 0) => {
+    if (attempts >= 100) return;
+    try {
+      const response = await fetch(`http://localhost:8000/api/research/${researchId}/validation`);
+      if (!response.ok) return;
+      const data = await response.json();
+      if (data.type === 'validation_running') {
+        setTimeout(() => pollValidation(researchId, attempts + 1), 3000);
+      } else if (data.type === 'validation_complete') {
+        // Verdicts are already stored and attached to the report when it's saved
+        setResults(prev => prev ? { ...prev, validation: data } : prev);
+      }
+    } catch (err) {
+      console.error('Failed to fetch validation status:', err);
+    }
+  };
+
   const startResearch = async () => {
     if (!companyName.trim()) {
       setError('Please enter a company name');
@@ -127,13 +145,16 @@ const ResearchForm = () => {
           company_name: companyName,
           llm_provider: provider,
           api_key: apiKey,
-          tavily_api_key: tavilyApiKey || null
+          tavily_api_key: tavilyApiKey || null,
+          auto_validate: true
         })
       });
 
       const reader = response.body.getReader();
       const decoder = new TextDecoder();
       let buffer = '';
+      let streamedChars = 0;
+      let streamedItems = 0;
 
       while (true) {
         const { done, value } = await reader.read();
@@ -148,8 +169,18 @@ const ResearchForm = () => {
             const data = JSON.parse(line.slice(6));
             
             if (data.type === 'progress') {
+              streamedChars = 0;
+              streamedItems = 0;
               setProgress(data.progress_percent);
               setCurrentStep(data.message);
+            } else if (data.type === 'step_delta') {
+              streamedChars += data.delta.length;
+              setCurrentStep(`${data.step_name}${data.business_unit ? ` (${data.business_unit})` : ''}: writing... ${streamedChars.toLocaleString()} characters${streamedItems ? `, ${streamedItems} items` : ''}`);
+            } else if (data.type === 'step_item') {
+              streamedItems += 1;
+              if (data.item && data.item.name) {
+                setCurrentStep(`${data.step_name}: ${data.item.name}${data.item.title ? ` (${data.item.title})` : ''}`);
+              }
             } else if (data.type === 'step_complete') {
               setProgress(data.progress_percent);
               setCurrentStep(`Completed: ${data.step_name}`);
@@ -192,6 +223,9 @@ const ResearchForm = () => {
                   // Don't show error to user - research still succeeded
                 }
               }
+            } else if (data.type === 'validation_queued') {
+              // Background validation with the server's judge key
+              pollValidation(data.research_id);
             } else if (data.type === 'error') {
               setError(data.message);
               setIsResearching(false);